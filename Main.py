@@ -20,7 +20,9 @@ from sklearn import preprocessing
 from stable_baselines import A2C
 
 from lib.deployment.obtainData import get_model_file, get_lookback_window, get_obs_data
-from lib.utils.dataUtils import add_technical_indicators
+from lib.utils.dataUtils import add_technical_indicators, load_feature_set, process_data
+from lib.utils.indicatorStateUtils import create_indicator_state, load_indicator_state, save_indicator_state, \
+    update_indicator_state
 
 # SETUP
 tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)  # Remove ugly tensorflow warnings
@@ -42,6 +44,11 @@ parser.add_argument("-p", "--no_predictions", type=int,
                     help="Number of predictions to run when choosing the action to take", default=1000)
 parser.add_argument("-r", "--retry_count", type=int,
                     help="Number of attempts to get data from Yahoo Finance if it fails", default=3)
+parser.add_argument("-t", "--training_data_dir", type=str, default="./Training Data/",
+                    help="The directory which contains the stock's training data. The technical indicators are "
+                         "computed over the stock's whole history in it the first time that the model is used.")
+parser.add_argument("-a", "--no_entries_taking_avg", type=int, help="Number of entries to consider when taking average",
+                    default=10)
 
 args = parser.parse_args()
 
@@ -56,6 +63,9 @@ NO_PREDICTIONS = int(args.no_predictions)
 
 RETRY_COUNT = args.retry_count
 
+TRAINING_DATA_DIRECTORY = args.training_data_dir if args.training_data_dir[-1] == "/" else args.training_data_dir + "/"
+NO_ENTRIES_TAKING_AVG = int(args.no_entries_taking_avg)
+
 # OBTAINING DATA
 # Get the model file from the model directory
 modelFile = get_model_file(MODEL_DIRECTORY)
@@ -63,6 +73,9 @@ modelFile = get_model_file(MODEL_DIRECTORY)
 # Get the value for the lookback window from the model file
 lookbackWindow = get_lookback_window(modelFile)
 
+# Get the technical indicators which the model observes from the model file
+modelIndicators = load_feature_set(MODEL_DIRECTORY + modelFile)
+
 # Get the data for the observation array
 ohlcvDataframe, sentimentDataframe, ownedStockArr = get_obs_data(STOCK_NAME, STOCK_SYMBOL, STOCK_HISTORY_FILE,
                                                                  lookbackWindow, days_to_scrape=DAYS_TO_SCRAPE,
@@ -220,7 +233,61 @@ dataframe = pd.DataFrame({"Open": ohlcvData[:, 0], "High": ohlcvData[:, 1], "Low
                           "Close": ohlcvData[:, 3], "Volume": ohlcvData[:, 4], "Sentiment": sentimentData})
 
 # Add technical indicators to the dataframe
-dataframe = add_technical_indicators(dataframe)
+# The rows of `dataframe` start from yesterday and go back in time, so reverse them to update the indicators in order
+chronologicalDataframe = dataframe[::-1].reset_index(drop=True)
+chronologicalDates = [(datetime.date.today() - datetime.timedelta(days=lookbackWindow - i)).strftime("%Y-%m-%d")
+                      for i in range(lookbackWindow)]
+
+indicatorStateFile = MODEL_DIRECTORY + f"{STOCK_SYMBOL}_indicator_state.json"
+yesterday = datetime.date.today() - datetime.timedelta(days=1)
+
+try:
+    # Continue from the indicator state of the previous run
+    indicatorState = load_indicator_state(indicatorStateFile)
+    noNewEntries = (yesterday - datetime.datetime.strptime(indicatorState["last_date"], "%Y-%m-%d").date()).days
+
+    if not 0 <= noNewEntries <= lookbackWindow or indicatorState["indicators"] != modelIndicators or \
+            len(indicatorState["feature_rows"]) + noNewEntries < lookbackWindow:
+        raise ValueError("The indicator state cannot be continued")
+
+except (OSError, ValueError, KeyError):
+    # Create the indicator state from the stock's whole history in the training data, so that the indicators match
+    # those which the model was trained on
+    historyDataframe, historyDates = process_data(TRAINING_DATA_DIRECTORY, STOCK_SYMBOL,
+                                                  entries_taking_avg=NO_ENTRIES_TAKING_AVG, return_dates=True)
+
+    if len(historyDataframe) == 0:
+        parser.error(f"There is no training data for {STOCK_SYMBOL} in '{TRAINING_DATA_DIRECTORY}'.")
+
+    indicatorState = create_indicator_state(historyDataframe)
+    indicatorState["indicators"] = modelIndicators
+    indicatorState["feature_rows"] = add_technical_indicators(historyDataframe, modelIndicators)[
+        modelIndicators].values[-lookbackWindow:].tolist()
+
+    # Only the entries after the history are taken from the scraped data
+    noNewEntries = max((yesterday - historyDates[-1].astype(datetime.date)).days, 0)
+
+    if noNewEntries > lookbackWindow or len(indicatorState["feature_rows"]) + noNewEntries < lookbackWindow:
+        parser.error(f"The training data of {STOCK_SYMBOL} (which ends on {historyDates[-1]}) cannot be joined to "
+                     f"the last {lookbackWindow} days of scraped data. Run `Update Training Data.py` first.")
+
+# Update the indicator state with the new entries
+for entryIndex in range(lookbackWindow - noNewEntries, lookbackWindow):
+    entry = chronologicalDataframe.iloc[entryIndex]
+    indicatorValues = update_indicator_state(indicatorState, entry["High"], entry["Low"], entry["Close"],
+                                             entry["Volume"])
+
+    # There are no later entries to back-fill from, so NaN values are replaced with 0s
+    indicatorState["feature_rows"].append([0. if np.isnan(indicatorValues[indicator]) else
+                                           indicatorValues[indicator] for indicator in modelIndicators])
+
+# Save the indicator state for the next run
+indicatorState["last_date"] = chronologicalDates[-1]
+indicatorState["feature_rows"] = indicatorState["feature_rows"][-lookbackWindow:]
+save_indicator_state(indicatorState, indicatorStateFile)
+
+indicatorDataframe = pd.DataFrame(indicatorState["feature_rows"][::-1], columns=modelIndicators)
+dataframe = pd.concat([dataframe, indicatorDataframe], axis=1)
 
 # Add the owned stocks history to the dataframe
 dataframe["Owned Stocks"] = ownedData
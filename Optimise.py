@@ -16,10 +16,11 @@ import optuna
 import tensorflow as tf
 from stable_baselines import A2C
 from stable_baselines.common.policies import MlpLstmPolicy
-from stable_baselines.common.vec_env import DummyVecEnv
 
 from lib.environment.TradingEnv import TradingEnv
-from lib.utils import dataUtils
+from lib.environment.VecTradingEnv import VecTradingEnv
+from lib.utils import featureUtils
+from lib.utils.dataUtils import get_feature_set
 
 # SETUP
 tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)  # Remove ugly tensorflow warnings
@@ -37,14 +38,25 @@ parser.add_argument("-t", "--no_trials", type=int, help="Number of trials to fin
 parser.add_argument("-n", "--no_parallel_jobs", type=int, help="Number of parallel jobs", default=1)
 parser.add_argument("-f", "--output_file", type=str, help="Output name of the sqlite database",
                     default="Hyperparams.db")
+parser.add_argument("-s", "--feature_store_dir", type=str, help="Which directory should the features be stored in?",
+                    default=featureUtils.FEATURE_STORE_DIR)
+parser.add_argument("-e", "--feature_set", type=str, default="full",
+                    help="Which technical indicators should the agent observe? Either the name of a feature set (e.g. "
+                         "'full' or 'compact') or a comma-separated list of technical indicators")
+parser.add_argument("-b", "--n_envs", type=int, default=1,
+                    help="How many trading sessions should the agent train on at once?")
 parser.add_argument("-v", "--verbose", choices=["0", "1"], help="Set verbose type. 0 = None, 1 = All", default="1")
 
 args = parser.parse_args()
 
 STOCK_DIRECTORY = args.stock_dir if args.stock_dir[-1] == "/" else args.stock_dir + "/"
+FEATURE_STORE_DIRECTORY = args.feature_store_dir if args.feature_store_dir[-1] == "/" else \
+    args.feature_store_dir + "/"
 TRAINING_STOCK = args.training_stock
 TESTING_STOCK = args.testing_stock
 OUTPUT_FILE = args.output_file
+FEATURE_SET = get_feature_set(args.feature_set)
+N_ENVS = args.n_envs
 
 NO_TRIALS = args.no_trials
 NO_JOBS = args.no_parallel_jobs
@@ -53,8 +65,10 @@ VERBOSE = int(args.verbose) == 1
 
 # DATA PREPARATION
 # Get data for the training dataframe and the testing dataframe
-trainingDF = dataUtils.process_data(STOCK_DIRECTORY, TRAINING_STOCK)
-testingDF = dataUtils.process_data(STOCK_DIRECTORY, TESTING_STOCK)
+trainingDF = featureUtils.load_features(STOCK_DIRECTORY, TRAINING_STOCK, store_directory=FEATURE_STORE_DIRECTORY,
+                                        feature_set=FEATURE_SET)
+testingDF = featureUtils.load_features(STOCK_DIRECTORY, TESTING_STOCK, store_directory=FEATURE_STORE_DIRECTORY,
+                                       feature_set=FEATURE_SET)
 
 
 # OPTUNA FUNCTIONS
@@ -91,8 +105,8 @@ def optimise_agent(trial):
     if VERBOSE:
         print("Preparing the environments...")
 
-    train_env = TradingEnv(trainingDF)
-    test_env = TradingEnv(testingDF)
+    train_env = VecTradingEnv(trainingDF, n_envs=N_ENVS, feature_set=FEATURE_SET)
+    test_env = TradingEnv(testingDF, feature_set=FEATURE_SET, headless=True)
 
     # Generate model hyperparameters
     model_hyperparams = optimise_a2c(trial)
@@ -104,13 +118,15 @@ def optimise_agent(trial):
     if VERBOSE:
         print("Preparing the model...")
 
-    model = A2C(MlpLstmPolicy, DummyVecEnv([lambda: train_env]), verbose=0, **model_hyperparams)
+    model = A2C(MlpLstmPolicy, train_env, verbose=0, **model_hyperparams)
 
     # Train the A2C agent with the new hyperparameters
     if VERBOSE:
         print("Training model...")
 
-    model.learn(len(train_env.data_df))  # Run it for `len(train_env.data_df)` iterations
+    # Run it for the length of one trading session in each of the `N_ENVS` sessions
+    train_env.reset()
+    model.learn(N_ENVS * int(train_env.df_end_indices[0] - train_env.df_start_indices[0]))
 
     # Evaluate the performance of the agent
     if VERBOSE:
@@ -120,7 +136,7 @@ def optimise_agent(trial):
     obs = test_env.reset()
 
     for i in range(len(test_env.data_df)):
-        action, _ = model.predict([obs])
+        action, _ = model.predict([obs] * N_ENVS)  # The recurrent policy expects `N_ENVS` observations
         obs, reward, done, _ = test_env.step(action[0])
 
         total_inc += reward
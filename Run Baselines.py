@@ -0,0 +1,108 @@
+"""
+Run Baselines.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A program which runs the baselines on many stocks and date ranges at once, and reports their results.
+"""
+
+# IMPORTS
+import argparse
+import time
+
+import pandas as pd
+
+from lib.utils import featureUtils
+from lib.utils.baselineUtils import POLICY_NAMES
+from lib.utils.dataUtils import get_stock_symbols
+from lib.utils.runnerUtils import create_baseline_jobs, run_baselines, save_baseline_report
+
+
+# FUNCTIONS
+def parse_date_range(date_range):
+    """
+    Parses a date range.
+
+    Args:
+        date_range (str): The start date and the end date in the form YYYY-MM-DD, separated by a colon (e.g.
+                          "2018-01-01:2018-12-31"). Either date can be left out to start at the first entry or to
+                          end at the last entry.
+
+    Returns:
+        Tuple[str, str]: The start date and the end date, which are None if they were left out.
+
+    Raises:
+        argparse.ArgumentTypeError: If the date range is not two colon-separated dates.
+
+    """
+    try:
+        start_date, end_date = (date or None for date in date_range.split(":"))
+
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected the date range as 'START:END', but got '{date_range}'")
+
+    return start_date, end_date
+
+
+# ARGUMENTS
+parser = argparse.ArgumentParser(description="A program which runs the baselines on many stocks and date ranges at "
+                                             "once, and reports their results.")
+
+parser.add_argument("stock_dir", type=str, help="Which directory should the system obtain the stock data from?")
+parser.add_argument("stocks", type=str, nargs="*", default=["ALL"],
+                    help="Which stocks should the baselines be run on? Either the stock symbols or 'ALL' for every "
+                         "stock in `stock_dir`")
+
+parser.add_argument("-f", "--feature_store_dir", type=str, help="Which directory should the features be stored in?",
+                    default=featureUtils.FEATURE_STORE_DIR)
+parser.add_argument("-i", "--init_buyable_stocks", type=float, help="Initial number of stocks that can be bought.",
+                    default=2.5)
+parser.add_argument("-a", "--no_entries_taking_avg", type=int, help="Number of entries to consider when taking average",
+                    default=10)
+parser.add_argument("-p", "--policies", type=str, nargs="+", choices=POLICY_NAMES, default=POLICY_NAMES,
+                    help="Which baselines should be run?")
+parser.add_argument("-d", "--date_ranges", type=parse_date_range, nargs="+", default=[(None, None)],
+                    help="Which 'START:END' date ranges (in the form YYYY-MM-DD, inclusive) should the baselines be "
+                         "run on? Either date can be left out. Defaults to all the entries")
+parser.add_argument("-w", "--no_workers", type=int, default=None,
+                    help="How many worker processes should the jobs run in? Defaults to the number of CPUs")
+parser.add_argument("-o", "--report_file", type=str, default=None,
+                    help="Which '.json' or '.csv' file should the report be saved to?")
+
+args = parser.parse_args()
+
+STOCK_DIRECTORY = args.stock_dir if args.stock_dir[-1] == "/" else args.stock_dir + "/"
+FEATURE_STORE_DIRECTORY = args.feature_store_dir if args.feature_store_dir[-1] == "/" else \
+    args.feature_store_dir + "/"
+STOCKS = get_stock_symbols(STOCK_DIRECTORY) if args.stocks == ["ALL"] else args.stocks
+
+INIT_BUYABLE_STOCKS = args.init_buyable_stocks
+NO_ENTRIES_TAKING_AVG = args.no_entries_taking_avg
+
+POLICIES = args.policies
+DATE_RANGES = args.date_ranges
+
+NO_WORKERS = args.no_workers
+REPORT_FILE = args.report_file
+
+# CODE
+startTime = time.perf_counter()
+
+baselineJobs = create_baseline_jobs(STOCKS, policy_names=POLICIES, date_ranges=DATE_RANGES)
+reportDF = run_baselines(STOCK_DIRECTORY, baselineJobs, init_buyable_stocks=INIT_BUYABLE_STOCKS,
+                         entries_taking_avg=NO_ENTRIES_TAKING_AVG, store_directory=FEATURE_STORE_DIRECTORY,
+                         no_workers=NO_WORKERS)
+
+print(f"Ran {len(baselineJobs)} job(s) in {time.perf_counter() - startTime:.2f}s "
+      f"({(reportDF['load_time'] + reportDF['run_time']).sum():.2f}s of work).\n")
+
+with pd.option_context("display.max_rows", None, "display.width", 120, "display.float_format", "{:.3f}".format):
+    print(reportDF[["symbol", "policy", "first_date", "last_date", "no_entries", "score", "increase", "load_time",
+                    "run_time", "error"]].to_string(index=False))
+
+if REPORT_FILE is not None:
+    save_baseline_report(reportDF, REPORT_FILE)
+    print(f"\nSaved the report to '{REPORT_FILE}'.")
@@ -0,0 +1,125 @@
+"""
+Sweep Baselines.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A program which evaluates the baselines over a grid of their parameters across many stocks, and ranks
+             the results.
+"""
+
+# IMPORTS
+import argparse
+import time
+
+import pandas as pd
+
+from lib.utils import featureUtils
+from lib.utils.sweepUtils import DEFAULT_SWEEP_GRID, get_default_point, rank_sweep_results, sweep_baselines
+
+
+# FUNCTIONS
+def parse_windows(windows):
+    """
+    Parses a pair of SMA Crossover windows.
+
+    Args:
+        windows (str): The fast window and the slow window, separated by a comma (e.g. "12,26").
+
+    Returns:
+        Tuple[int, int]: The fast window and the slow window.
+
+    Raises:
+        argparse.ArgumentTypeError: If the windows are not two comma-separated integers.
+
+    """
+    try:
+        fast_window, slow_window = (int(window) for window in windows.split(","))
+
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected the windows as 'FAST,SLOW', but got '{windows}'")
+
+    return fast_window, slow_window
+
+
+# ARGUMENTS
+parser = argparse.ArgumentParser(description="A program which evaluates the baselines over a grid of their "
+                                             "parameters across many stocks, and ranks the results.")
+
+parser.add_argument("stock_dir", type=str, help="Which directory should the system obtain the stock data from?")
+parser.add_argument("stocks", type=str, nargs="*", default=["ALL"],
+                    help="Which stocks should the baselines be swept on? Either the stock symbols or 'ALL' for every "
+                         "stock in `stock_dir`")
+
+parser.add_argument("-f", "--feature_store_dir", type=str, help="Which directory should the features be stored in?",
+                    default=featureUtils.FEATURE_STORE_DIR)
+parser.add_argument("-i", "--init_buyable_stocks", type=float, help="Initial number of stocks that can be bought.",
+                    default=2.5)
+parser.add_argument("-a", "--no_entries_taking_avg", type=int, help="Number of entries to consider when taking average",
+                    default=10)
+parser.add_argument("--rsi_periods", type=int, nargs="+", default=DEFAULT_SWEEP_GRID["rsi_period"],
+                    help="Which periods should the RSI Divergence trends be found over?")
+parser.add_argument("--sma_windows", type=parse_windows, nargs="+", default=DEFAULT_SWEEP_GRID["sma_windows"],
+                    help="Which 'FAST,SLOW' window pairs should the SMA Crossover use?")
+parser.add_argument("--position_fractions", type=float, nargs="+", default=DEFAULT_SWEEP_GRID["position_fraction"],
+                    help="Which fractions of the stocks (or of the cash) should the baselines sell (or buy with)? "
+                         "Each fraction has to be in (0, 1]")
+parser.add_argument("-w", "--no_workers", type=int, default=None,
+                    help="How many worker processes should the stocks be swept in? Defaults to the number of CPUs")
+parser.add_argument("-k", "--top_k", type=int, default=10, help="How many of the best grid points should be shown?")
+parser.add_argument("-o", "--output_file", type=str, default=None,
+                    help="Which CSV file should the results of every grid point on every stock be saved to?")
+
+args = parser.parse_args()
+
+STOCK_DIRECTORY = args.stock_dir if args.stock_dir[-1] == "/" else args.stock_dir + "/"
+FEATURE_STORE_DIRECTORY = args.feature_store_dir if args.feature_store_dir[-1] == "/" else \
+    args.feature_store_dir + "/"
+STOCKS = None if args.stocks == ["ALL"] else args.stocks
+
+INIT_BUYABLE_STOCKS = args.init_buyable_stocks
+NO_ENTRIES_TAKING_AVG = args.no_entries_taking_avg
+
+SWEEP_GRID = {"rsi_period": args.rsi_periods,
+              "sma_windows": args.sma_windows,
+              "position_fraction": args.position_fractions}
+
+NO_WORKERS = args.no_workers
+TOP_K = args.top_k
+OUTPUT_FILE = args.output_file
+
+# CODE
+startTime = time.perf_counter()
+
+resultsDF, sweepErrors = sweep_baselines(STOCK_DIRECTORY, stock_symbols=STOCKS, grid=SWEEP_GRID,
+                                         init_buyable_stocks=INIT_BUYABLE_STOCKS,
+                                         entries_taking_avg=NO_ENTRIES_TAKING_AVG,
+                                         store_directory=FEATURE_STORE_DIRECTORY, no_workers=NO_WORKERS, verbose=True)
+
+print(f"Swept {resultsDF['symbol'].nunique()} stock(s) over {(~resultsDF['reference']).sum()} grid point(s) in "
+      f"{time.perf_counter() - startTime:.2f}s.\n")
+
+with pd.option_context("display.max_rows", None, "display.width", 120, "display.float_format", "{:.3f}".format):
+    # Show the best grid points across all the stocks, and the (unranked) untuned baselines for comparison
+    rankingDF = rank_sweep_results(resultsDF)
+
+    print(f" BEST {TOP_K} GRID POINTS ".center(120, "-"))
+    print(rankingDF.head(TOP_K).to_string())
+    print()
+
+    print(" UNTUNED BASELINES (NOT RANKED) ".center(120, "-"))
+    print(rankingDF[get_default_point(rankingDF)].to_string())
+    print()
+
+    # Show the best grid point of each stock
+    print(" BEST GRID POINT OF EACH STOCK ".center(120, "-"))
+    print(resultsDF[resultsDF["rank"] == 1].to_string(index=False))
+
+if OUTPUT_FILE is not None:
+    resultsDF.to_csv(OUTPUT_FILE, index=False)
+    print(f"\nSaved the results to '{OUTPUT_FILE}'.")
+
+for symbol, error in sweepErrors.items():
+    print(f"Failed to sweep the {symbol} baselines: {error!r}")
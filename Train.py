@@ -12,27 +12,36 @@ Description: A file which helps train the agent and generate the model file.
 # IMPORTS
 import argparse
 import os
+from functools import partial
 
 import optuna
 from stable_baselines import A2C
 from stable_baselines.common import set_global_seeds
 from stable_baselines.common.policies import MlpLstmPolicy
-from stable_baselines.common.vec_env import DummyVecEnv
+from stable_baselines.common.vec_env import SubprocVecEnv
 
-from lib.environment.TradingEnv import TradingEnv
-from lib.utils import baselineUtils, dataUtils, graphingUtils
+from lib.environment.TradingEnv import TradingEnv, make_shared_env, prepare_env_data, prepare_universe_data, \
+    share_env_data, unshare_env_data
+from lib.environment.VecTradingEnv import VecTradingEnv
+from lib.utils import baselineUtils, featureUtils
+from lib.utils.dataUtils import get_feature_set, save_feature_set
 from lib.utils.miscUtils import create_path, natural_sort
 
 # ARGUMENTS
 parser = argparse.ArgumentParser(description="A file which helps train the agent and generate the model file.")
 
 parser.add_argument("stock_dir", type=str, help="Which directory should the system obtain the stock data from?")
-parser.add_argument("training_stock", type=str, help="Which stock file should be used for training?")
+parser.add_argument("training_stock", type=str,
+                    help="Which stock file(s) should be used for training? Either a stock symbol, a comma-separated "
+                         "list of stock symbols, or 'ALL' for every stock in `stock_dir`. With many stocks, each "
+                         "trading session is drawn from one of the stocks")
 parser.add_argument("testing_stock", type=str, help="Which stock file should be used for testing?")
 parser.add_argument("study_file", type=str, help="Where are the parameters stored?")
 
 parser.add_argument("-d", "--model_dir", type=str, help="Which directory should the model be placed in?",
                     default="./Models/")
+parser.add_argument("-f", "--feature_store_dir", type=str, help="Which directory should the features be stored in?",
+                    default=featureUtils.FEATURE_STORE_DIR)
 parser.add_argument("-o", "--output_file_prefix", type=str, help="Prefix of the output file", default="Model")
 parser.add_argument("-i", "--init_buyable_stocks", type=float, help="Initial number of stocks that can be bought.",
                     default=2.5)
@@ -44,9 +53,33 @@ parser.add_argument("-m", "--max_trading_session", type=int,
                     help="How many entries, maximally, can the environment take as data?", default=500)
 parser.add_argument("-l", "--look_back_window", type=int, default=5,
                     help="How many entries can the model look back into?")
+parser.add_argument("-e", "--feature_set", type=str, default="full",
+                    help="Which technical indicators should the model observe? Either the name of a feature set (e.g. "
+                         "'full' or 'compact') or a comma-separated list of technical indicators")
+parser.add_argument("-b", "--n_envs", type=int, default=1,
+                    help="How many trading sessions should the agent train on at once?")
+parser.add_argument("-p", "--n_procs", type=int, default=1,
+                    help="How many worker processes should the trading sessions run in? If more than 1, each worker "
+                         "runs one trading session (replacing `n_envs`) over a memory-mapped copy of the features")
+parser.add_argument("-w", "--symbol_weights", type=str, default="uniform",
+                    help="How should the training stocks be drawn if there are many? Either 'uniform' (every stock is "
+                         "as likely), 'length' (stocks are weighted by their number of entries), or a comma-separated "
+                         "list of 'SYMBOL=WEIGHT' pairs (stocks which are left out have a weight of 1)")
 parser.add_argument("-s", "--set_seed", type=int, help="Set the seed of the program", default=None)
 parser.add_argument("-r", "--render_type", choices=["0", "1", "2"], default="0",
                     help="What should the program render? 0 = None, 1 = Only A2C Renders, 2 = All renders")
+parser.add_argument("--render_fps", type=float, default=30,
+                    help="How many frames, maximally, should be drawn per second when rendering?")
+parser.add_argument("--render_dir", type=str, default=None,
+                    help="Which directory should the rendered frames be written to? If given, nothing is displayed, "
+                         "so this works without a display")
+parser.add_argument("--render_format", choices=["png", "gif", "mp4"], default="png",
+                    help="How should the rendered frames be written? png = PNG sequence, gif = GIF, mp4 = MP4 video")
+parser.add_argument("--baseline_cache_dir", type=str, default=baselineUtils.BASELINE_CACHE_DIR,
+                    help="Which directory should the baselines' scores be cached in? Set to 'NONE' to disable the "
+                         "cache")
+parser.add_argument("--force_baselines", choices=["0", "1"], default="0",
+                    help="Should the baselines be rerun even if their scores are cached? 0 = No, 1 = Yes")
 parser.add_argument("-t", "--use_tensorboard", choices=["0", "1"], default="1",
                     help="Should the program use tensorboard? 0 = No, 1 = Yes")
 
@@ -54,8 +87,10 @@ args = parser.parse_args()
 
 STOCK_DIRECTORY = args.stock_dir if args.stock_dir[-1] == "/" else args.stock_dir + "/"
 MODEL_DIRECTORY = args.model_dir if args.model_dir[-1] == "/" else args.model_dir + "/"
+FEATURE_STORE_DIRECTORY = args.feature_store_dir if args.feature_store_dir[-1] == "/" else \
+    args.feature_store_dir + "/"
 
-TRAINING_STOCK = args.training_stock
+TRAINING_STOCKS = None if args.training_stock == "ALL" else args.training_stock.split(",")
 TESTING_STOCK = args.testing_stock
 OUTPUT_FILE_PREFIX = args.output_file_prefix
 
@@ -65,24 +100,66 @@ NO_ITERATIONS = args.no_iterations
 NO_ENTRIES_TAKING_AVG = args.no_entries_taking_avg
 MAX_TRADING_SESSION = args.max_trading_session
 LOOK_BACK_WINDOW = args.look_back_window
+FEATURE_SET = get_feature_set(args.feature_set)
+N_PROCS = args.n_procs
+N_ENVS = N_PROCS if N_PROCS > 1 else args.n_envs
+SYMBOL_WEIGHTS = args.symbol_weights if args.symbol_weights in ["uniform", "length"] else \
+    {symbol: float(weight) for symbol, weight in (pair.split("=") for pair in args.symbol_weights.split(","))}
 OPTUNA_STUDY_FILE = args.study_file
 
 SEED = args.set_seed
 
 RENDER = int(args.render_type)
+RENDER_FPS = args.render_fps
+RENDER_DIRECTORY = None if args.render_dir is None else args.render_dir if args.render_dir[-1] == "/" else \
+    args.render_dir + "/"
+RENDER_FORMAT = args.render_format
+
+BASELINE_CACHE_DIRECTORY = None if args.baseline_cache_dir == "NONE" else args.baseline_cache_dir
+FORCE_BASELINES = (args.force_baselines == "1")
 USE_TENSORBOARD = (args.use_tensorboard == "1")
 
 # SETUP
-graphingUtils.setup_graph()
+if RENDER != 0:
+    from lib.utils import graphingUtils  # The plotting modules are only imported if something is rendered
+
+    graphingUtils.setup_graph()
+
 set_global_seeds(SEED)
 
 # DATA PREPARATION
-trainingDF = dataUtils.process_data(STOCK_DIRECTORY, TRAINING_STOCK, entries_taking_avg=NO_ENTRIES_TAKING_AVG)
+if TRAINING_STOCKS is not None and len(TRAINING_STOCKS) == 1:
+    trainingDFs = {TRAINING_STOCKS[0]: featureUtils.load_features(STOCK_DIRECTORY, TRAINING_STOCKS[0],
+                                                                   entries_taking_avg=NO_ENTRIES_TAKING_AVG,
+                                                                   store_directory=FEATURE_STORE_DIRECTORY,
+                                                                   feature_set=FEATURE_SET)}
+
+else:
+    # Load (or build) the features of every training stock at once
+    trainingDFs, loadErrors = featureUtils.load_all_features(STOCK_DIRECTORY, stock_symbols=TRAINING_STOCKS,
+                                                             entries_taking_avg=NO_ENTRIES_TAKING_AVG,
+                                                             store_directory=FEATURE_STORE_DIRECTORY,
+                                                             feature_set=FEATURE_SET)
+
+    for symbol, error in loadErrors.items():
+        print(f"Not training on {symbol}, as its features could not be loaded: {error!r}")
+
+    print(f"Training on {len(trainingDFs)} stocks: {', '.join(trainingDFs)}\n")
+
+IS_MULTI_STOCK = len(trainingDFs) > 1
 
 # PREPROCESSING
 # Run baselines on training data and generate their scores
-train_baselines = baselineUtils.Baselines(trainingDF, render=(RENDER == 2))
-train_baselines.run_policies()
+for trainingStock, trainingDF in trainingDFs.items():
+    if IS_MULTI_STOCK:
+        print(f"{trainingStock}:")
+
+    train_baselines = baselineUtils.Baselines(trainingDF, render=(RENDER == 2), render_fps=RENDER_FPS,
+                                              render_dir=None if RENDER_DIRECTORY is None else
+                                              RENDER_DIRECTORY + "Training Baselines/" +
+                                              (f"{trainingStock}/" if IS_MULTI_STOCK else ""),
+                                              render_format=RENDER_FORMAT, cache_directory=BASELINE_CACHE_DIRECTORY)
+    train_baselines.run_policies(force=FORCE_BASELINES)
 
 # Obtain the best agent's parameters from the Optuna study
 print("\nLoading Optuna study hyperparameters...")
@@ -91,10 +168,32 @@ hyperparams = study.best_trial.params
 print("Successfully obtained hyperparameters!\n")
 
 # MODEL TRAINING
-# Define a environment for the agent to train on
-agentEnv = TradingEnv(trainingDF, init_buyable_stocks=INIT_BUYABLE_STOCKS, max_trading_session=MAX_TRADING_SESSION,
-                      is_serial=False, lookback_window_size=LOOK_BACK_WINDOW)
-trainEnv = DummyVecEnv([lambda: agentEnv])  # This is the environment which the agent trains on
+# Prepare the training data once. With many stocks, the stocks' features are placed one after the other in the same
+# arrays (see `prepare_universe_data`), and each trading session is drawn from one of the stocks
+if IS_MULTI_STOCK:
+    trainEnvData = prepare_universe_data(trainingDFs, feature_set=FEATURE_SET)
+
+else:
+    trainEnvData = prepare_env_data(next(iter(trainingDFs.values())), feature_set=FEATURE_SET)
+
+# Define the environment which the agent trains on, which runs `N_ENVS` trading sessions at once
+if N_PROCS > 1:
+    # Place the features in a memory-mapped file once, so that the worker processes neither copy nor recompute them
+    sharedEnvData = share_env_data(trainEnvData)
+
+    # The workers are forked, as this script would be run again in each worker if they were spawned
+    trainEnv = SubprocVecEnv([partial(make_shared_env, sharedEnvData, seed=None if SEED is None else SEED + rank,
+                                      init_buyable_stocks=INIT_BUYABLE_STOCKS, max_trading_session=MAX_TRADING_SESSION,
+                                      is_serial=False, lookback_window_size=LOOK_BACK_WINDOW, headless=True,
+                                      symbol_weights=SYMBOL_WEIGHTS)
+                              for rank in range(N_PROCS)], start_method="fork")
+
+else:
+    sharedEnvData = None
+    trainEnv = VecTradingEnv(None, n_envs=N_ENVS, init_buyable_stocks=INIT_BUYABLE_STOCKS,
+                             max_trading_session=MAX_TRADING_SESSION, is_serial=False,
+                             lookback_window_size=LOOK_BACK_WINDOW, env_data=trainEnvData,
+                             symbol_weights=SYMBOL_WEIGHTS)
 
 # Create the A2C agent
 if USE_TENSORBOARD:
@@ -106,46 +205,67 @@ else:
 # Train the agent
 model.learn(total_timesteps=NO_ITERATIONS, seed=SEED)
 
+# Stop the worker processes and delete the memory-mapped file
+trainEnv.close()
+
+if sharedEnvData is not None:
+    unshare_env_data(sharedEnvData)
+
 # MODEL EVALUATION
-# Define an evaluation environment
-a2cEnv = TradingEnv(trainingDF, init_buyable_stocks=INIT_BUYABLE_STOCKS, is_serial=True,
-                    lookback_window_size=LOOK_BACK_WINDOW)
-done = False
+a2cResults = {}  # The model's score and the initial investment amount on each training stock
 
-train_state = a2cEnv.reset(print_init_invest_amount=True)
+for trainingStock, trainingDF in trainingDFs.items():
+    # Define an evaluation environment
+    a2cEnv = TradingEnv(trainingDF, init_buyable_stocks=INIT_BUYABLE_STOCKS, is_serial=True,
+                        lookback_window_size=LOOK_BACK_WINDOW, feature_set=FEATURE_SET,
+                        record_history=(RENDER in [1, 2]), headless=(RENDER not in [1, 2]), render_fps=RENDER_FPS,
+                        render_dir=None if RENDER_DIRECTORY is None else RENDER_DIRECTORY + "Training A2C/" +
+                        (f"{trainingStock}/" if IS_MULTI_STOCK else ""), render_format=RENDER_FORMAT)
+    done = False
 
-while not done:
-    action, _ = model.predict([train_state])
+    train_state = a2cEnv.reset(print_init_invest_amount=True)
 
-    train_state, _, done, _ = a2cEnv.step(action[0])
+    while not done:
+        action, _ = model.predict([train_state] * N_ENVS)  # The recurrent policy expects `N_ENVS` observations
 
-    if RENDER in [1, 2]:
-        a2cEnv.render()
+        train_state, _, done, _ = a2cEnv.step(action[0])
 
-a2cScore = a2cEnv.get_val()  # The model's score
+        if RENDER in [1, 2]:
+            a2cEnv.render()
+
+    a2cResults[trainingStock] = (a2cEnv.get_val(), a2cEnv.init_invest)
 
 # Output results for the training environment
 print("-" * 50, "TRAINING RESULTS", "-" * 50)
-print(f"A2C got ${a2cScore:.2f} ({a2cScore / a2cEnv.init_invest * 100 - 100:.3f}% Increase)")
+for trainingStock, (a2cScore, a2cInitInvest) in a2cResults.items():
+    print(f"A2C got ${a2cScore:.2f} ({a2cScore / a2cInitInvest * 100 - 100:.3f}% Increase)" +
+          (f" on {trainingStock}" if IS_MULTI_STOCK else ""))
 print()
 
 # MODEL TESTING
 # Prepare the testing data
-testingDF = dataUtils.process_data(STOCK_DIRECTORY, TESTING_STOCK, entries_taking_avg=NO_ENTRIES_TAKING_AVG)
+testingDF = featureUtils.load_features(STOCK_DIRECTORY, TESTING_STOCK, entries_taking_avg=NO_ENTRIES_TAKING_AVG,
+                                        store_directory=FEATURE_STORE_DIRECTORY, feature_set=FEATURE_SET)
 
 # Run baselines on testing data and generate their scores
-test_baselines = baselineUtils.Baselines(testingDF, render=(RENDER == 2))
-test_baselines.run_policies()
+test_baselines = baselineUtils.Baselines(testingDF, render=(RENDER == 2), render_fps=RENDER_FPS,
+                                         render_dir=None if RENDER_DIRECTORY is None else
+                                         RENDER_DIRECTORY + "Testing Baselines/", render_format=RENDER_FORMAT,
+                                         cache_directory=BASELINE_CACHE_DIRECTORY)
+test_baselines.run_policies(force=FORCE_BASELINES)
 
 # Test how well the agent does on the testing environment
 a2cEnv = TradingEnv(testingDF, init_buyable_stocks=INIT_BUYABLE_STOCKS, is_serial=True,
-                    lookback_window_size=LOOK_BACK_WINDOW)
+                    lookback_window_size=LOOK_BACK_WINDOW, feature_set=FEATURE_SET,
+                    record_history=(RENDER in [1, 2]), headless=(RENDER not in [1, 2]), render_fps=RENDER_FPS,
+                    render_dir=None if RENDER_DIRECTORY is None else RENDER_DIRECTORY + "Testing A2C/",
+                    render_format=RENDER_FORMAT)
 done = False
 
 test_state = a2cEnv.reset(print_init_invest_amount=True)
 
 while not done:
-    action, _ = model.predict([test_state])
+    action, _ = model.predict([test_state] * N_ENVS)
 
     test_state, _, done, _ = a2cEnv.step(action[0])
 
@@ -195,5 +315,8 @@ if latestModelFile != "NO_FILE_FOUND!":  # There is a latest model
             # Conflicting names; increment `currRenameAttempt` by 1 and try again
             currRenameAttempt += 1
 
-# Save the current model as the latest model
-model.save(MODEL_DIRECTORY + f"LATEST={OUTPUT_FILE_PREFIX}_LBW-{LOOK_BACK_WINDOW}_NOI-{NO_ITERATIONS}.zip")
+# Save the current model as the latest model, recording the technical indicators which it observes
+modelFilePath = MODEL_DIRECTORY + f"LATEST={OUTPUT_FILE_PREFIX}_LBW-{LOOK_BACK_WINDOW}_NOI-{NO_ITERATIONS}.zip"
+
+model.save(modelFilePath)
+save_feature_set(modelFilePath, FEATURE_SET)
@@ -10,10 +10,9 @@ Description: A program which helps update the training data folders located in e
 """
 
 # IMPORTS
-import os
-
 from tqdm import trange
 
+from lib.utils.catalogUtils import get_file_paths, get_stock_name, load_catalog
 from lib.utils.miscUtils import natural_sort
 from lib.utils.sentimentUtils import get_sentiment_data
 from lib.utils.stockUtils import get_ohlcv_data
@@ -35,53 +34,30 @@ VERBOSE_LEVEL = int(input("\nWhat should the verbose level be?\n0 = No messages;
 print()
 
 # CODE
-# Find all stock symbols that was used for training
-stockSymbols = natural_sort([d.split("/")[2] for d in [x[0] for x in os.walk(TRAINING_DIR)][1:]])
-
-# Remove `__pycache__` from the `stockSymbols` list
-try:
-    stockSymbols.remove("__pycache__")
-
-except ValueError:
-    # If there is no `__pycache__`, then move on
-    pass
-
-# Get all the stocks' names
-stockNames = []
-for stockSymbol in stockSymbols:
-    with open(TRAINING_DIR + stockSymbol + "/Stock Info.txt") as f:
-        allLines = f.readlines()
-        fileDict = {}
-
-        for line in allLines:
-            lineContent = line.strip().replace(" ", "").split(":")
-
-            try:
-                fileDict[lineContent[0].upper()] = lineContent[1]
-
-            except IndexError:
-                pass
+# Get all the stocks that were used for training from the symbol catalog, including the stocks which could not be
+# catalogued (e.g. new stocks which only have a `Stock Info.txt` file so far)
+symbolCatalog, catalogFailures = load_catalog(TRAINING_DIR, return_failures=True)
+symbolsUpdate = natural_sort(list(symbolCatalog) + list(catalogFailures))
 
-        f.close()
-    stockNames.append(fileDict["STOCKNAME"])
+# Check what needs to be updated: All or only one
+if ALL_OR_JUST_ONE != "ALL":
+    # Find the stock that needs updating
+    if ALL_OR_JUST_ONE not in symbolsUpdate:
+        raise ValueError(f"There is no training data directory for '{ALL_OR_JUST_ONE}' in '{TRAINING_DIR}'. Create "
+                         f"'{get_file_paths(TRAINING_DIR, ALL_OR_JUST_ONE)['info']}' with the stock's name first.")
 
-# Replace all dashes in stock names with spaces
-for i in range(len(stockNames)):
-    stockNames[i] = list(stockNames)[i].replace("-", " ")
+    symbolsUpdate = [ALL_OR_JUST_ONE]
 
-# Create a symbol to name dictionary
+# Create a symbol to name dictionary (reading the names which are not in the catalog from the stocks' info files)
 symbolName = {}
-for i in range(len(stockNames)):
-    symbolName[stockSymbols[i]] = stockNames[i]
+for symbol in symbolsUpdate:
+    entry = symbolCatalog.get(symbol)
 
-# Check what needs to be updated: All or only one
-if ALL_OR_JUST_ONE != "ALL":
-    # Find the stock that needs updating
-    symbolUpdate = ALL_OR_JUST_ONE
-    nameUpdate = symbolName[symbolUpdate]
+    if entry is not None and entry["name"]:
+        symbolName[symbol] = entry["name"]
 
-    # Update `symbolName` with that stock
-    symbolName = {symbolUpdate: nameUpdate}
+    else:
+        symbolName[symbol] = get_stock_name(TRAINING_DIR, symbol)  # Raises an error if the name is missing
 
 # Update each stock's training data (i.e. the OHLCV data and the sentiment data)
 if VERBOSE_LEVEL == 0:
@@ -98,7 +74,7 @@ for i in iterable:
 
     # Update the OHLCV data
     get_ohlcv_data(symbol, START_DATE, END_DATE, save_as_csv=True, verbose=(VERBOSE_LEVEL != 0),
-                   file_location=TRAINING_DIR + symbol + "/" + symbol + "_stocks.csv")
+                   file_location=get_file_paths(TRAINING_DIR, symbol)["stocks"])
 
     # Update the sentiment data
     if VERBOSE_LEVEL > 0:
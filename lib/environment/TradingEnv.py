@@ -9,14 +9,351 @@ Copyright Ryan Kan 2019
 Description: The trading environment for the A2C agent.
 """
 # IMPORTS
+import sys
+
 import gym
 import numpy as np
 import pandas as pd
-from matplotlib import pyplot as plt
-from sklearn import preprocessing
 
-from lib.utils.graphingUtils import setup_graph
-from lib.utils.dataUtils import add_technical_indicators
+from lib.utils.bufferUtils import HistoryBuffer
+from lib.utils.dataUtils import TECHNICAL_INDICATORS, add_technical_indicators, get_feature_set
+from lib.utils.sharedMemoryUtils import attach_shared_arrays, create_shared_arrays, delete_shared_arrays
+
+# CONSTANTS
+SHARED_ENV_ARRAYS = ["feature_arr", "feature_min", "feature_max", "open_prices", "close_prices"]
+
+
+# FUNCTIONS
+def prepare_env_data(data_df, feature_set=None):
+    """
+    Prepares the data of a trading environment, so that pandas is not needed after this point.
+
+    Args:
+        data_df (pd.DataFrame): A pandas dataframe containing all the environment's data (see `TradingEnv`).
+
+        feature_set (Union[str, List[str]]): Which technical indicators should be observed (see `TradingEnv`)?
+                                             (Default = None, which means that every technical indicator is
+                                             observed)
+
+    Returns:
+        dict: The prepared data, with the following keys:
+              - "full_data_df": The dataframe with only the selected technical indicators.
+              - "indicators": The selected technical indicators.
+              - "feature_arr": The observed values as a contiguous float32 array, with a row for each column of
+                               "full_data_df" (like the observation).
+              - "feature_min" and "feature_max": The smallest and largest observed value of each entry, which are
+                                                 needed to normalise the observation.
+              - "open_prices" and "close_prices": NumPy views of the "Open" and "Close" columns.
+
+    """
+    indicators = get_feature_set(feature_set)
+
+    # Keep only the selected technical indicators in `data_df`, adding them if they were not already added (e.g. by
+    # the feature store)
+    data_columns = [column for column in data_df.columns if column not in TECHNICAL_INDICATORS]
+
+    if not set(indicators).issubset(data_df.columns):
+        data_df = add_technical_indicators(data_df[data_columns].copy(), indicators)
+
+    elif list(data_df.columns) != data_columns + indicators:
+        data_df = data_df[data_columns + indicators]
+
+    # Precompute the observed values
+    feature_arr = np.ascontiguousarray(data_df.values.astype(np.float32).T)
+
+    return {"full_data_df": data_df,
+            "indicators": indicators,
+            "feature_arr": feature_arr,
+            "feature_min": np.nanmin(feature_arr, axis=0),
+            "feature_max": np.nanmax(feature_arr, axis=0),
+            "open_prices": data_df["Open"].to_numpy(),
+            "close_prices": data_df["Close"].to_numpy()}
+
+
+def generate_session(full_data_df_len, lookback_window, max_trading_session, serial):
+    """
+    Generates the range of entries used in a trading session.
+
+    Args:
+        full_data_df_len (int): The number of entries in the environment's data.
+
+        lookback_window (int): How many entries can the agent look back into?
+
+        max_trading_session (int): How many entries, maximally, can the trading session take as data?
+
+        serial (bool): Whether the environment is serial or not. If True, the environment is serial.
+                       If False, the environment is not serial.
+
+    Returns:
+        int: The index of the first entry of the trading session.
+        int: The index after the last entry of the trading session.
+
+    """
+    if serial:  # No need to randomise the start and end positions
+        # Use all of the values
+        return lookback_window, full_data_df_len - 1
+
+    # Generate a random range for training
+    local_max_trading_session = min(max_trading_session, full_data_df_len)
+
+    session_len = np.random.randint(lookback_window + 1, local_max_trading_session) - lookback_window
+    start_index = np.random.randint(lookback_window, full_data_df_len - session_len)
+
+    return start_index, start_index + session_len
+
+
+def prepare_universe_data(data_dfs, feature_set=None):
+    """
+    Prepares the data of many stocks as a single trading environment's data (a "universe"), so that each trading
+    session can be drawn from any of the stocks (see `generate_universe_session`).
+
+    The stocks' entries are placed one after the other in the same arrays, so every array is only held once (even
+    if the environment is shared by many sessions or processes), and the environment's accounting and observations
+    work unchanged. The trading sessions never cross from one stock into the next.
+
+    Args:
+        data_dfs (Dict[str, pd.DataFrame]): The data of each stock (see `TradingEnv`), keyed by the stock symbol.
+
+        feature_set (Union[str, List[str]]): Which technical indicators should be observed (see `TradingEnv`)?
+                                             (Default = None, which means that every technical indicator is
+                                             observed)
+
+    Returns:
+        dict: The prepared data, in the same format as `prepare_env_data` (where "full_data_df" is a float32
+              dataframe over "feature_arr"), with the following extra keys:
+              - "symbols": The stock symbols, in the order of their entries.
+              - "symbol_offsets": The index of the first entry of each stock, followed by the number of entries.
+
+    Raises:
+        ValueError: If there are no stocks, or if the stocks do not have the same columns.
+
+    """
+    if len(data_dfs) == 0:
+        raise ValueError("Expected the data of at least one stock, but got none")
+
+    symbols = list(data_dfs)
+    symbol_offsets = np.concatenate(([0], np.cumsum([len(data_dfs[symbol]) for symbol in symbols]))).astype(np.int64)
+
+    feature_arr = None
+    open_prices, close_prices = [], []
+
+    # Prepare the stocks one at a time, copying each into its place in the universe's arrays
+    for symbol_index, symbol in enumerate(symbols):
+        env_data = prepare_env_data(data_dfs[symbol], feature_set=feature_set)
+
+        if feature_arr is None:
+            columns, indicators = list(env_data["full_data_df"].columns), env_data["indicators"]
+            feature_arr = np.empty((len(columns), symbol_offsets[-1]), dtype=np.float32)
+
+        elif list(env_data["full_data_df"].columns) != columns:
+            raise ValueError(f"The columns of {symbol} do not match the columns of {symbols[0]}")
+
+        feature_arr[:, symbol_offsets[symbol_index]:symbol_offsets[symbol_index + 1]] = env_data["feature_arr"]
+        open_prices.append(env_data["open_prices"])
+        close_prices.append(env_data["close_prices"])
+
+    return {"full_data_df": pd.DataFrame(feature_arr.T, columns=columns, copy=False),
+            "indicators": indicators,
+            "feature_arr": feature_arr,
+            "feature_min": np.nanmin(feature_arr, axis=0),
+            "feature_max": np.nanmax(feature_arr, axis=0),
+            "open_prices": np.concatenate(open_prices),
+            "close_prices": np.concatenate(close_prices),
+            "symbols": symbols,
+            "symbol_offsets": symbol_offsets}
+
+
+def get_symbol_probabilities(symbols, symbol_offsets, lookback_window, max_trading_session, symbol_weights=None):
+    """
+    Gets the probability of drawing each stock of a universe (see `prepare_universe_data`) for a trading session.
+
+    Stocks which have too few entries for a trading session are never drawn.
+
+    Args:
+        symbols (List[str]): The stock symbols.
+
+        symbol_offsets (np.ndarray): The index of the first entry of each stock, followed by the number of entries.
+
+        lookback_window (int): How many entries can the agent look back into?
+
+        max_trading_session (int): How many entries, maximally, can the trading session take as data?
+
+        symbol_weights (Union[str, Dict[str, float]]): The sampling weights of the stocks. This is either
+                                                       "uniform" (every stock is as likely), "length" (stocks are
+                                                       weighted by their number of entries), or the weight of each
+                                                       stock, keyed by the stock symbol (stocks which are left out
+                                                       have a weight of 1). (Default = None, which means "uniform")
+
+    Returns:
+        np.ndarray: The probability of each stock.
+
+    Raises:
+        ValueError: If the weights are invalid, or if no stock can be drawn.
+
+    Examples:
+        >>> get_symbol_probabilities(["A", "B", "C"], np.array([0, 100, 400, 403]), 5, 100, symbol_weights="length")
+        array([0.25, 0.75, 0.  ])
+
+    """
+    symbol_lengths = np.diff(symbol_offsets)
+
+    if symbol_weights is None or symbol_weights == "uniform":
+        weights = np.ones(len(symbols))
+
+    elif symbol_weights == "length":
+        weights = symbol_lengths.astype(np.float64)
+
+    elif isinstance(symbol_weights, dict):
+        unknown_symbols = set(symbol_weights) - set(symbols)
+        if unknown_symbols:
+            raise ValueError(f"Got weights for unknown stocks: {', '.join(sorted(unknown_symbols))}")
+
+        weights = np.array([symbol_weights.get(symbol, 1) for symbol in symbols], dtype=np.float64)
+
+        if np.any(weights < 0):
+            raise ValueError("The weights of the stocks cannot be negative")
+
+    else:
+        raise ValueError(f"Expected 'uniform', 'length' or a dictionary of weights, but got {symbol_weights!r}")
+
+    # A trading session needs at least one step after the lookback window (see `generate_session`)
+    weights[np.minimum(symbol_lengths, max_trading_session) <= lookback_window + 1] = 0
+
+    if weights.sum() == 0:
+        raise ValueError("None of the stocks can be drawn, as they have too few entries or a weight of 0")
+
+    return weights / weights.sum()
+
+
+def generate_universe_session(symbol_offsets, symbol_probabilities, lookback_window, max_trading_session, serial,
+                              session_no=0):
+    """
+    Generates the stock and the range of entries used in a trading session of a universe (see
+    `prepare_universe_data`).
+
+    Args:
+        symbol_offsets (np.ndarray): The index of the first entry of each stock, followed by the number of entries.
+
+        symbol_probabilities (np.ndarray): The probability of drawing each stock (see `get_symbol_probabilities`).
+
+        lookback_window (int): How many entries can the agent look back into?
+
+        max_trading_session (int): How many entries, maximally, can the trading session take as data?
+
+        serial (bool): Whether the environment is serial or not. If True, the trading sessions go through all the
+                       entries of each stock which can be drawn, one stock after the other. If False, the stock is
+                       drawn at random, and then the range of entries is drawn like `generate_session` does.
+
+        session_no (int): The number of trading sessions before this one, which picks the stock of a serial
+                          environment. (Default = 0)
+
+    Returns:
+        int: The index of the stock.
+        int: The index of the first entry of the trading session.
+        int: The index after the last entry of the trading session.
+
+    """
+    if serial:
+        drawable_indices = np.flatnonzero(symbol_probabilities)
+        symbol_index = drawable_indices[session_no % len(drawable_indices)]
+
+    else:
+        symbol_index = np.random.choice(len(symbol_probabilities), p=symbol_probabilities)
+
+    # Draw the range of entries within the stock
+    offset = symbol_offsets[symbol_index]
+    start_index, end_index = generate_session(symbol_offsets[symbol_index + 1] - offset, lookback_window,
+                                              max_trading_session, serial)
+
+    return symbol_index, offset + start_index, offset + end_index
+
+
+def share_env_data(env_data, directory=None):
+    """
+    Places the data of a trading environment in a memory-mapped file, so that environments in other processes can
+    use it without copying or recomputing it (see `make_shared_env`).
+
+    Args:
+        env_data (dict): The prepared data, as returned by `prepare_env_data`.
+
+        directory (str): The directory to create the file in (see `sharedMemoryUtils.create_shared_arrays`).
+                         (Default = None, which means that the system's temporary directory is used)
+
+    Returns:
+        dict: A small, picklable description of the shared data, which is passed to `attach_env_data`. The file
+              has to be deleted with `unshare_env_data` once the other processes are done with it.
+
+    """
+    shared_arrays = {key: env_data[key] for key in SHARED_ENV_ARRAYS}
+
+    if "symbol_offsets" in env_data:  # The data of a universe (see `prepare_universe_data`)
+        shared_arrays["symbol_offsets"] = env_data["symbol_offsets"]
+
+    return {"layout": create_shared_arrays(shared_arrays, directory=directory),
+            "columns": list(env_data["full_data_df"].columns),
+            "index": env_data["full_data_df"].index,
+            "indicators": env_data["indicators"],
+            "symbols": env_data.get("symbols")}
+
+
+def attach_env_data(shared_env_data):
+    """
+    Attaches to the data of a trading environment which was placed in a memory-mapped file by `share_env_data`.
+
+    Args:
+        shared_env_data (dict): The description of the shared data, as returned by `share_env_data`.
+
+    Returns:
+        dict: The prepared data, in the same format as `prepare_env_data`. All the arrays are read-only views of
+              the memory-mapped file, and "full_data_df" is a float32 dataframe over "feature_arr".
+
+    """
+    env_data = attach_shared_arrays(shared_env_data["layout"])
+
+    env_data["full_data_df"] = pd.DataFrame(env_data["feature_arr"].T, index=shared_env_data["index"],
+                                            columns=shared_env_data["columns"], copy=False)
+    env_data["indicators"] = shared_env_data["indicators"]
+
+    if shared_env_data["symbols"] is not None:
+        env_data["symbols"] = shared_env_data["symbols"]
+
+    return env_data
+
+
+def unshare_env_data(shared_env_data):
+    """
+    Deletes the memory-mapped file which was created by `share_env_data`.
+
+    Args:
+        shared_env_data (dict): The description of the shared data, as returned by `share_env_data`.
+
+    """
+    delete_shared_arrays(shared_env_data["layout"])
+
+
+def make_shared_env(shared_env_data, seed=None, **env_kwargs):
+    """
+    Creates a trading environment which uses data in a memory-mapped file.
+
+    This is meant to be called in a worker process (e.g. as an environment function of `SubprocVecEnv`, using
+    `functools.partial`), as only the small `shared_env_data` is sent to the worker.
+
+    Args:
+        shared_env_data (dict): The description of the shared data, as returned by `share_env_data`.
+
+        seed (int): The seed of the process' NumPy random number generator, which generates the trading sessions.
+                    (Default = None, which means that fresh entropy is used, so that forked workers do not all
+                    generate the same trading sessions)
+
+        **env_kwargs: The other arguments of `TradingEnv`.
+
+    Returns:
+        TradingEnv: The trading environment.
+
+    """
+    np.random.seed(seed)
+
+    return TradingEnv(None, env_data=attach_env_data(shared_env_data), **env_kwargs)
 
 
 # CLASSES
@@ -31,10 +368,16 @@ class TradingEnv(gym.Env):
                   The action space consists of the following:
                   - 3 Actions: Sell [0], Hold [1], Buy [2]
                   - 5 Amounts: 1/5 of total, 2/5 of total, 3/5 of total etc.
+
+    Prices: The `open_prices` and `close_prices` attributes are NumPy views of the "Open" and "Close" columns of
+            `full_data_df`, indexed by the step (e.g. `self.close_prices[self.cur_step]`). The environment's
+            accounting only uses these views, and subclasses and baselines should use them too, as indexing
+            `full_data_df` goes through pandas and is much slower.
     """
 
     def __init__(self, data_df, init_buyable_stocks=2.5, lookback_window_size=5, is_serial=False,
-                 max_trading_session=100):
+                 max_trading_session=100, feature_set=None, env_data=None, record_history=False, headless=False,
+                 render_fps=30, render_dir=None, render_format="png", symbol_weights=None):
         """
         Initialization method for the trading environment.
 
@@ -42,7 +385,8 @@ class TradingEnv(gym.Env):
             data_df (pd.DataFrame): A pandas dataframe containing all the environment's data.
 
                                     This environment would usually contain the OHLCV data, the sentiment data
-                                    and the technical indicator values.
+                                    and the technical indicator values. If the technical indicators are not in
+                                    the dataframe, they will be added.
 
             init_buyable_stocks (float): The number of stocks that the agent can buy on the first step.
                                          (Default = 2.5)
@@ -88,6 +432,53 @@ class TradingEnv(gym.Env):
                                        `max_trading_session` would be the UPPER BOUND of the value of j.
                                        I.E. i < j <= `max_trading_session`.
 
+            feature_set (Union[str, List[str]]): Which technical indicators should the agent observe? (Default =
+                                                 None, which means that every technical indicator is observed)
+
+                                                 This is either the name of a feature set in
+                                                 `dataUtils.FEATURE_SETS`, a comma-separated string of technical
+                                                 indicators, or a list of technical indicators. Indicators which
+                                                 are not selected are dropped from `data_df`, and if they are not
+                                                 in `data_df`, they will not be computed. A smaller feature set
+                                                 gives a smaller observation.
+
+            env_data (dict): The already prepared data, as returned by `prepare_env_data`, `prepare_universe_data`
+                             or `attach_env_data`. If this is given, `data_df` and `feature_set` are ignored.
+                             (Default = None)
+
+                             If the data is a universe of many stocks, each trading session is drawn from one of
+                             the stocks (see `generate_universe_session`), and `symbol` is the current session's
+                             stock.
+
+            record_history (bool): Should the environment record the full history of each trading session (the
+                                   net worths, the actions taken and the amounts)? (Default = False)
+
+                                   The history is needed to render the environment. If it is not recorded, only
+                                   the latest values which are needed for the rewards and the observations are
+                                   kept, so the memory used stays the same however long the trading session is.
+
+            headless (bool): Should the environment run without any plotting? (Default = False)
+
+                             A headless environment never touches matplotlib: `reset` does not clear the current
+                             figure and `render` does nothing. Otherwise, matplotlib is only imported when `render`
+                             is first called, and `reset` only clears the current figure once matplotlib has been
+                             imported.
+
+            render_fps (float): The maximum number of frames drawn per second when rendering live, and the frame
+                                rate of the rendered videos (see `TradingRenderer`). (Default = 30)
+
+            render_dir (str): The directory which the rendered frames are written to, without a display (see
+                              `TradingRenderer`). (Default = None, which means that the environment is rendered
+                              live)
+
+            render_format (str): The format of the rendered frames: "png" (a PNG sequence), "gif" or "mp4".
+                                 (Default = "png")
+
+            symbol_weights (Union[str, Dict[str, float]]): The sampling weights of the stocks of a universe (see
+                                                           `get_symbol_probabilities`). This is ignored if the data
+                                                           is of a single stock. (Default = None, which means that
+                                                           every stock is as likely)
+
         Raises:
             AssertionError: If init_buyable_stocks < 1.
 
@@ -97,39 +488,60 @@ class TradingEnv(gym.Env):
         assert init_buyable_stocks > 1, "The value of `init_buyable_stocks` has to be greater than 1."
 
         # Convert given data into variables
-        self.full_data_df = data_df  # Dataframe where all the data is stored
         self.init_buyable_stocks = init_buyable_stocks  # Initial number of stocks which the agent can buy
         self.lookback_window = lookback_window_size
         self.is_serial = is_serial  # Whether the environment is serial or not
         self.max_trading_session = max_trading_session  # The maximum length for a trading session
 
-        # Add technical indicators to `full_data_df`
-        self.full_data_df = add_technical_indicators(self.full_data_df)
+        # Prepare the data (see `prepare_env_data`)
+        if env_data is None:
+            env_data = prepare_env_data(data_df, feature_set=feature_set)
+
+        self.full_data_df = env_data["full_data_df"]  # Dataframe where all the data is stored
+        self.indicators = env_data["indicators"]  # The technical indicators which are observed
+
+        self.feature_arr = env_data["feature_arr"]
+        self.feature_min = env_data["feature_min"]
+        self.feature_max = env_data["feature_max"]
+
+        self.open_prices = env_data["open_prices"]
+        self.close_prices = env_data["close_prices"]
+
+        # The stocks of a universe (see `prepare_universe_data`), which are None if the data is of a single stock
+        self.symbols = env_data.get("symbols")
+        self.symbol_offsets = env_data.get("symbol_offsets")
+        self.symbol_probabilities = None if self.symbols is None else get_symbol_probabilities(
+            self.symbols, self.symbol_offsets, self.lookback_window, self.max_trading_session, symbol_weights)
 
-        # Create the current iteration's dataframe, also known as `data_df`
+        self.symbol = None  # The stock of the current trading session
+        self.session_no = 0  # The number of trading sessions which have been generated
+
+        # Create the current iteration's range of entries (see `data_df`)
         self.full_data_df_len = len(self.full_data_df)
         self.data_df_len = None
 
         self.df_start_index = None
         self.df_end_index = None
 
-        self.data_df = None
         self.generate_data_df(self.is_serial)
 
         # Other variables
         self.cur_step = self.df_start_index
-        self.init_invest = self.init_buyable_stocks * self.data_df["Close"].iloc[0]  # First element of the dataframe
+        self.init_invest = self.init_buyable_stocks * self.close_prices[self.df_start_index]  # First entry's close
         self.stock_owned = None
         self.cash_in_hand = None
         self.done = False
-        self.actions_taken = []
-        self.actions_amount = []
 
-        # Reward function variables
-        self.net_worths = None
+        # History buffers (see `HistoryBuffer`), which are preallocated for the longest possible trading session
+        self.record_history = record_history
+        longest_session = self.full_data_df_len if self.symbols is None else np.max(np.diff(self.symbol_offsets))
+        history_capacity = self.lookback_window + longest_session if self.record_history else None
 
-        # Observation space variables
-        self.stock_owned_history = None
+        self.net_worth_buffer = HistoryBuffer(max(self.lookback_window, 2), dtype=np.float64,
+                                              capacity=history_capacity)  # The reward needs the last 2 net worths
+        self.stock_owned_buffer = HistoryBuffer(self.lookback_window, dtype=np.int64, capacity=history_capacity)
+        self.action_type_buffer = HistoryBuffer(0, dtype=np.int64, capacity=history_capacity)
+        self.action_amount_buffer = HistoryBuffer(0, dtype=np.float64, capacity=history_capacity)
 
         # Define the action space
         self.action_space = gym.spaces.MultiDiscrete([3, 5])  # 3 actions, with 5 amounts
@@ -140,20 +552,59 @@ class TradingEnv(gym.Env):
                                                 dtype=np.float32)
 
         # Rendering variables
-        self.fig = None
-        self.net_worth_ax = None
-        self.net_worth_annotation = None
-        self.net_worth_line = None
-        self.stock_ax = None
-        self.stock_line = None
-        self.stock_annotation = None
+        self.headless = headless  # Whether the environment never plots anything
+        self.render_fps = render_fps
+        self.render_dir = render_dir
+        self.render_format = render_format
+        self.renderer = None  # Created when the environment is first rendered (see `render`)
 
         # Reset the environment
         self.reset()
+        self.session_no = 0  # A serial environment's next reset starts again from the first stock
+
+    @property
+    def data_df(self):
+        """
+        pd.DataFrame: The entries of `full_data_df` which are used in the current iteration.
+        """
+        return self.full_data_df[self.df_start_index: self.df_end_index]
+
+    @property
+    def net_worths(self):
+        """
+        np.ndarray: The net worths of the current trading session, starting with `lookback_window` copies of the
+                    initial investment. Only the latest net worths are kept if the history is not recorded.
+        """
+        return self.net_worth_buffer.values()
+
+    @property
+    def stock_owned_history(self):
+        """
+        np.ndarray: The number of stocks owned after each step of the current trading session, starting with
+                    `lookback_window` zeros. Only the latest `lookback_window` values are kept if the history is not
+                    recorded.
+        """
+        return self.stock_owned_buffer.values()
+
+    @property
+    def actions_taken(self):
+        """
+        np.ndarray: The action type of each step of the current trading session (see `step`). This is empty if
+                    the history is not recorded.
+        """
+        return self.action_type_buffer.values()
+
+    @property
+    def actions_amount(self):
+        """
+        np.ndarray: The action amount of each step of the current trading session, which is negative for sells and
+                    0 for holds. This is empty if the history is not recorded.
+        """
+        return self.action_amount_buffer.values()
 
     def generate_data_df(self, serial):
         """
-        Generates the new `data_df` for the current iteration.
+        Generates the range of entries used in the current iteration (i.e. the new `data_df`).
 
         Args:
             serial (bool): Whether the environment is serial or not. If True, the environment is serial.
@@ -161,23 +612,18 @@ class TradingEnv(gym.Env):
 
         """
 
-        if serial:  # No need to randomise the start and end positions
-            # Use all of the data_df values
-            self.df_start_index = self.lookback_window
-            self.df_end_index = self.full_data_df_len - 1
-
-            self.data_df_len = self.df_end_index - self.df_start_index
+        if self.symbols is None:
+            self.df_start_index, self.df_end_index = generate_session(self.full_data_df_len, self.lookback_window,
+                                                                      self.max_trading_session, serial)
 
         else:
-            # Generate a random range for training
-            local_max_trading_session = min(self.max_trading_session, self.full_data_df_len)
-
-            self.data_df_len = np.random.randint(self.lookback_window + 1,
-                                                 local_max_trading_session) - self.lookback_window
-            self.df_start_index = np.random.randint(self.lookback_window, self.full_data_df_len - self.data_df_len)
-            self.df_end_index = self.df_start_index + self.data_df_len
+            symbol_index, self.df_start_index, self.df_end_index = generate_universe_session(
+                self.symbol_offsets, self.symbol_probabilities, self.lookback_window, self.max_trading_session,
+                serial, session_no=self.session_no)
+            self.symbol = self.symbols[symbol_index]
 
-        self.data_df = self.full_data_df[self.df_start_index: self.df_end_index]
+        self.data_df_len = self.df_end_index - self.df_start_index
+        self.session_no += 1
 
     def reset(self, print_init_invest_amount=False):
         """
@@ -198,26 +644,18 @@ class TradingEnv(gym.Env):
         # Reset all needed variables
         self.cur_step = self.df_start_index  # Step reset to the new starting index
         self.stock_owned = 0  # Obviously, remove all stocks from the agent
-        self.init_invest = self.init_buyable_stocks * self.data_df["Close"].iloc[0]
+        self.init_invest = self.init_buyable_stocks * self.close_prices[self.df_start_index]
         self.cash_in_hand = self.init_invest  # Initial investment amount is what we started with
 
-        # Reset lists
-        self.actions_taken = []  # No actions taken
-        self.actions_amount = []  # No amounts recorded
-        self.net_worths = [self.init_invest] * self.lookback_window
-        self.stock_owned_history = [0] * self.lookback_window
-
-        # Reset rendering variables
-        self.fig = None
-        self.net_worth_ax = None
-        self.net_worth_annotation = None
-        self.net_worth_line = None
-        self.stock_ax = None
-        self.stock_line = None
-        self.stock_annotation = None
+        # Reset the history buffers
+        self.net_worth_buffer.reset(self.init_invest)
+        self.stock_owned_buffer.reset(0)
+        self.action_type_buffer.reset()  # No actions taken
+        self.action_amount_buffer.reset()  # No amounts recorded
 
-        # Clear current figure
-        plt.clf()
+        # Clear current figure (if matplotlib is in use)
+        if not self.headless and self.render_dir is None and "matplotlib.pyplot" in sys.modules:
+            sys.modules["matplotlib.pyplot"].clf()
 
         # Print initial investment amount (if needed)
         if print_init_invest_amount:
@@ -271,13 +709,13 @@ class TradingEnv(gym.Env):
         self.update_stocks(action)
 
         # What's changed?
-        self.net_worths.append(self.get_val())  # `self.get_val()` is the current net worth
+        self.net_worth_buffer.append(self.get_val())  # `self.get_val()` is the current net worth
 
         # Generate current iteration's reward
         reward = self.gen_reward()
 
         # Update the info
-        info = {'cur_val': self.net_worths[-1]}
+        info = {'cur_val': self.net_worth_buffer.latest()}
 
         return self.get_obs(), reward, self.done, info
 
@@ -296,38 +734,42 @@ class TradingEnv(gym.Env):
         # Split `action` into the "Action Type" and "Action Amount"
         action_type = action[0]  # Sell: 0, Hold: 1, Buy: 2
         action_amount = (action[1] + 1) / 5  # Representing 1/5, 2/5, 3/5 etc. Add 1 as action amounts are from 0 to 4
+        close_price = self.close_prices[self.cur_step]
 
         if action_type == 0:  # Sell
             stock_sold = int(self.stock_owned * action_amount)  # We don't want partial stocks
 
             # Handle addition of money and the subtraction of stocks
-            self.cash_in_hand += self.full_data_df["Close"][self.cur_step] * stock_sold
+            self.cash_in_hand += close_price * stock_sold
             self.stock_owned -= stock_sold
 
         elif action_type == 1:  # Hold
             pass
 
         elif action_type == 2:  # Buy
-            stock_bought = int((self.cash_in_hand / self.full_data_df["Close"][self.cur_step]) * action_amount)
+            stock_bought = int((self.cash_in_hand / close_price) * action_amount)
 
             # Handle addition of stocks and the subtraction of money
-            self.cash_in_hand -= self.full_data_df["Close"][self.cur_step] * stock_bought
+            self.cash_in_hand -= close_price * stock_bought
             self.stock_owned += stock_bought
 
         # Append new stock quantity to `stock_owned_history`
-        self.stock_owned_history.append(self.stock_owned)
+        self.stock_owned_buffer.append(self.stock_owned)
+
+        if not self.record_history:
+            return
 
         # Append "Action Type" to `actions_taken`
-        self.actions_taken.append(action[0])
+        self.action_type_buffer.append(action[0])
 
         # Append "Action Amount" to `actions_amount`
         # NOTE: Negative values = Sell
         if action_type == 0:  # Sell
-            self.actions_amount.append(-(action[1] + 1) / 5)
+            self.action_amount_buffer.append(-(action[1] + 1) / 5)
         elif action_type == 1:  # Hold
-            self.actions_amount.append(0)
+            self.action_amount_buffer.append(0)
         else:  # Buy
-            self.actions_amount.append((action[1] + 1) / 5)
+            self.action_amount_buffer.append((action[1] + 1) / 5)
 
     def get_val(self):
         """
@@ -338,7 +780,7 @@ class TradingEnv(gym.Env):
 
         """
 
-        return self.stock_owned * self.full_data_df["Close"][self.cur_step] + self.cash_in_hand
+        return self.stock_owned * self.close_prices[self.cur_step] + self.cash_in_hand
 
     def gen_reward(self):
         """
@@ -352,7 +794,7 @@ class TradingEnv(gym.Env):
             float: The reward for the current step.
         """
 
-        reward = self.net_worths[-1] - self.net_worths[-2]
+        reward = self.net_worth_buffer.latest() - self.net_worth_buffer.latest(1)
 
         return reward
 
@@ -360,23 +802,32 @@ class TradingEnv(gym.Env):
         """
         Processes and returns the observation array.
 
+        The observation is the last `lookback_window` entries of `feature_arr`, with the `stock_owned_history` as
+        an extra row. Each entry (i.e. each column of the observation) is min-max normalised in float32, giving the
+        same values as `sklearn.preprocessing.MinMaxScaler().fit_transform`. The smallest and largest values of
+        the entries' features are precomputed, so only the `stock_owned_history` row is compared at each step.
+
         Returns:
             np.ndarray: The observation array for the current step.
 
         """
+        start_index = self.cur_step - self.lookback_window
 
-        # Add dataframe values
-        obs = self.full_data_df[self.cur_step - self.lookback_window: self.cur_step].transpose().values.tolist()
+        # Add the feature values and the stock_owned_history
+        obs = np.empty((len(self.feature_arr) + 1, self.lookback_window), dtype=np.float32)
+        obs[:-1] = self.feature_arr[:, start_index:self.cur_step]
+        obs[-1] = self.stock_owned_buffer.window()
 
-        # Add the stock_owned_history to the observation list
-        obs.append(self.stock_owned_history[-self.lookback_window:])
-
-        # Convert obs to np.ndarray
-        obs = np.array(obs)
+        # Find the range of each entry (near constant entries are not scaled)
+        data_min = np.fmin(self.feature_min[start_index:self.cur_step], obs[-1])
+        data_range = np.fmax(self.feature_max[start_index:self.cur_step], obs[-1]) - data_min
+        data_range[data_range < 10 * np.finfo(np.float32).eps] = 1
 
         # Normalise values
-        min_max_scaler = preprocessing.MinMaxScaler()
-        obs = min_max_scaler.fit_transform(obs.astype("float32"))
+        scale = np.float32(1) / data_range
+
+        obs *= scale
+        obs += np.float32(0) - data_min * scale
 
         # Return observation list
         return obs
@@ -391,136 +842,37 @@ class TradingEnv(gym.Env):
                         By default, there are three modes: "human", "system" and "none".
 
                         If the mode is "human", then the environment's rendering function will run
-                        and will display the current net worth and the current stock price.
+                        and will display the current net worth and the current stock price (see
+                        `TradingRenderer`), either live or into the frames in `render_dir`.
 
                         If not, then the environment will not render anything.
 
-        TODO:
-            - (Ryan-Kan, 0.2.1) Update rendering function to work with command-line execution
+                        A headless environment does not render anything in any mode.
+
+        Raises:
+            ValueError: If the environment does not record the history, which is needed for rendering.
 
         """
 
-        if mode == "human":
-            if self.cur_step == self.df_start_index + 1:
-                # Render setup
-                setup_graph()
-
-                # Set up axes
-                self.fig, (self.net_worth_ax, self.stock_ax) = plt.subplots(2, sharex="all")
-
-                # Update axes titles
-                self.net_worth_ax.title.set_text("Net Worth")
-                self.stock_ax.title.set_text("Stock Price")
-
-                # Set the scales
-                self.net_worth_ax.set_xlim([self.df_start_index - 1, self.df_end_index])  # This is a known limit
-
-                # Set up dummy variables
-                (self.net_worth_line,) = self.net_worth_ax.plot(np.linspace(0, 0, self.data_df_len),
-                                                                np.linspace(0, 0, self.data_df_len), color="b")
-                self.net_worth_annotation = self.net_worth_ax.text(0, 0, "0",
-                                                                   bbox=dict(boxstyle='round', fc='w', ec='k', lw=1))
-
-                self.stock_line, = self.stock_ax.plot(np.linspace(0, 0, self.data_df_len),
-                                                      np.linspace(0, 0, self.data_df_len), color="r")
-                self.stock_annotation = self.stock_ax.text(0, 0, "0", bbox=dict(boxstyle='round', fc='w', ec='k', lw=1))
-
-            # Update data of the net worth line
-            self.net_worth_line.set_xdata(range(self.df_start_index, self.cur_step))
-            self.net_worth_line.set_ydata(self.net_worths[:self.cur_step - self.df_start_index])
-
-            # Update data of the stock line
-            self.stock_line.set_xdata(range(self.df_start_index, self.cur_step))
-            self.stock_line.set_ydata(self.full_data_df["Close"][self.df_start_index:self.cur_step])
-
-            # Annotate the current net worth of the agent
-            self.net_worth_annotation.set_text("{0:.2f}".format(self.net_worths[-1]))
-            self.net_worth_annotation.set_x(self.cur_step)
-            self.net_worth_annotation.set_y(self.net_worths[-1])
-
-            # Annotate the current stock price
-            self.stock_annotation.set_text("{0:.2f}".format(self.full_data_df["Close"][self.cur_step]))
-            self.stock_annotation.set_x(self.cur_step)
-            self.stock_annotation.set_y(self.full_data_df["Close"][self.cur_step])
-
-            # Adjust the scales of the axes
-            line_min_networth = min(self.net_worths)
-            line_max_networth = max(self.net_worths)
-            adjustment_networth = line_max_networth * 0.1
-            self.net_worth_ax.set_ylim(
-                [line_min_networth - adjustment_networth, line_max_networth + adjustment_networth])
-
-            line_min_stock = min(self.full_data_df["Close"][self.df_start_index:self.cur_step])
-            line_max_stock = max(self.full_data_df["Close"][self.df_start_index:self.cur_step])
-            adjustment_stock = line_max_stock * 0.1
-            self.stock_ax.set_ylim([line_min_stock - adjustment_stock, line_max_stock + adjustment_stock])
-
-            # Update the canvas
-            self.fig.canvas.draw()
-            self.fig.canvas.flush_events()
-
-            if self.done is True:
-                # Reset the graph settings
-                setup_graph()
-
-                # Redraw graph in an enlarged form
-                fig, (net_worth_ax, stock_ax, amount_ax) = plt.subplots(3, sharex="all")
-
-                # Update the axes titles
-                net_worth_ax.title.set_text("Net Worth: {0:.2f}".format(self.net_worths[-1]))
-                stock_ax.title.set_text("Stock Price: {0:.2f}".format(self.full_data_df["Close"][self.cur_step]))
-                amount_ax.title.set_text("Amount Bought/Sold (-1 to 1)")
-
-                # Set the scales
-                net_worth_ax.set_xlim([self.df_start_index - 1, self.df_end_index])
-
-                net_worth_ax.set_ylim([line_min_networth - adjustment_networth,
-                                       line_max_networth + adjustment_networth])
-                stock_ax.set_ylim([line_min_stock - adjustment_stock, line_max_stock + adjustment_stock])
-                amount_ax.set_ylim([-1.1, 1.1])
-
-                # Draw data lines
-                net_worth_ax.plot(range(self.df_start_index, self.df_end_index), self.net_worths[:self.data_df_len],
-                                  color="b", label="Net Worth")
-                stock_ax.plot(range(self.df_start_index, self.df_end_index),
-                              self.full_data_df["Close"][self.df_start_index: self.df_end_index], color="r",
-                              label="Closing Price")
-
-                # Process the actions taken
-                sell_only = [1 if x == 0 else 0 for x in self.actions_taken]
-                buy_only = [1 if x == 2 else 0 for x in self.actions_taken]
-
-                sell_actions = [x if x < 0 else None for x in self.actions_amount]
-                buy_actions = [x if x > 0 else None for x in self.actions_amount]
-
-                # Plot the actions taken
-                net_worth_ax.scatter(range(self.df_start_index, self.df_end_index),
-                                     [sell_only[i] * self.net_worths[i] for i in range(self.data_df_len)], label="Sell",
-                                     color="red", marker="x")
-                net_worth_ax.scatter(range(self.df_start_index, self.df_end_index),
-                                     [buy_only[i] * self.net_worths[i] for i in range(self.data_df_len)], label="Buy",
-                                     color="green", marker="x")
-
-                stock_ax.scatter(range(self.df_start_index, self.df_end_index),
-                                 [sell_only[i - self.df_start_index] * self.full_data_df["Close"][i] for i in
-                                  range(self.df_start_index, self.df_end_index)], label="Sell", color="red", marker="x")
-                stock_ax.scatter(range(self.df_start_index, self.df_end_index),
-                                 [buy_only[i - self.df_start_index] * self.full_data_df["Close"][i] for i in
-                                  range(self.df_start_index, self.df_end_index)], label="Buy", color="green",
-                                 marker="x")
-
-                amount_ax.stem(range(self.df_start_index, self.df_end_index), sell_actions, "red", markerfmt="ro",
-                               label="Sell")
-                amount_ax.stem(range(self.df_start_index, self.df_end_index), buy_actions, "green", markerfmt="go",
-                               label="Buy")
-
-                # Generate plot legend
-                net_worth_ax.legend(loc="best")
-                stock_ax.legend(loc="best")
-                amount_ax.legend(loc="best")
-
-                # Show the resulting figure
-                plt.show()
+        if mode == "human" and not self.headless:
+            if not self.record_history:
+                raise ValueError("The environment has to record the history to render (see `record_history`)")
+
+            # Import the plotting modules only when they are first needed
+            if self.renderer is None:
+                from lib.environment.TradingRenderer import TradingRenderer
+
+                self.renderer = TradingRenderer(max_fps=self.render_fps, output_dir=self.render_dir,
+                                                output_format=self.render_format)
+
+            self.renderer.render(self)
+
+    def close(self):
+        """
+        Closes the environment, finishing any rendered output.
+        """
+        if self.renderer is not None:
+            self.renderer.close()
 
 
 # DEBUGGING CODE
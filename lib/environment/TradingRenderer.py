@@ -0,0 +1,413 @@
+"""
+TradingRenderer.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: The renderer of the trading environment, which draws the trading sessions live or offscreen.
+"""
+# IMPORTS
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from lib.utils.graphingUtils import setup_graph
+
+# CONSTANTS
+OUTPUT_FORMATS = ["png", "gif", "mp4"]  # A PNG sequence, an animated GIF or an MP4 video
+
+
+# CLASSES
+class TradingRenderer:
+    """
+    The renderer of the trading environment.
+
+    The net worth and the stock price are drawn using blitting: the axes (which are the slow part of a figure to
+    draw) are only drawn when a trading session starts or when the data leaves the axes' limits, which are
+    tracked incrementally. Every other frame only redraws the lines and the annotations over a saved background.
+
+    Live rendering draws at most `max_fps` frames per second, however fast the environment steps. The steps in
+    between only update the lines' data, and the last step of a trading session is always drawn.
+
+    Offscreen rendering (when `output_dir` is given) does not need a display. Every step is drawn into a frame,
+    and the frames of each trading session are written to the output directory as:
+    - "png": A PNG sequence, `Session N/Frame XXXXXX.png`.
+    - "gif": An animated GIF, `Session N.gif`, which plays at `max_fps` frames per second.
+    - "mp4": An MP4 video, `Session N.mp4`, which plays at `max_fps` frames per second. This needs FFmpeg.
+
+    The enlarged summary of each finished trading session is shown live, or saved as `Session N Final.png`.
+    """
+
+    def __init__(self, max_fps=30, output_dir=None, output_format="png"):
+        """
+        Initialisation method for the `TradingRenderer` class.
+
+        Args:
+            max_fps (float): The maximum number of frames drawn per second when rendering live, and the frame rate
+                             of the GIF and MP4 outputs. (Default = 30)
+
+            output_dir (str): The directory to write the frames to. (Default = None, which means that the
+                              environment is rendered live)
+
+            output_format (str): The format of the frames which are written to `output_dir`. Either "png", "gif"
+                                 or "mp4". (Default = "png")
+
+        Raises:
+            ValueError: If the output format is not supported, or if it is "mp4" and FFmpeg cannot be found.
+
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'. The supported formats are {OUTPUT_FORMATS}")
+
+        if output_dir is not None and output_format == "mp4" and shutil.which(rcParams["animation.ffmpeg_path"]) \
+                is None:
+            raise ValueError("FFmpeg is needed to write MP4 videos, but it cannot be found")
+
+        self.max_fps = max_fps
+        self.output_dir = output_dir if output_dir is None or output_dir[-1] == "/" else output_dir + "/"
+        self.output_format = output_format
+        self.is_offscreen = output_dir is not None
+
+        # Session variables
+        self.session_no = 0
+        self.session_start = None
+        self.session_end = None
+        self.frame_no = 0
+        self.last_step = None  # The last step which was rendered
+        self.session_x = None  # The x values of the trading session's entries
+
+        # Figure variables
+        self.fig = None
+        self.net_worth_ax = None
+        self.net_worth_line = None
+        self.net_worth_annotation = None
+        self.stock_ax = None
+        self.stock_line = None
+        self.stock_annotation = None
+        self.background = None  # The saved figure without the animated artists (see `draw_frame`)
+
+        # Axis limit variables, which are updated incrementally
+        self.net_worths_seen = 0
+        self.net_worth_min = np.inf
+        self.net_worth_max = -np.inf
+        self.prices_seen = 0
+        self.stock_min = np.inf
+        self.stock_max = -np.inf
+
+        # Output variables
+        self.last_draw_time = -np.inf
+        self.gif_frames = []
+        self.video_process = None
+
+    def new_figure(self, no_axes):
+        """
+        Creates a new figure.
+
+        Args:
+            no_axes (int): The number of axes of the figure, which share their x-axis.
+
+        Returns:
+            Figure: The figure.
+            np.ndarray: The axes of the figure.
+
+        """
+        setup_graph()
+
+        if self.is_offscreen:
+            fig = Figure(figsize=rcParams["figure.figsize"])
+            FigureCanvasAgg(fig)
+
+            return fig, fig.subplots(no_axes, sharex="all")
+
+        from matplotlib import pyplot as plt
+
+        return plt.subplots(no_axes, sharex="all")
+
+    def start_session(self, env):
+        """
+        Sets up the figure for a new trading session.
+
+        Args:
+            env (TradingEnv): The trading environment.
+
+        """
+        self.finish_output()
+
+        self.session_no += 1
+        self.session_start = env.df_start_index
+        self.session_end = env.df_end_index
+        self.frame_no = 0
+        self.session_x = np.arange(self.session_start, self.session_end + 1)
+
+        # Set up axes
+        self.fig, (self.net_worth_ax, self.stock_ax) = self.new_figure(2)
+
+        # Update axes titles
+        self.net_worth_ax.title.set_text("Net Worth")
+        self.stock_ax.title.set_text("Stock Price")
+
+        # Set the scales
+        self.net_worth_ax.set_xlim([self.session_start - 1, self.session_end])  # This is a known limit
+
+        # Set up the animated artists, which are only drawn by `draw_frame`
+        (self.net_worth_line,) = self.net_worth_ax.plot([], [], color="b", animated=True)
+        self.net_worth_annotation = self.net_worth_ax.text(0, 0, "0", animated=True,
+                                                           bbox=dict(boxstyle='round', fc='w', ec='k', lw=1))
+
+        (self.stock_line,) = self.stock_ax.plot([], [], color="r", animated=True)
+        self.stock_annotation = self.stock_ax.text(0, 0, "0", animated=True,
+                                                   bbox=dict(boxstyle='round', fc='w', ec='k', lw=1))
+
+        # Reset the axis limits
+        self.background = None
+        self.net_worths_seen = 0
+        self.net_worth_min, self.net_worth_max = np.inf, -np.inf
+        self.prices_seen = 0
+        self.stock_min, self.stock_max = np.inf, -np.inf
+
+        # Prepare the output
+        if self.is_offscreen and self.output_format == "png":
+            os.makedirs(self.output_dir + f"Session {self.session_no}", exist_ok=True)
+
+        elif self.is_offscreen:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+    def update_limits(self, env):
+        """
+        Updates the smallest and largest net worths and stock prices with the values since the last update, and
+        widens the axes' limits if the values have left them.
+
+        Args:
+            env (TradingEnv): The trading environment.
+
+        Returns:
+            bool: Whether the axes' limits were changed (which means that the axes have to be redrawn).
+
+        """
+        is_changed = False
+
+        # Net worths (all of them, like the line)
+        new_net_worths = env.net_worths[self.net_worths_seen:]
+
+        if len(new_net_worths) != 0:
+            self.net_worth_min = min(self.net_worth_min, new_net_worths.min())
+            self.net_worth_max = max(self.net_worth_max, new_net_worths.max())
+            self.net_worths_seen += len(new_net_worths)
+
+            lower, upper = self.net_worth_ax.get_ylim()
+
+            if self.background is None or self.net_worth_min < lower or self.net_worth_max > upper:
+                adjustment = self.net_worth_max * 0.1
+                self.net_worth_ax.set_ylim([self.net_worth_min - adjustment, self.net_worth_max + adjustment])
+                is_changed = True
+
+        # Stock prices (up to the previous step, like the line)
+        new_prices = env.close_prices[self.session_start + self.prices_seen:env.cur_step]
+
+        if len(new_prices) != 0:
+            self.stock_min = min(self.stock_min, new_prices.min())
+            self.stock_max = max(self.stock_max, new_prices.max())
+            self.prices_seen += len(new_prices)
+
+            lower, upper = self.stock_ax.get_ylim()
+
+            if self.background is None or self.stock_min < lower or self.stock_max > upper:
+                adjustment = self.stock_max * 0.1
+                self.stock_ax.set_ylim([self.stock_min - adjustment, self.stock_max + adjustment])
+                is_changed = True
+
+        return is_changed
+
+    def draw_frame(self, env):
+        """
+        Draws the current step of the trading session.
+
+        Args:
+            env (TradingEnv): The trading environment.
+
+        """
+        no_points = env.cur_step - self.session_start
+        canvas = self.fig.canvas
+
+        # Update the lines' data (these are views, so nothing is copied)
+        self.net_worth_line.set_data(self.session_x[:no_points], env.net_worths[:no_points])
+        self.stock_line.set_data(self.session_x[:no_points], env.close_prices[self.session_start:env.cur_step])
+
+        # Annotate the current net worth of the agent and the current stock price
+        net_worth = env.net_worth_buffer.latest()
+        self.net_worth_annotation.set_text(f"{net_worth:.2f}")
+        self.net_worth_annotation.set_position((env.cur_step, net_worth))
+
+        stock_price = env.close_prices[env.cur_step]
+        self.stock_annotation.set_text(f"{stock_price:.2f}")
+        self.stock_annotation.set_position((env.cur_step, stock_price))
+
+        # Redraw the axes only if their limits have changed, otherwise restore them from the background
+        if self.update_limits(env) or self.background is None:
+            canvas.draw()
+            self.background = canvas.copy_from_bbox(self.fig.bbox)
+
+        else:
+            canvas.restore_region(self.background)
+
+        for artist in [self.net_worth_line, self.net_worth_annotation, self.stock_line, self.stock_annotation]:
+            artist.axes.draw_artist(artist)
+
+        if self.is_offscreen:
+            self.write_frame(np.asarray(canvas.buffer_rgba()))
+
+        else:
+            canvas.blit(self.fig.bbox)
+            canvas.flush_events()
+
+        self.last_draw_time = time.perf_counter()
+
+    def write_frame(self, frame):
+        """
+        Writes a frame to the output.
+
+        Args:
+            frame (np.ndarray): The RGBA values of the frame.
+
+        """
+        self.frame_no += 1
+
+        if self.output_format == "png":
+            # Encoding is the slowest part of writing a frame, so favour speed over size
+            Image.fromarray(frame).save(self.output_dir + f"Session {self.session_no}/Frame {self.frame_no:06d}.png",
+                                        compress_level=1)
+
+        elif self.output_format == "gif":
+            self.gif_frames.append(Image.fromarray(frame).convert("RGB").quantize(method=Image.Quantize.FASTOCTREE))
+
+        else:
+            if self.video_process is None:
+                height, width = frame.shape[:2]
+                self.video_process = subprocess.Popen(
+                    [rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error", "-f", "rawvideo",
+                     "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(self.max_fps), "-i", "-",
+                     "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p",
+                     self.output_dir + f"Session {self.session_no}.mp4"], stdin=subprocess.PIPE)
+
+            self.video_process.stdin.write(frame.tobytes())
+
+    def finish_output(self):
+        """
+        Finishes writing the frames of the current trading session (if any).
+        """
+        if self.gif_frames:
+            self.gif_frames[0].save(self.output_dir + f"Session {self.session_no}.gif", save_all=True,
+                                    append_images=self.gif_frames[1:], duration=1000 / self.max_fps, loop=0)
+            self.gif_frames = []
+
+        if self.video_process is not None:
+            self.video_process.stdin.close()
+            self.video_process.wait()
+            self.video_process = None
+
+    def draw_summary(self, env):
+        """
+        Draws the enlarged summary of a finished trading session, which also shows the actions taken.
+
+        Args:
+            env (TradingEnv): The trading environment.
+
+        """
+        fig, (net_worth_ax, stock_ax, amount_ax) = self.new_figure(3)
+
+        session_x = self.session_x[:-1]
+        session_len = len(session_x)
+        net_worths = env.net_worths[:session_len]
+        prices = env.close_prices[self.session_start:self.session_end]
+
+        # Update the axes titles
+        net_worth_ax.title.set_text(f"Net Worth: {env.net_worth_buffer.latest():.2f}")
+        stock_ax.title.set_text(f"Stock Price: {env.close_prices[env.cur_step]:.2f}")
+        amount_ax.title.set_text("Amount Bought/Sold (-1 to 1)")
+
+        # Set the scales
+        net_worth_ax.set_xlim([self.session_start - 1, self.session_end])
+
+        net_worth_ax.set_ylim([self.net_worth_min - self.net_worth_max * 0.1, self.net_worth_max * 1.1])
+        stock_ax.set_ylim([self.stock_min - self.stock_max * 0.1, self.stock_max * 1.1])
+        amount_ax.set_ylim([-1.1, 1.1])
+
+        # Draw data lines
+        net_worth_ax.plot(session_x, net_worths, color="b", label="Net Worth")
+        stock_ax.plot(session_x, prices, color="r", label="Closing Price")
+
+        # Process the actions taken
+        sell_only = env.actions_taken[:session_len] == 0
+        buy_only = env.actions_taken[:session_len] == 2
+
+        actions_amount = env.actions_amount[:session_len]
+        sell_actions = np.where(actions_amount < 0, actions_amount, np.nan)
+        buy_actions = np.where(actions_amount > 0, actions_amount, np.nan)
+
+        # Plot the actions taken
+        net_worth_ax.scatter(session_x, sell_only * net_worths, label="Sell", color="red", marker="x")
+        net_worth_ax.scatter(session_x, buy_only * net_worths, label="Buy", color="green", marker="x")
+
+        stock_ax.scatter(session_x, sell_only * prices, label="Sell", color="red", marker="x")
+        stock_ax.scatter(session_x, buy_only * prices, label="Buy", color="green", marker="x")
+
+        amount_ax.stem(session_x, sell_actions, "red", markerfmt="ro", label="Sell")
+        amount_ax.stem(session_x, buy_actions, "green", markerfmt="go", label="Buy")
+
+        # Generate plot legend
+        net_worth_ax.legend(loc="best")
+        stock_ax.legend(loc="best")
+        amount_ax.legend(loc="best")
+
+        # Show or save the resulting figure
+        if self.is_offscreen:
+            fig.savefig(self.output_dir + f"Session {self.session_no} Final.png")
+
+        else:
+            from matplotlib import pyplot as plt
+
+            plt.show()
+
+    def render(self, env):
+        """
+        Renders the current step of the trading environment.
+
+        Args:
+            env (TradingEnv): The trading environment, which has to record its history.
+
+        """
+        if self.fig is None or env.df_start_index != self.session_start or env.cur_step <= self.last_step:
+            self.start_session(env)
+
+        self.last_step = env.cur_step
+
+        # Live frames are rate limited, but the last step is always drawn
+        if self.is_offscreen or env.done or self.max_fps is None or \
+                time.perf_counter() - self.last_draw_time >= 1 / self.max_fps:
+            self.draw_frame(env)
+
+        if env.done:
+            self.finish_output()
+            self.draw_summary(env)
+
+    def close(self):
+        """
+        Finishes writing the frames of the current trading session and closes the figure.
+        """
+        self.finish_output()
+
+        if self.fig is not None and not self.is_offscreen:
+            from matplotlib import pyplot as plt
+
+            plt.close(self.fig)
+
+        self.fig = None
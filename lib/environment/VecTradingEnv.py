@@ -0,0 +1,393 @@
+"""
+VecTradingEnv.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A vectorised version of the trading environment, which runs many trading sessions at once.
+"""
+# IMPORTS
+import gym
+import numpy as np
+from stable_baselines.common.vec_env import VecEnv
+
+from lib.environment.TradingEnv import generate_session, generate_universe_session, get_symbol_probabilities, \
+    prepare_env_data
+from lib.utils.miscUtils import sliding_window_view
+
+
+# CLASSES
+class VecTradingEnv(VecEnv):
+    """
+    A vectorised trading environment, which implements the stable-baselines `VecEnv` interface.
+
+    The environment holds `n_envs` independent trading sessions over the same data, and steps all of them at once
+    using array operations. Each session behaves exactly like a `TradingEnv` session (the accounting, the rewards
+    and the observations are the same), and a session which is done is reset automatically (its last
+    observation is stored in the "terminal_observation" entry of its info dictionary, like `DummyVecEnv` does).
+
+    Observation State: A `(n_envs, len(self.full_data_df.columns) + 1, lookback_window)` array (see `TradingEnv`).
+
+    Action Space: A `(n_envs, 2)` array of Action-Amount pairs (see `TradingEnv.step`).
+    """
+
+    def __init__(self, data_df, n_envs=8, init_buyable_stocks=2.5, lookback_window_size=5, is_serial=False,
+                 max_trading_session=100, feature_set=None, env_data=None, symbol_weights=None):
+        """
+        Initialization method for the vectorised trading environment.
+
+        Args:
+            data_df (pd.DataFrame): A pandas dataframe containing all the environment's data (see `TradingEnv`).
+
+            n_envs (int): The number of trading sessions that are run at once. (Default = 8)
+
+            init_buyable_stocks (float): The number of stocks that the agent can buy on the first step.
+                                         (Default = 2.5)
+
+            lookback_window_size (int): How many entries can the agent look back when considering its next
+                                        move? (Default = 5)
+
+            is_serial (bool): Is the environment serial (i.e. following a strict sequence)? (Default = False)
+
+            max_trading_session (int): How many entries, maximally, can each trading session take as data?
+                                       (Default = 100)
+
+            feature_set (Union[str, List[str]]): Which technical indicators should the agent observe? (Default =
+                                                 None, which means that every technical indicator is observed)
+
+            env_data (dict): The already prepared data (see `TradingEnv`). If this is given, `data_df` and
+                             `feature_set` are ignored. (Default = None)
+
+            symbol_weights (Union[str, Dict[str, float]]): The sampling weights of the stocks of a universe (see
+                                                           `TradingEnv`). (Default = None)
+
+        Raises:
+            AssertionError: If init_buyable_stocks < 1.
+
+        """
+
+        # Checks
+        assert init_buyable_stocks > 1, "The value of `init_buyable_stocks` has to be greater than 1."
+
+        # Convert given data into variables
+        self.init_buyable_stocks = init_buyable_stocks  # Initial number of stocks which the agent can buy
+        self.lookback_window = lookback_window_size
+        self.is_serial = is_serial  # Whether the environment is serial or not
+        self.max_trading_session = max_trading_session  # The maximum length for a trading session
+
+        # Prepare the data, which is shared by all the sessions (see `prepare_env_data`)
+        if env_data is None:
+            env_data = prepare_env_data(data_df, feature_set=feature_set)
+
+        self.full_data_df = env_data["full_data_df"]
+        self.full_data_df_len = len(self.full_data_df)
+        self.indicators = env_data["indicators"]
+
+        self.feature_arr = env_data["feature_arr"]
+        self.open_prices = env_data["open_prices"]
+        self.close_prices = env_data["close_prices"]
+
+        # The stocks of a universe (see `TradingEnv`), which are None if the data is of a single stock
+        self.symbols = env_data.get("symbols")
+        self.symbol_offsets = env_data.get("symbol_offsets")
+        self.symbol_probabilities = None if self.symbols is None else get_symbol_probabilities(
+            self.symbols, self.symbol_offsets, self.lookback_window, self.max_trading_session, symbol_weights)
+
+        self.session_no = 0  # The number of trading sessions which have been generated
+
+        # The scalar accounting of `TradingEnv` is done in float64, so do the same here
+        self.close_prices_64 = self.close_prices.astype(np.float64)
+
+        # Views of the observation window (and its smallest and largest features) which ends at each entry
+        self.feature_windows = sliding_window_view(self.feature_arr, self.lookback_window, axis=1)
+        self.feature_min_windows = sliding_window_view(env_data["feature_min"], self.lookback_window)
+        self.feature_max_windows = sliding_window_view(env_data["feature_max"], self.lookback_window)
+
+        # Session variables (one entry per session)
+        self.df_start_indices = np.zeros(n_envs, dtype=np.int64)
+        self.df_end_indices = np.zeros(n_envs, dtype=np.int64)
+        self.cur_steps = np.zeros(n_envs, dtype=np.int64)
+        self.symbol_indices = np.zeros(n_envs, dtype=np.int64)  # The index of the stock of each session
+
+        self.init_invests = np.zeros(n_envs, dtype=np.float64)
+        self.cash_in_hand = np.zeros(n_envs, dtype=np.float64)
+        self.stock_owned = np.zeros(n_envs, dtype=np.int64)
+        self.net_worths = np.zeros(n_envs, dtype=np.float64)  # The latest net worth of each session
+        self.stock_owned_history = np.zeros((n_envs, self.lookback_window), dtype=np.int64)
+
+        self.actions = None
+
+        # Define the spaces of a single session
+        observation_space = gym.spaces.Box(low=0, high=1,
+                                           shape=(len(self.full_data_df.columns) + 1, self.lookback_window),
+                                           dtype=np.float32)
+        action_space = gym.spaces.MultiDiscrete([3, 5])  # 3 actions, with 5 amounts
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def reset_sessions(self, indices):
+        """
+        Starts new trading sessions.
+
+        Args:
+            indices (np.ndarray): The indices of the sessions to reset.
+
+        """
+        # Generate the ranges in order, so that the random numbers are drawn in the same way as `TradingEnv`
+        for index in indices:
+            if self.symbols is None:
+                self.df_start_indices[index], self.df_end_indices[index] = generate_session(
+                    self.full_data_df_len, self.lookback_window, self.max_trading_session, self.is_serial)
+
+            else:
+                self.symbol_indices[index], self.df_start_indices[index], self.df_end_indices[index] = \
+                    generate_universe_session(self.symbol_offsets, self.symbol_probabilities, self.lookback_window,
+                                              self.max_trading_session, self.is_serial, session_no=self.session_no)
+
+            self.session_no += 1
+
+        # Reset all needed variables
+        self.cur_steps[indices] = self.df_start_indices[indices]
+        self.stock_owned[indices] = 0
+        self.init_invests[indices] = self.init_buyable_stocks * self.close_prices_64[self.df_start_indices[indices]]
+        self.cash_in_hand[indices] = self.init_invests[indices]
+        self.net_worths[indices] = self.init_invests[indices]
+        self.stock_owned_history[indices] = 0
+
+    def reset(self):
+        """
+        Resets every trading session.
+
+        Returns:
+            np.ndarray: The observation arrays of the sessions.
+
+        """
+        self.reset_sessions(np.arange(self.num_envs))
+
+        return self.get_obs(np.arange(self.num_envs))
+
+    def step_async(self, actions):
+        """
+        Tells the environment to step the sessions with the given actions.
+
+        Args:
+            actions (np.ndarray): The Action-Amount pair of each session (see `TradingEnv.step`).
+
+        """
+        self.actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, 2)
+
+    def step_wait(self):
+        """
+        Makes every session move forward one step in time, resetting the sessions which are done.
+
+        Returns:
+            np.ndarray: The observation arrays of the sessions.
+            np.ndarray: The rewards for taking the actions (as float32, like `DummyVecEnv`).
+            np.ndarray: Whether each session has completed all its steps. The sessions which are done have already
+                        been reset, so their observation is the first observation of their new session.
+            List[dict]: A dictionary with useful information for each session. It contains the `cur_val` of the
+                        session, and the last observation of the session if it is done.
+
+        """
+        # Move forward one day in time
+        self.cur_steps += 1
+        dones = self.cur_steps >= self.df_end_indices
+
+        # Split the actions into the "Action Types" and "Action Amounts"
+        action_types = self.actions[:, 0]  # Sell: 0, Hold: 1, Buy: 2
+        action_amounts = (self.actions[:, 1] + 1) / 5  # Representing 1/5, 2/5, 3/5 etc.
+        close_prices = self.close_prices_64[self.cur_steps]
+
+        # Sell (we don't want partial stocks)
+        is_selling = action_types == 0
+        stock_sold = np.zeros(self.num_envs, dtype=np.int64)
+        stock_sold[is_selling] = np.trunc(self.stock_owned[is_selling] * action_amounts[is_selling])
+
+        self.cash_in_hand[is_selling] += close_prices[is_selling] * stock_sold[is_selling]
+        self.stock_owned -= stock_sold
+
+        # Buy
+        is_buying = action_types == 2
+        stock_bought = np.zeros(self.num_envs, dtype=np.int64)
+        stock_bought[is_buying] = np.trunc((self.cash_in_hand[is_buying] / close_prices[is_buying]) *
+                                           action_amounts[is_buying])
+
+        self.cash_in_hand[is_buying] -= close_prices[is_buying] * stock_bought[is_buying]
+        self.stock_owned += stock_bought
+
+        # Update the `stock_owned_history` of each session
+        self.stock_owned_history[:, :-1] = self.stock_owned_history[:, 1:]
+        self.stock_owned_history[:, -1] = self.stock_owned
+
+        # Generate the rewards (i.e. the difference between the current and the previous net worth)
+        net_worths = self.stock_owned * close_prices + self.cash_in_hand
+        rewards = net_worths - self.net_worths
+        self.net_worths = net_worths
+
+        # Generate the observations and the info
+        obs = self.get_obs(np.arange(self.num_envs))
+        infos = [{"cur_val": net_worth} for net_worth in net_worths]
+
+        # Reset the sessions which are done
+        done_indices = np.flatnonzero(dones)
+
+        if len(done_indices) != 0:
+            for index in done_indices:
+                infos[index]["terminal_observation"] = obs[index].copy()  # `obs` is overwritten below
+
+            self.reset_sessions(done_indices)
+            obs[done_indices] = self.get_obs(done_indices)
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def get_val(self):
+        """
+        Calculates the current portfolio value of every session.
+
+        Returns:
+            np.ndarray: Portfolio value of each session at its current step.
+
+        """
+        return self.stock_owned * self.close_prices_64[self.cur_steps] + self.cash_in_hand
+
+    def get_obs(self, indices):
+        """
+        Processes and returns the observation arrays of some sessions.
+
+        The observations are the same as those of `TradingEnv.get_obs`.
+
+        Args:
+            indices (np.ndarray): The indices of the sessions.
+
+        Returns:
+            np.ndarray: The observation arrays of the sessions.
+
+        """
+        start_indices = self.cur_steps[indices] - self.lookback_window
+        owned_history = self.stock_owned_history[indices].astype(np.float64)
+
+        # Add the feature values and the stock_owned_history
+        obs = np.empty((len(indices), len(self.feature_arr) + 1, self.lookback_window), dtype=np.float32)
+        obs[:, :-1] = np.moveaxis(self.feature_windows[:, start_indices], 0, 1)
+        obs[:, -1] = owned_history
+
+        # Find the range of each entry (near constant entries are not scaled)
+        data_min = np.fmin(self.feature_min_windows[start_indices], obs[:, -1])
+        data_range = np.fmax(self.feature_max_windows[start_indices], obs[:, -1]) - data_min
+        data_range[data_range < 10 * np.finfo(np.float32).eps] = 1
+
+        # Normalise values
+        scale = np.float32(1) / data_range
+
+        obs *= scale[:, None, :]
+        obs += (np.float32(0) - data_min * scale)[:, None, :]
+
+        return obs
+
+    def seed(self, seed=None):
+        """
+        Seeds the random number generator which generates the trading sessions.
+
+        Args:
+            seed (int): The seed. (Default = None)
+
+        Returns:
+            List[int]: The seed of each session.
+
+        """
+        np.random.seed(seed)  # `generate_session` uses NumPy's global random number generator, like `TradingEnv`
+
+        return [seed] * self.num_envs
+
+    def close(self):
+        """
+        Closes the environment. There is nothing to clean up, as the sessions do not run in other processes.
+        """
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        """
+        Gets an attribute of the environment. As every session is held by this environment, the same attribute
+        is returned for each session.
+
+        Args:
+            attr_name (str): The name of the attribute.
+
+            indices (Union[None, int, Iterable[int]]): The indices of the sessions. (Default = None, which means
+                                                       that every session is used)
+
+        Returns:
+            list: The value of the attribute for each session.
+
+        """
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        """
+        Sets an attribute of the environment (which is shared by every session).
+
+        Args:
+            attr_name (str): The name of the attribute.
+
+            value (object): The new value of the attribute.
+
+            indices (Union[None, int, Iterable[int]]): Unused, as the attribute is shared. (Default = None)
+
+        """
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        Calls a method of the environment once for each session.
+
+        Args:
+            method_name (str): The name of the method.
+
+            *method_args: The positional arguments of the method.
+
+            indices (Union[None, int, Iterable[int]]): The indices of the sessions. (Default = None, which means
+                                                       that every session is used)
+
+            **method_kwargs: The keyword arguments of the method.
+
+        Returns:
+            list: The value returned by the method for each session.
+
+        """
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def _get_indices(self, indices):
+        """
+        Converts the `indices` argument of the `VecEnv` methods into a list of indices.
+
+        Args:
+            indices (Union[None, int, Iterable[int]]): The indices of the sessions.
+
+        Returns:
+            Iterable[int]: The indices of the sessions.
+
+        """
+        if indices is None:
+            return range(self.num_envs)
+
+        if isinstance(indices, int):
+            return [indices]
+
+        return indices
+
+
+# DEBUG CODE
+if __name__ == "__main__":
+    from lib.utils.dataUtils import process_data
+
+    # Create the environment
+    debugEnv = VecTradingEnv(process_data("../../Training Data/", "AAPL"), n_envs=4, lookback_window_size=30)
+
+    # Run a few random steps
+    debugEnv.reset()
+
+    for _ in range(10):
+        debugObs, debugRewards, debugDones, debugInfos = debugEnv.step(np.random.randint(0, [3, 5], size=(4, 2)))
+        print(debugRewards, debugDones)
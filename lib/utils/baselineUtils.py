@@ -9,11 +9,371 @@ Copyright Ryan Kan 2019
 Description: A python file which contains the baseline algorithms.
 """
 # IMPORTS
+import hashlib
+import inspect
+import json
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import ta
-from tqdm import tqdm
 
-from lib.environment.TradingEnv import TradingEnv
+from lib.environment.TradingEnv import TradingEnv, generate_session
+from lib.utils.cacheUtils import MAX_CACHE_ENTRIES, load_cached_result, save_cached_result
+from lib.utils.simulationUtils import get_session_prices, simulate_trades
+
+# CONSTANTS
+BASELINE_CACHE_DIR = "./Baseline Cache/"
+BASELINE_VERSION = 1  # Increment this whenever the format of the cached scores changes
+
+POLICY_NAMES = ["BHODL", "RSI Divergence", "SMA Crossover"]
+
+DEFAULT_POLICY_PARAMS = {"rsi_period": 5,  # The number of entries which the RSI Divergence trends are found over
+                         "fast_window": 12,  # The number of entries in the shorter-term average of the SMA Crossover
+                         "slow_window": 26,  # The number of entries in the longer-term average of the SMA Crossover
+                         "position_fraction": 2.2}  # The fraction of the stocks sold or of the cash used to buy
+
+
+# FUNCTIONS
+def get_trend_sums(values, period):
+    """
+    Gets the trend sum of a series at every entry, which is what
+    `sum(values[t - period:t + 1].diff().cumsum().fillna(0))` gives at entry `t`.
+
+    The trend sums of all the entries are found at once. The additions are done in the same order and with the same
+    types as in the expression above, so the trend sums are identical to it.
+
+    Args:
+        values (np.ndarray): The values of the series.
+
+        period (int): The number of differences in each entry's window.
+
+    Returns:
+        np.ndarray: The trend sum at each entry `t >= period`. The trend sums of the first `period` entries, which
+                    have no full window, are NaN.
+
+    Examples:
+        >>> get_trend_sums(np.array([1., 2., 4., 7.]), 2)
+        array([nan, nan,  4.,  7.])
+
+    """
+    differences = values[1:] - values[:-1]
+    no_windows = len(values) - period
+
+    trend_sums = np.full(len(values), np.nan)
+
+    if no_windows <= 0:
+        return trend_sums
+
+    # The cumulative sum of each window's differences, which skips (but keeps) the missing differences
+    cumulative_sums = np.zeros(no_windows, dtype=differences.dtype)
+    window_sums = np.zeros(no_windows, dtype=np.float64)
+
+    for lag in range(period):
+        window_differences = differences[lag:lag + no_windows]
+        is_missing = np.isnan(window_differences)
+
+        cumulative_sums += np.where(is_missing, 0, window_differences)
+        window_sums += np.where(is_missing, 0, cumulative_sums)
+
+    trend_sums[period:] = window_sums
+    return trend_sums
+
+
+def get_action_amount(position_fraction):
+    """
+    Gets the action amount which sells or buys a fraction of the position, which is the inverse of the
+    `(action_amount + 1) / 5` conversion done by `TradingEnv.update_stocks`.
+
+    Args:
+        position_fraction (float): The fraction of the stocks sold or of the cash used to buy.
+
+    Returns:
+        float: The action amount.
+
+    Examples:
+        >>> get_action_amount(0.6)
+        2.0
+        >>> get_action_amount(DEFAULT_POLICY_PARAMS["position_fraction"])
+        10.0
+
+    """
+    return round(position_fraction * 5 - 1, 9)  # Remove the rounding error, so that the conversion is exact
+
+
+def get_signal_actions(sell_signals, buy_signals, action_amount):
+    """
+    Gets the Action-Amount pairs which sell or buy on the signals, and hold otherwise.
+
+    Args:
+        sell_signals (np.ndarray): Whether a sell is signalled at each step.
+
+        buy_signals (np.ndarray): Whether a buy is signalled at each step.
+
+        action_amount (float): The action amount of the sells and buys (see `get_action_amount`).
+
+    Returns:
+        np.ndarray: The Action-Amount pair of each step.
+
+    """
+    actions = np.empty((len(sell_signals), 2))
+
+    actions[:, 0] = np.where(sell_signals, 0, np.where(buy_signals, 2, 1))  # Sell: 0, Hold: 1, Buy: 2
+    actions[:, 1] = action_amount
+
+    return actions
+
+
+def get_bhodl_actions(df_start_index, df_end_index, position_fraction=DEFAULT_POLICY_PARAMS["position_fraction"]):
+    """
+    Gets the actions of the BHODL baseline over a trading session.
+
+    BHODL buys whenever it can afford at least one stock at the entry's opening price, so these buys have to be
+    simulated with the opening prices as the affordability prices (see `simulate_trades`).
+
+    Args:
+        df_start_index (int): The index of the first entry of the trading session.
+
+        df_end_index (int): The index after the last entry of the trading session.
+
+        position_fraction (float): The fraction of the cash used to buy. (Default = 2.2, which buys with more cash
+                                   than the agent has)
+
+    Returns:
+        np.ndarray: The Action-Amount pair of each step of the trading session.
+
+    """
+    no_steps = df_end_index - df_start_index
+    return get_signal_actions(np.zeros(no_steps, dtype=bool), np.ones(no_steps, dtype=bool),
+                              get_action_amount(position_fraction))
+
+
+def get_rsi_actions(prices, df_start_index, df_end_index, rsi_period=DEFAULT_POLICY_PARAMS["rsi_period"],
+                    position_fraction=DEFAULT_POLICY_PARAMS["position_fraction"], rsi=None):
+    """
+    Gets the actions of the RSI Divergence baseline over a trading session.
+
+    Args:
+        prices (pd.Series): The closing prices of all the entries.
+
+        df_start_index (int): The index of the first entry of the trading session.
+
+        df_end_index (int): The index after the last entry of the trading session.
+
+        rsi_period (int): The number of entries which the trends are found over. (Default = 5)
+
+        position_fraction (float): The fraction of the stocks sold or of the cash used to buy. (Default = 2.2)
+
+        rsi (np.ndarray): The RSI of all the entries, so that it can be shared between calls. (Default = None,
+                          which means that it is computed from `prices`)
+
+    Returns:
+        np.ndarray: The Action-Amount pair of each step of the trading session.
+
+    """
+    rsi = ta.rsi(prices).to_numpy() if rsi is None else rsi
+
+    rsi_sums = get_trend_sums(rsi, rsi_period)[df_start_index:df_end_index]
+    price_sums = get_trend_sums(prices.to_numpy(), rsi_period)[df_start_index:df_end_index]
+
+    # Entries without a full window hold, as their trend sums are NaN
+    return get_signal_actions((rsi_sums < 0) & (0 <= price_sums), (rsi_sums > 0) & (0 >= price_sums),
+                              get_action_amount(position_fraction))
+
+
+def get_sma_actions(prices, df_start_index, df_end_index, fast_window=DEFAULT_POLICY_PARAMS["fast_window"],
+                    slow_window=DEFAULT_POLICY_PARAMS["slow_window"],
+                    position_fraction=DEFAULT_POLICY_PARAMS["position_fraction"]):
+    """
+    Gets the actions of the SMA Crossover baseline over a trading session.
+
+    The crossovers are found from the MACD, which is the difference between the shorter-term and the longer-term
+    average.
+
+    Args:
+        prices (pd.Series): The closing prices of all the entries.
+
+        df_start_index (int): The index of the first entry of the trading session.
+
+        df_end_index (int): The index after the last entry of the trading session.
+
+        fast_window (int): The number of entries in the shorter-term average. (Default = 12)
+
+        slow_window (int): The number of entries in the longer-term average. (Default = 26)
+
+        position_fraction (float): The fraction of the stocks sold or of the cash used to buy. (Default = 2.2)
+
+    Returns:
+        np.ndarray: The Action-Amount pair of each step of the trading session.
+
+    Raises:
+        ValueError: If the shorter-term average is not shorter than the longer-term average.
+
+    """
+    if fast_window >= slow_window:
+        raise ValueError(f"The fast window ({fast_window}) has to be shorter than the slow window ({slow_window})")
+
+    macd = ta.macd(prices, n_fast=fast_window, n_slow=slow_window).to_numpy()
+
+    cur_macd = macd[df_start_index:df_end_index]
+    prev_macd = macd[df_start_index - 1:df_end_index - 1]
+
+    return get_signal_actions((cur_macd > 0) & (0 >= prev_macd), (cur_macd < 0) & (0 <= prev_macd),
+                              get_action_amount(position_fraction))
+
+
+def get_policy_actions(policy_name, data_df, df_start_index, df_end_index, policy_params=None):
+    """
+    Gets the actions of a baseline over a trading session.
+
+    Args:
+        policy_name (str): The name of the baseline (see `POLICY_NAMES`).
+
+        data_df (pd.DataFrame): The data of the stock, which needs the "Open" and "Close" columns.
+
+        df_start_index (int): The index of the first entry of the trading session.
+
+        df_end_index (int): The index after the last entry of the trading session.
+
+        policy_params (dict): The parameters of the baselines which differ from `DEFAULT_POLICY_PARAMS`.
+                              (Default = None, which means that the default parameters are used)
+
+    Returns:
+        np.ndarray: The Action-Amount pair of each step of the trading session.
+        np.ndarray: The affordability prices which the actions have to be simulated with (see `simulate_trades`).
+                    This is None if the baseline's buys always happen.
+
+    Raises:
+        ValueError: If the baseline is unknown.
+
+    """
+    params = {**DEFAULT_POLICY_PARAMS, **(policy_params or {})}
+    prices = data_df["Close"]
+
+    if policy_name == "BHODL":
+        # BHODL only buys if it can afford a stock at the opening price
+        return (get_bhodl_actions(df_start_index, df_end_index, position_fraction=params["position_fraction"]),
+                data_df["Open"].to_numpy()[df_start_index:df_end_index])
+
+    elif policy_name == "RSI Divergence":
+        return get_rsi_actions(prices, df_start_index, df_end_index, rsi_period=params["rsi_period"],
+                               position_fraction=params["position_fraction"]), None
+
+    elif policy_name == "SMA Crossover":
+        return get_sma_actions(prices, df_start_index, df_end_index, fast_window=params["fast_window"],
+                               slow_window=params["slow_window"], position_fraction=params["position_fraction"]), None
+
+    raise ValueError(f"Unknown baseline '{policy_name}'. Expected one of: {', '.join(POLICY_NAMES)}")
+
+
+def score_policy(data_df, policy_name, init_buyable_stocks=2.5, policy_params=None, lookback_window_size=5):
+    """
+    Scores a baseline over the serial trading session of a stock, without an environment.
+
+    The score is the one which `Baselines.run_policies` gives for the same data.
+
+    Args:
+        data_df (pd.DataFrame): The data of the stock, which needs the "Open" and "Close" columns.
+
+        policy_name (str): The name of the baseline (see `POLICY_NAMES`).
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        policy_params (dict): The parameters of the baselines which differ from `DEFAULT_POLICY_PARAMS`.
+                              (Default = None, which means that the default parameters are used)
+
+        lookback_window_size (int): The lookback window of the environment, which is skipped at the start of the
+                                    trading session. (Default = 5)
+
+    Returns:
+        dict: The result of the baseline, with the following keys:
+              - "init_invest": The initial investment amount.
+              - "score": The final net worth.
+              - "increase": The percentage increase of the net worth.
+
+    Raises:
+        ValueError: If the baseline is unknown, or if there are too few entries for a trading session.
+
+    """
+    df_start_index, df_end_index = generate_session(len(data_df), lookback_window_size, None, True)
+
+    if df_end_index <= df_start_index:
+        raise ValueError(f"Expected more than {lookback_window_size + 1} entries, but got {len(data_df)}")
+
+    actions, affordability_prices = get_policy_actions(policy_name, data_df, df_start_index, df_end_index,
+                                                       policy_params=policy_params)
+
+    close_prices = data_df["Close"].to_numpy()
+    init_invest = init_buyable_stocks * close_prices[df_start_index]
+
+    trades = simulate_trades(get_session_prices(close_prices, df_start_index, df_end_index), actions, init_invest,
+                             affordability_prices=affordability_prices)
+    score = trades["net_worths"][-1]
+
+    return {"init_invest": init_invest, "score": score, "increase": (score / init_invest) * 100 - 100}
+
+
+@lru_cache(maxsize=None)
+def get_scoring_code_hash():
+    """
+    Hashes the code which scores the baselines, which is this file, `simulationUtils.py` and
+    `TradingEnv.generate_session` (which picks the entries that are scored).
+
+    The code is only read once per process.
+
+    Returns:
+        str: The hexadecimal SHA-256 hash of the code.
+
+    """
+    hasher = hashlib.sha256()
+
+    for source_file in [__file__, inspect.getsourcefile(simulate_trades)]:
+        with open(source_file, "rb") as f:
+            hasher.update(f.read())
+
+    hasher.update(inspect.getsource(generate_session).encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def get_baseline_key(data_df, init_buyable_stocks=2.5, policy_params=None, lookback_window_size=5):
+    """
+    Generates the key which identifies the scores of the baselines on some data.
+
+    The key changes whenever the opening or closing prices (which are the only data that the baselines use),
+    `init_buyable_stocks`, the baselines' parameters, the lookback window, `BASELINE_VERSION` or the code which
+    scores the baselines (see `get_scoring_code_hash`) changes. Hence, editing the scoring code invalidates the
+    cached scores without having to increment `BASELINE_VERSION`.
+
+    Args:
+        data_df (pd.DataFrame): The data of the stock, which needs the "Open" and "Close" columns.
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        policy_params (dict): The parameters of the baselines which differ from `DEFAULT_POLICY_PARAMS`.
+                              (Default = None, which means that the default parameters are used)
+
+        lookback_window_size (int): The lookback window of the environment. (Default = 5)
+
+    Returns:
+        str: The hexadecimal SHA-256 key of the baselines' scores.
+
+    """
+    hasher = hashlib.sha256()
+
+    # Hash the prices
+    for column in ["Open", "Close"]:
+        prices = np.ascontiguousarray(data_df[column].to_numpy())
+
+        hasher.update(f"{column}:{prices.dtype.str}:{prices.shape}".encode("utf-8"))
+        hasher.update(prices.tobytes())
+
+    # Hash the scoring parameters and code
+    hasher.update(json.dumps([BASELINE_VERSION, init_buyable_stocks, lookback_window_size,
+                              {**DEFAULT_POLICY_PARAMS, **(policy_params or {})}], sort_keys=True).encode("utf-8"))
+    hasher.update(get_scoring_code_hash().encode("utf-8"))
+
+    return hasher.hexdigest()
 
 
 # BASELINES CLASS
@@ -44,7 +404,8 @@ class Baselines:
             SMA crosses above the longer-term SMA.
 
     """
-    def __init__(self, dataframe, render=True, init_buyable_stocks=2.5):
+    def __init__(self, dataframe, render=True, init_buyable_stocks=2.5, render_fps=30, render_dir=None,
+                 render_format="png", policy_params=None, cache_directory=None, max_cache_entries=MAX_CACHE_ENTRIES):
         """
         Initialisation method for the `Baselines` class.
 
@@ -64,113 +425,108 @@ class Baselines:
                                          the first day is $100, then the agent will have $300 on the first
                                          day.
 
+            render_fps (float): The maximum number of frames drawn per second (see `TradingEnv`). (Default = 30)
+
+            render_dir (str): The directory which the rendered frames are written to (see `TradingEnv`).
+                              (Default = None, which means that the environment is rendered live)
+
+            render_format (str): The format of the rendered frames (see `TradingEnv`). (Default = "png")
+
+            policy_params (dict): The parameters of the baselines which differ from `DEFAULT_POLICY_PARAMS`.
+                                  (Default = None, which means that the default parameters are used)
+
+            cache_directory (str): The directory where the scores are cached (e.g. BASELINE_CACHE_DIR). The scores
+                                   are keyed by `get_baseline_key`, so they are recomputed whenever the data or the
+                                   parameters change. (Default = None, which means that the scores are not cached)
+
+            max_cache_entries (int): The maximum number of scores which the cache keeps. The least recently used
+                                     scores are evicted first. (Default = MAX_CACHE_ENTRIES)
+
         """
         self.dataframe = dataframe
         self.render = render  # Can the environment render?
         self.init_buyable_stocks = init_buyable_stocks  # Initial number of stocks which the agent can buy
+        self.policy_params = {**DEFAULT_POLICY_PARAMS, **(policy_params or {})}
+
+        self.cache_directory = cache_directory
+        self.max_cache_entries = max_cache_entries
 
         # Initialise the trading environment
-        self.env = TradingEnv(self.dataframe, init_buyable_stocks=self.init_buyable_stocks, is_serial=True)
+        self.env = TradingEnv(self.dataframe, init_buyable_stocks=self.init_buyable_stocks, is_serial=True,
+                              record_history=self.render, headless=not self.render, render_fps=render_fps,
+                              render_dir=render_dir, render_format=render_format)
         self.env.reset(print_init_invest_amount=True)
 
-    def run_policies(self):
+    def run_policies(self, force=False):
         """
         Runs the baseline policies against a defined environment.
 
+        Each policy's actions over the whole trading session are found at once from its signals, and are scored with
+        `simulate_trades`, which follows the environment's rules. The environment is only stepped through if it is
+        rendered.
+
+        If there is a cache, the cached scores are used instead when the environment is not rendered.
+
+        Args:
+            force (bool): Should the scores be recomputed (and recached) even if they are cached? (Default = False)
+
         Returns:
             List[float, float, float]: Scores of the three baselines in a list in the following form:
                                        [BHODL Score, RSI Score, SMA Score]
 
         """
+        init_val = self.env.init_invest
 
-        def bhodl_policy():
-            """
-            The BHODL baseline algorithm.
-
-            Returns:
-                Tuple[int, int]: The Action-Amount pair.
-
-            """
-            # Buy if possible
-            if self.env.cash_in_hand // self.env.full_data_df["Open"][self.env.cur_step] >= 1:
-                return 2, 10  # Buy maximal amount
-
-            # If not, hold for all other cases
-            else:
-                return 1, 10  # Amount doesn't matter
-
-        def rsi_policy():
-            """
-            The RSI Divergence algorithm.
-
-            Returns:
-                Tuple[int, int]: The Action-Amount pair.
-
-            """
-            period = 5
-            prices = self.env.full_data_df["Close"]
-            cur_step = self.env.cur_step
-
-            rsi = ta.rsi(prices)
-
-            if cur_step >= period:
-                rsi_sum = sum(rsi[cur_step - period:cur_step + 1].diff().cumsum().fillna(0))
-                price_sum = sum(prices[cur_step - period:cur_step + 1].diff().cumsum().fillna(0))
-
-                if rsi_sum < 0 <= price_sum:
-                    return 0, 10
-                elif rsi_sum > 0 >= price_sum:
-                    return 2, 10
-
-            return 1, 10
-
-        def sma_policy():
-            """
-            The SMA Crossover algorithm.
-
-            Returns:
-                Tuple[int, int]: The Action-Amount pair.
-
-            """
-            prices = self.env.full_data_df["Close"]
-            cur_step = self.env.cur_step
+        # Try to use the cached scores
+        use_cache = self.cache_directory is not None and not self.render
 
-            macd = ta.macd(prices)
+        if use_cache:
+            cache_key = get_baseline_key(self.env.full_data_df, init_buyable_stocks=self.init_buyable_stocks,
+                                         policy_params=self.policy_params,
+                                         lookback_window_size=self.env.lookback_window)
+            cached_result = None if force else load_cached_result(self.cache_directory, cache_key)
 
-            if macd[cur_step] > 0 >= macd[cur_step - 1]:
-                return 0, 10
+            if cached_result is not None:
+                for policy_name, score in zip(POLICY_NAMES, cached_result["scores"]):
+                    print(f"{policy_name} baseline got ${score:.2f} ({(score / init_val) * 100 - 100:.3f}% increase)"
+                          f" (cached)")
 
-            elif macd[cur_step] < 0 <= macd[cur_step - 1]:
-                return 2, 10
+                return cached_result["scores"]
 
-            return 1, 10
+        start, end = self.env.df_start_index, self.env.df_end_index
+        session_prices = get_session_prices(self.env.close_prices, start, end)
+        scores = []
 
         # Run the baselines against the environment
-        policy_order = [bhodl_policy, rsi_policy, sma_policy]
-        policy_names = ["BHODL", "RSI Divergence", "SMA Crossover"]
+        for policy_name in POLICY_NAMES:
+            actions, affordability_prices = get_policy_actions(policy_name, self.env.full_data_df, start, end,
+                                                               policy_params=self.policy_params)
+            trades = simulate_trades(session_prices, actions, init_val, affordability_prices=affordability_prices)
 
-        init_val = self.env.init_invest
+            if self.render:
+                if affordability_prices is not None:
+                    # Hold on the steps where the cash before the step could not afford a stock
+                    prev_cash = np.concatenate(([init_val], trades["cash_in_hand"][:-1]))
 
-        for i, policy in enumerate(policy_order):
-            if self.render is not True:
-                running_list = tqdm(range(self.env.df_start_index, self.env.df_end_index),
-                                    desc=f"Running {policy_names[i]} baseline")
-            else:
-                running_list = range(self.env.df_start_index, self.env.df_end_index)
+                    actions = actions.copy()
+                    actions[prev_cash // affordability_prices < 1, 0] = 1
 
-            self.env.reset()
+                self.env.reset()
 
-            # Run the baselines' algorithms
-            for _ in running_list:
-                action = policy()
+                for action in actions:
+                    self.env.step(action)
+                    self.env.render()
 
-                self.env.step(action)
+            score = trades["net_worths"][-1]
+            print(f"{policy_name} baseline got ${score:.2f} ({(score / init_val) * 100 - 100:.3f}% increase)")
 
-                if self.render:
-                    self.env.render()
+            scores.append(score)
+
+        if use_cache:
+            save_cached_result(self.cache_directory, cache_key, {"policy_names": POLICY_NAMES, "scores": scores},
+                               max_entries=self.max_cache_entries)
 
-            score = self.env.get_val()
-            print(f"{policy_names[i]} baseline got ${score:.2f} ({(score / init_val) * 100 - 100:.3f}% increase)")
+        return scores
 
 
 # DEBUG CODE
@@ -0,0 +1,153 @@
+"""
+bufferUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: Preallocated buffers which hold the history of a value without allocating memory on every update.
+"""
+# IMPORTS
+import numpy as np
+
+
+# CLASSES
+class HistoryBuffer:
+    """
+    A preallocated, typed buffer which holds the latest values of a quantity, and optionally its full history.
+
+    Without a capacity, the buffer is a ring buffer of the latest `window_size` values. Each value is written twice
+    (at `position` and at `position + window_size`), so that the window is always a contiguous view of the buffer.
+
+    With a capacity, every value is kept in order, up to `capacity` values.
+
+    In both cases, appending a value does not allocate any memory, so the memory used stays flat however many values
+    are appended.
+
+    Examples:
+        >>> debug_buffer = HistoryBuffer(3, dtype=np.int64)
+        >>> debug_buffer.reset(0)
+        >>> for debug_value in range(1, 6):
+        ...     debug_buffer.append(debug_value)
+        >>> debug_buffer.window()
+        array([3, 4, 5])
+        >>> debug_buffer.latest(1)
+        4
+        >>> debug_buffer = HistoryBuffer(3, dtype=np.int64, capacity=10)
+        >>> debug_buffer.reset(0)
+        >>> for debug_value in range(1, 6):
+        ...     debug_buffer.append(debug_value)
+        >>> debug_buffer.values()
+        array([0, 0, 0, 1, 2, 3, 4, 5])
+
+    """
+
+    def __init__(self, window_size, dtype=np.float64, capacity=None):
+        """
+        Initialisation method for the `HistoryBuffer` class.
+
+        Args:
+            window_size (int): The number of latest values which are needed (see `window`).
+
+            dtype (np.dtype): The type of the values. (Default = np.float64)
+
+            capacity (int): The maximum number of values to keep, including the `window_size` values which the
+                            buffer is filled with on reset. (Default = None, which means that only the latest
+                            `window_size` values are kept)
+
+        Raises:
+            ValueError: If the capacity is smaller than the window size.
+
+        """
+        if capacity is not None and capacity < window_size:
+            raise ValueError(f"The capacity ({capacity}) cannot be smaller than the window size ({window_size})")
+
+        self.window_size = window_size
+        self.capacity = capacity
+        self.is_recording = capacity is not None  # Whether the full history is kept or not
+
+        self.buffer = np.zeros(capacity if self.is_recording else 2 * window_size, dtype=dtype)
+        self.length = 0  # The number of values in the history
+        self.position = 0  # The index of the oldest value of the window in the ring buffer
+
+    def reset(self, fill_value=0):
+        """
+        Empties the buffer, then fills the window with a value.
+
+        Args:
+            fill_value (Union[int, float]): The value which the window is filled with. (Default = 0)
+
+        """
+        if self.is_recording:
+            self.buffer[:self.window_size] = fill_value
+
+        else:
+            self.buffer[:] = fill_value
+            self.position = 0
+
+        self.length = self.window_size
+
+    def append(self, value):
+        """
+        Appends a value to the buffer.
+
+        Args:
+            value (Union[int, float]): The value to append.
+
+        Raises:
+            IndexError: If the full history is kept and the buffer is already full.
+
+        """
+        if self.is_recording:
+            self.buffer[self.length] = value
+
+        elif self.window_size != 0:
+            self.buffer[self.position] = value
+            self.buffer[self.position + self.window_size] = value
+            self.position = (self.position + 1) % self.window_size
+
+        self.length += 1
+
+    def latest(self, offset=0):
+        """
+        Gets one of the latest values.
+
+        Args:
+            offset (int): How many values before the latest value the value is. This has to be smaller than the
+                          window size. (Default = 0, which means that the latest value is returned)
+
+        Returns:
+            Union[int, float]: The value.
+
+        """
+        if self.is_recording:
+            return self.buffer[self.length - 1 - offset]
+
+        return self.buffer[self.position + self.window_size - 1 - offset]
+
+    def window(self):
+        """
+        Gets the latest `window_size` values.
+
+        Returns:
+            np.ndarray: A view of the values, from the oldest to the latest.
+
+        """
+        if self.is_recording:
+            return self.buffer[self.length - self.window_size:self.length]
+
+        return self.buffer[self.position:self.position + self.window_size]
+
+    def values(self):
+        """
+        Gets all the kept values.
+
+        Returns:
+            np.ndarray: A view of the full history if it is kept, otherwise a view of the window.
+
+        """
+        if self.is_recording:
+            return self.buffer[:self.length]
+
+        return self.window()
@@ -0,0 +1,138 @@
+"""
+cacheUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A small, size-bounded local cache of results, where each result is a JSON file named after its key.
+"""
+# IMPORTS
+import json
+import os
+
+from lib.utils.miscUtils import create_path
+
+# CONSTANTS
+MAX_CACHE_ENTRIES = 256  # The default number of results which a cache keeps
+
+
+# FUNCTIONS
+def get_cache_path(cache_directory, key):
+    """
+    Generates the path of the file which a cached result is stored in.
+
+    Args:
+        cache_directory (str): The directory where the results are cached.
+
+        key (str): The key of the result.
+
+    Returns:
+        str: The path to the result's file.
+
+    Examples:
+        >>> get_cache_path("./Baseline Cache/", "1a2b3c")
+        './Baseline Cache/1a2b3c.json'
+
+    """
+    return os.path.join(cache_directory, key + ".json")
+
+
+def load_cached_result(cache_directory, key):
+    """
+    Loads a cached result.
+
+    A hit marks the result as recently used, so that it is evicted last (see `evict_cached_results`).
+
+    Args:
+        cache_directory (str): The directory where the results are cached.
+
+        key (str): The key of the result.
+
+    Returns:
+        dict: The cached result. This is None if the result is not cached (or if its file is corrupted).
+
+    """
+    cache_path = get_cache_path(cache_directory, key)
+
+    try:
+        with open(cache_path, "r") as f:
+            entry = json.load(f)
+
+        if entry["key"] != key:
+            return None
+
+        os.utime(cache_path)  # Mark the result as recently used
+
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # The result is missing or corrupted; it has to be recomputed
+
+    return entry["result"]
+
+
+def save_cached_result(cache_directory, key, result, max_entries=MAX_CACHE_ENTRIES):
+    """
+    Caches a result, then evicts the least recently used results if there are too many.
+
+    Args:
+        cache_directory (str): The directory where the results are cached.
+
+        key (str): The key of the result.
+
+        result (dict): The result, which has to be serialisable as JSON.
+
+        max_entries (int): The maximum number of results which are kept. (Default = MAX_CACHE_ENTRIES)
+
+    """
+    create_path(cache_directory)
+
+    # Save the result, replacing the old file atomically so that other processes never see a partial file
+    cache_path = get_cache_path(cache_directory, key)
+    temp_path = cache_path + f".{os.getpid()}.tmp"
+
+    with open(temp_path, "w") as f:
+        json.dump({"key": key, "result": result}, f, indent=4)
+    os.replace(temp_path, cache_path)
+
+    evict_cached_results(cache_directory, max_entries=max_entries)
+
+
+def evict_cached_results(cache_directory, max_entries=MAX_CACHE_ENTRIES):
+    """
+    Deletes the least recently used results of a cache until at most `max_entries` results are left.
+
+    Args:
+        cache_directory (str): The directory where the results are cached.
+
+        max_entries (int): The maximum number of results which are kept. (Default = MAX_CACHE_ENTRIES)
+
+    Returns:
+        int: The number of results which were deleted.
+
+    """
+    cache_entries = []
+
+    for file_name in os.listdir(cache_directory):
+        if file_name.endswith(".json"):
+            cache_path = os.path.join(cache_directory, file_name)
+
+            try:
+                cache_entries.append((os.path.getmtime(cache_path), cache_path))
+
+            except OSError:
+                pass  # Another process deleted the result
+
+    # Delete the oldest results
+    cache_entries.sort()
+    no_evicted = 0
+
+    for _, cache_path in cache_entries[:max(len(cache_entries) - max_entries, 0)]:
+        try:
+            os.remove(cache_path)
+            no_evicted += 1
+
+        except OSError:
+            pass
+
+    return no_evicted
@@ -0,0 +1,325 @@
+"""
+catalogUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A catalog of all the stocks in the training data directory, stored as a single index file.
+"""
+# IMPORTS
+import hashlib
+import json
+import os
+
+import numpy as np
+from pandas import read_csv
+
+from lib.utils.miscUtils import natural_sort
+
+# CONSTANTS
+CATALOG_FILE_NAME = "Symbol Catalog.json"
+CATALOG_VERSION = 1  # Increment this whenever the format of the catalog's entries changes
+
+
+# FUNCTIONS
+def get_file_paths(data_directory, stock_symbol):
+    """
+    Generates the paths to a stock's files in the data directory.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "GOOGL" and "TSLA" are all valid stock symbols.
+
+    Returns:
+        dict: The paths to the OHLCV data file ("stocks"), the sentiment data file ("sentiments") and the stock
+              info file ("info").
+
+    Examples:
+        >>> get_file_paths("./Training Data/", "AAPL")["stocks"]
+        './Training Data/AAPL/AAPL_stocks.csv'
+
+    """
+    stock_directory = data_directory + stock_symbol + "/"
+
+    return {"stocks": stock_directory + stock_symbol + "_stocks.csv",
+            "sentiments": stock_directory + stock_symbol + "_sentiments.csv",
+            "info": stock_directory + "Stock Info.txt"}
+
+
+def read_stock_info(info_file):
+    """
+    Reads a `Stock Info.txt` file.
+
+    Args:
+        info_file (str): The path to the `Stock Info.txt` file.
+
+    Returns:
+        dict: The fields in the file, with the keys in block characters and without spaces (e.g. "STOCKNAME").
+              Dashes in the values are replaced with spaces.
+
+    """
+    file_dict = {}
+
+    with open(info_file) as f:
+        for line in f.readlines():
+            line_content = line.strip().replace(" ", "").split(":")
+
+            try:
+                file_dict[line_content[0].upper()] = line_content[1].replace("-", " ")
+
+            except IndexError:
+                pass
+
+    return file_dict
+
+
+def get_stock_name(data_directory, stock_symbol):
+    """
+    Gets a stock's name from its `Stock Info.txt` file.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+
+    Returns:
+        str: The name of the stock (e.g. "Apple").
+
+    Raises:
+        ValueError: If the stock has no `Stock Info.txt` file, or if the file does not give the stock's name.
+
+    """
+    info_file = get_file_paths(data_directory, stock_symbol)["info"]
+
+    if not os.path.isfile(info_file):
+        raise ValueError(f"'{stock_symbol}' has no stock info file (expected '{info_file}')")
+
+    stock_name = read_stock_info(info_file).get("STOCKNAME", "").strip()
+
+    if stock_name == "":
+        raise ValueError(f"The stock info file of '{stock_symbol}' ('{info_file}') does not have a STOCK NAME")
+
+    return stock_name
+
+
+def get_stock_directories(data_directory):
+    """
+    Finds the subdirectories of all the stocks in the data directory.
+
+    A subdirectory belongs to a stock if it has the stock's OHLCV data file or a `Stock Info.txt` file, so stocks
+    which have only been set up (and have no data yet) are found too.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+    Returns:
+        List[str]: The naturally sorted stock symbols (i.e. the names of the subdirectories).
+
+    """
+    stock_symbols = []
+
+    for stock_symbol in os.listdir(data_directory):
+        file_paths = get_file_paths(data_directory, stock_symbol)
+
+        if os.path.isfile(file_paths["stocks"]) or os.path.isfile(file_paths["info"]):
+            stock_symbols.append(stock_symbol)
+
+    return natural_sort(stock_symbols)
+
+
+def get_file_stats(file_path):
+    """
+    Gets the modification time and size of a file, which are used to check whether the file has changed.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        List[int]: The modification time (in nanoseconds) and the size (in bytes) of the file. If the file does
+                   not exist, None is returned.
+
+    """
+    try:
+        file_stat = os.stat(file_path)
+        return [file_stat.st_mtime_ns, file_stat.st_size]
+
+    except OSError:
+        return None
+
+
+def generate_entry(data_directory, stock_symbol):
+    """
+    Generates a stock's catalog entry by reading its files.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+
+    Returns:
+        dict: The catalog entry of the stock. It contains the stock's symbol, name, file paths, file stats, and
+              the row count, date range and SHA-256 content hash of each of its data files.
+
+    """
+    file_paths = get_file_paths(data_directory, stock_symbol)
+
+    entry = {"symbol": stock_symbol,
+             "name": read_stock_info(file_paths["info"]).get("STOCKNAME") if os.path.isfile(file_paths["info"])
+             else None,
+             "paths": file_paths,
+             "stats": {file_type: get_file_stats(file_path) for file_type, file_path in file_paths.items()}}
+
+    for file_type in ["stocks", "sentiments"]:
+        with open(file_paths[file_type], "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+
+        dates = np.sort(read_csv(file_paths[file_type], header=0, usecols=["Date"])["Date"].values)
+
+        entry[file_type] = {"rows": len(dates),
+                            "first_date": dates[0] if len(dates) != 0 else None,
+                            "last_date": dates[-1] if len(dates) != 0 else None,
+                            "hash": content_hash}
+
+    return entry
+
+
+def load_catalog(data_directory, catalog_file=None, return_failures=False, verbose=False):
+    """
+    Loads the catalog of all the stocks in the data directory.
+
+    The catalog is stored as a single index file. It is rebuilt lazily: only the entries of stocks whose
+    directory or files have changed (according to their modification times and sizes) are regenerated, and the
+    index file is only rewritten if something has changed. Loading an up-to-date catalog does not open any of
+    the stocks' files.
+
+    Stocks which could not be catalogued are recorded in the index file too, so that they are only retried once
+    their directory or files change. The file paths of the entries are always generated from `data_directory`,
+    so the catalog stays valid if the data directory is moved or is given in another form.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        catalog_file (str): The path to the index file.
+                            (Default = None, which means that `data_directory + CATALOG_FILE_NAME` is used)
+
+        return_failures (bool): Should the stocks which could not be catalogued also be returned?
+                                (Default = False)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        dict: The catalog entries (see `generate_entry`), keyed by the stock symbol and naturally sorted. The
+              stocks which could not be catalogued are left out.
+        dict: The file stats ("stats") and the error ("error") of each stock which could not be catalogued (e.g.
+              a stock which only has a `Stock Info.txt` file so far), keyed by the stock symbol. This is only
+              returned if `return_failures` is True.
+
+    """
+    catalog_file = data_directory + CATALOG_FILE_NAME if catalog_file is None else catalog_file
+
+    # Load the stored catalog
+    try:
+        with open(catalog_file, "r") as f:
+            stored_catalog = json.load(f)
+
+        if stored_catalog["version"] != CATALOG_VERSION:
+            raise ValueError("Outdated catalog version")
+
+    except (OSError, ValueError, KeyError):
+        stored_catalog = {"version": CATALOG_VERSION, "directory_stats": {}, "entries": {}, "failures": {}}
+
+    stored_failures = stored_catalog.get("failures", {})
+
+    # Find all the stocks' directories
+    stock_symbols = get_stock_directories(data_directory)
+
+    # Regenerate the entries of the stocks which have changed
+    directory_stats = {}
+    entries = {}
+    failures = {}  # The file stats and the error of each stock which could not be catalogued
+    is_changed = set(stored_catalog["entries"]) | set(stored_failures) != set(stock_symbols)
+
+    for stock_symbol in stock_symbols:
+        # Generate the file paths again instead of using the stored ones, as the data directory may have moved
+        file_paths = get_file_paths(data_directory, stock_symbol)
+        file_stats = {file_type: get_file_stats(file_path) for file_type, file_path in file_paths.items()}
+
+        directory_stats[stock_symbol] = get_file_stats(data_directory + stock_symbol)
+        is_unchanged = directory_stats[stock_symbol] == stored_catalog["directory_stats"].get(stock_symbol)
+
+        entry = stored_catalog["entries"].get(stock_symbol)
+        failure = stored_failures.get(stock_symbol)
+
+        if is_unchanged and entry is not None and entry["stats"] == file_stats:
+            if entry["paths"] != file_paths:
+                entry["paths"] = file_paths
+                is_changed = True
+
+            entries[stock_symbol] = entry
+            continue
+
+        if is_unchanged and failure is not None and failure["stats"] == file_stats:
+            if verbose:
+                print(f"Skipping {stock_symbol}, which could not be catalogued: {failure['error']}")
+
+            failures[stock_symbol] = failure
+            continue
+
+        if verbose:
+            print(f"Cataloguing {stock_symbol}...")
+
+        is_changed = True
+
+        try:
+            entries[stock_symbol] = generate_entry(data_directory, stock_symbol)
+
+        except (OSError, ValueError) as e:  # The files are incomplete, so skip this stock until they change
+            if verbose:
+                print(f"Could not catalogue {stock_symbol}: {e!r}")
+
+            failures[stock_symbol] = {"stats": file_stats, "error": repr(e)}
+
+    # Save the catalog, if it has changed
+    if is_changed:
+        temp_file = f"{catalog_file}.{os.getpid()}.tmp"
+
+        with open(temp_file, "w") as f:
+            json.dump({"version": CATALOG_VERSION, "directory_stats": directory_stats, "entries": entries,
+                       "failures": failures}, f, indent=4)
+        os.replace(temp_file, catalog_file)
+
+    if return_failures:
+        return entries, failures
+
+    return entries
+
+
+def get_stale_symbols(catalog, date):
+    """
+    Finds the stocks whose OHLCV data or sentiment data ends before a date.
+
+    Args:
+        catalog (dict): The catalog returned by `load_catalog`.
+
+        date (str): The date which the data should reach, in the form YYYY-MM-DD.
+
+    Returns:
+        List[str]: The symbols of the stale stocks.
+
+    """
+    return [stock_symbol for stock_symbol, entry in catalog.items()
+            if any(entry[file_type]["last_date"] is None or entry[file_type]["last_date"] < date
+                   for file_type in ["stocks", "sentiments"])]
+
+
+# DEBUG CODE
+if __name__ == "__main__":
+    debugCatalog = load_catalog("../../Training Data/", verbose=True)
+
+    for debugSymbol, debugEntry in debugCatalog.items():
+        print(debugSymbol, debugEntry["name"], debugEntry["stocks"]["first_date"], debugEntry["stocks"]["last_date"])
@@ -9,18 +9,345 @@ Copyright Ryan Kan 2019
 Description: The utilities required to process the data.
 """
 # IMPORTS
-import datetime
+import hashlib
+import json
+import os
+import zipfile
+from io import StringIO
 
 import numpy as np
 import pandas as pd
-import ta
 from pandas import read_csv
 
-from lib.utils.miscUtils import moving_average
+from lib.utils.catalogUtils import get_file_paths
+from lib.utils.indicatorUtils import OHLCV_FIELDS, compute_indicators
+from lib.utils.miscUtils import natural_sort, rolling_average
+
+# CONSTANTS
+DATA_DTYPE = np.dtype([("Date", "datetime64[D]"),
+                       ("Open", np.float64), ("High", np.float64), ("Low", np.float64), ("Close", np.float64),
+                       ("Sentiment", np.float64),
+                       ("Volume", np.uint64)])  # The format of the array returned by `obtain_data`
+COMPACT_DATA_DTYPE = np.dtype([("Date", "datetime64[D]"),
+                               ("Open", np.float32), ("High", np.float32), ("Low", np.float32), ("Close", np.float32),
+                               ("Sentiment", np.float32),
+                               ("Volume", np.float32)])  # A smaller (but less precise) alternative to `DATA_DTYPE`
+
+TECHNICAL_INDICATORS = ["AO", "MFI", "RSI", "TSI", "UO",  # Momentum indicators
+                        "Aroon_up", "Aroon_down", "Aroon_ind", "CCI", "DPO", "KST", "KST_sig", "KST_diff",  # Trend
+                        "MACD_diff", "Mass_index", "Trix", "Vortex_pos", "Vortex_neg", "Vortex_diff",  # indicators
+                        "BBH", "BBL", "BBM", "BBHI", "BBLI", "KCHI", "KCLI", "DCHI", "DCLI",  # Volatility indicators
+                        "ADI", "CMF", "EM", "FI", "NVI", "OBV", "VPT",  # Volume indicators
+                        "DR", "DLR"]  # Miscellaneous indicators
+FEATURE_SETS = {"full": TECHNICAL_INDICATORS,  # Every technical indicator
+                "compact": ["AO", "MFI", "RSI", "TSI", "UO",  # Drops the indicators which are near-duplicates of others
+                            "Aroon_ind", "CCI", "DPO", "KST_diff", "MACD_diff", "Mass_index", "Trix", "Vortex_diff",
+                            "BBHI", "BBLI", "KCHI", "KCLI", "DCHI", "DCLI",
+                            "ADI", "CMF", "EM", "FI", "NVI", "OBV", "VPT",
+                            "DR"],
+                "prices": []}  # Only the processed data, without any technical indicators
+FEATURE_SET_FILE_NAME = "feature_set.json"  # Name of the file which records the feature set inside a model file
+
+FILE_EDGE_SIZE = 4096  # Number of bytes at each end of a CSV file's rows that are checked when reading new rows
 
 
 # FUNCTIONS
-def obtain_data(data_directory, stock_symbol):
+def get_feature_set(feature_set=None):
+    """
+    Gets the technical indicators which are selected by a feature set specification.
+
+    Args:
+        feature_set (Union[str, List[str]]): The feature set specification. This is either the name of a feature
+                                             set in `FEATURE_SETS`, a comma-separated string of technical
+                                             indicators, or a list of technical indicators.
+                                             (Default = None, which means that every technical indicator is used)
+
+    Returns:
+        List[str]: The selected technical indicators, in the same order as in `TECHNICAL_INDICATORS`.
+
+    Raises:
+        ValueError: If the specification contains an indicator which is not in `TECHNICAL_INDICATORS`.
+
+    Examples:
+        >>> get_feature_set("RSI,AO")
+        ['AO', 'RSI']
+        >>> len(get_feature_set("compact"))
+        27
+
+    """
+    if feature_set is None:
+        return list(TECHNICAL_INDICATORS)
+
+    if isinstance(feature_set, str):
+        if feature_set in FEATURE_SETS:
+            return list(FEATURE_SETS[feature_set])
+
+        feature_set = [indicator.strip() for indicator in feature_set.split(",") if indicator.strip() != ""]
+
+    for indicator in feature_set:
+        if indicator not in TECHNICAL_INDICATORS:
+            raise ValueError(f"Unknown technical indicator '{indicator}'")
+
+    return [indicator for indicator in TECHNICAL_INDICATORS if indicator in feature_set]
+
+
+def save_feature_set(model_file, indicators):
+    """
+    Records the technical indicators which a model observes inside the model file.
+
+    The model file is a zip archive, so the feature set is added to it as `FEATURE_SET_FILE_NAME`. The model
+    loader ignores the extra file.
+
+    Args:
+        model_file (str): The path to the saved model file.
+
+        indicators (List[str]): The technical indicators which the model observes.
+
+    """
+    with zipfile.ZipFile(model_file, "a") as f:
+        f.writestr(FEATURE_SET_FILE_NAME, json.dumps({"indicators": list(indicators)}))
+
+
+def load_feature_set(model_file):
+    """
+    Loads the technical indicators which a model observes from the model file.
+
+    Args:
+        model_file (str): The path to the saved model file.
+
+    Returns:
+        List[str]: The technical indicators which the model observes. Models that were saved without a feature set
+                   observe every technical indicator, so `TECHNICAL_INDICATORS` is returned for them.
+
+    """
+    with zipfile.ZipFile(model_file, "r") as f:
+        if FEATURE_SET_FILE_NAME not in f.namelist():
+            return list(TECHNICAL_INDICATORS)
+
+        return get_feature_set(json.loads(f.read(FEATURE_SET_FILE_NAME))["indicators"])
+
+
+def get_stock_symbols(data_directory):
+    """
+    Finds all the stock symbols which have training data in the data directory.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock. Each subdirectory
+                              contains the OHLCV data file (a.k.a. stocks file) and the sentiment data file.
+
+    Returns:
+        List[str]: The naturally sorted list of stock symbols.
+
+    """
+    stock_symbols = []
+
+    for stock_symbol in os.listdir(data_directory):
+        file_paths = get_file_paths(data_directory, stock_symbol)
+
+        if os.path.isfile(file_paths["stocks"]) and os.path.isfile(file_paths["sentiments"]):
+            stock_symbols.append(stock_symbol)
+
+    return natural_sort(stock_symbols)
+
+
+def fill_missing_days(dates, values):
+    """
+    Fills in the missing calendar days of a time series using linear interpolation.
+
+    Args:
+        dates (np.ndarray): A `datetime64[D]` array of dates. The dates have to be sorted in ascending order
+                            and have to be unique.
+
+        values (np.ndarray): A 2D float array, where `values[i]` holds the values recorded on `dates[i]`.
+
+    Returns:
+        np.ndarray: The `datetime64[D]` array of every day from `dates[0]` to `dates[-1]` (inclusive).
+        np.ndarray: The values on each of those days. Values on days that were present in `dates` are
+                    unchanged, while values on missing days are linearly interpolated between the values of
+                    the neighbouring days.
+
+    Examples:
+        >>> import numpy as np
+        >>> filled_dates, filled_values = fill_missing_days(np.array(["2019-12-01", "2019-12-04"],
+        ...                                                          dtype="datetime64[D]"),
+        ...                                                 np.array([[1.], [4.]]))
+        >>> filled_values[:, 0]
+        array([1., 2., 3., 4.])
+
+    """
+    if len(dates) == 0:
+        return dates, values
+
+    # Find how many days each entry has to cover (the last entry only covers itself)
+    days_difference = np.append(np.diff(dates).astype(np.int64), 1)
+
+    # Work out which original entry each filled day comes from, and how many days after that entry it is
+    source_index = np.repeat(np.arange(len(dates)), days_difference)
+    days_after = np.arange(len(source_index)) - np.repeat(np.cumsum(days_difference) - days_difference,
+                                                          days_difference)
+
+    # Estimate the increase/decrease per day using linear fitting
+    next_index = np.minimum(np.arange(len(dates)) + 1, len(dates) - 1)
+    difference_per_day = (values[next_index] - values) / days_difference[:, None]
+
+    # Use that value to fill in the missing data
+    filled_values = values[source_index] + days_after[:, None] * difference_per_day[source_index]
+    filled_dates = dates[0] + np.arange(len(source_index))
+
+    return filled_dates, filled_values
+
+
+def read_file_boundary(f):
+    """
+    Reads the boundary of the rows of an open CSV file (see `get_file_boundary`).
+
+    Args:
+        f (BinaryIO): The CSV file, opened in binary mode. Its position is changed.
+
+    Returns:
+        dict: The boundary of the rows of the file.
+
+    """
+    f.seek(0)
+    header = f.readline()
+
+    size = os.fstat(f.fileno()).st_size
+    edge_size = min(FILE_EDGE_SIZE, size - len(header))
+
+    first_edge = f.read(edge_size)
+    f.seek(size - edge_size)
+    last_edge = f.read(edge_size)
+
+    return {"size": size,
+            "header": header.decode("utf-8"),
+            "edge_size": edge_size,
+            "first_edge_hash": hashlib.sha256(first_edge).hexdigest(),
+            "last_edge_hash": hashlib.sha256(last_edge).hexdigest()}
+
+
+def get_file_boundary(file_path):
+    """
+    Records where the rows of a CSV file end, so that only the rows which are added to the file later have to be
+    read (see `read_new_rows`).
+
+    Args:
+        file_path (str): The path to the CSV file.
+
+    Returns:
+        dict: The boundary of the rows of the file. This is the size of the file, its header, and the hashes of the
+              first and last `FILE_EDGE_SIZE` bytes of its rows.
+
+    """
+    with open(file_path, "rb") as f:
+        return read_file_boundary(f)
+
+
+def read_new_rows(file_path, boundary, columns, latest_first=False):
+    """
+    Reads the rows which were added to a CSV file since its boundary was recorded, without reading the old rows.
+
+    The header and both edges of the old rows are checked to make sure that rows were only added to the file. Only
+    these and the new rows are read, so the time taken depends on the number of new rows, and not on the size of
+    the file.
+
+    NOTE: The old rows between the edges are not checked. If they are changed without changing the size of the
+          file, the change is not detected.
+
+    Args:
+        file_path (str): The path to the CSV file.
+
+        boundary (dict): The boundary of the rows of the file, from `get_file_boundary`.
+
+        columns (List[str]): The columns (besides "Date") to read.
+
+        latest_first (bool): Are the rows stored from the latest date to the earliest date? If so, the new rows
+                             are added right after the header instead of at the end of the file. (Default = False)
+
+    Returns:
+        np.ndarray: The `datetime64[D]` dates of the new rows, from the earliest date to the latest date.
+        np.ndarray: The float values of the new rows, where each column is one of `columns`.
+        dict: The new boundary of the rows of the file.
+
+        If the file was changed in any other way than by adding rows, then None is returned instead.
+
+    """
+    with open(file_path, "rb") as f:
+        new_boundary = read_file_boundary(f)
+        no_new_bytes = new_boundary["size"] - boundary["size"]
+
+        if new_boundary["header"] != boundary["header"] or no_new_bytes < 0:
+            return None
+
+        # Find where the old rows are now, and check that their edges were not changed
+        old_start = len(boundary["header"].encode("utf-8")) + (no_new_bytes if latest_first else 0)
+        old_end = old_start + boundary["size"] - len(boundary["header"].encode("utf-8"))
+
+        f.seek(old_start)
+        first_edge = f.read(boundary["edge_size"])
+        f.seek(old_end - boundary["edge_size"])
+        last_edge = f.read(boundary["edge_size"])
+
+        if hashlib.sha256(first_edge).hexdigest() != boundary["first_edge_hash"] or \
+                hashlib.sha256(last_edge).hexdigest() != boundary["last_edge_hash"]:
+            return None
+
+        # Read the new rows, which have to be whole lines
+        f.seek(old_start - no_new_bytes if latest_first else old_end)
+        new_bytes = f.read(no_new_bytes)
+
+    if no_new_bytes != 0 and (not new_bytes.endswith(b"\n") or (not latest_first and last_edge[-1:] != b"\n")):
+        return None
+
+    new_rows = read_csv(StringIO(boundary["header"] + new_bytes.decode("utf-8")), header=0,
+                        usecols=["Date"] + columns)
+
+    if latest_first:
+        new_rows = new_rows.iloc[::-1]
+
+    return new_rows["Date"].values.astype("datetime64[D]"), new_rows[columns].values.astype(np.float64), \
+        new_boundary
+
+
+def merge_data(ohlcv_dates, ohlcv_arr, sentiment_dates, sentiment_arr, dtype=DATA_DTYPE):
+    """
+    Merges the filled in OHLCV data and sentiment data into a single array.
+
+    Only the days which are in both the OHLCV data and the sentiment data are kept, leaving out the latest day of
+    each (as its values may still change).
+
+    Args:
+        ohlcv_dates (np.ndarray): The `datetime64[D]` dates of the OHLCV data, which are consecutive days.
+
+        ohlcv_arr (np.ndarray): The OHLCV values on each of those days.
+
+        sentiment_dates (np.ndarray): The `datetime64[D]` dates of the sentiment data, which are consecutive days.
+
+        sentiment_arr (np.ndarray): The sentiment values on each of those days.
+
+        dtype (np.dtype): The structured dtype of the returned array. (Default = DATA_DTYPE)
+
+    Returns:
+        np.ndarray: The merged structured array (see `obtain_data`).
+
+    """
+    # Only keep the days which are in both the sentiment and OHLCV data (leaving out the latest day of each)
+    dates, ohlcv_indices, sentiment_indices = np.intersect1d(ohlcv_dates[:-1], sentiment_dates[:-1],
+                                                             assume_unique=True, return_indices=True)
+
+    # Merge both arrays into a single structured array
+    # The format for `data_arr` is: [DATE, OPEN, HIGH, LOW, CLOSE, SENTIMENT, VOLUME]
+    data_arr = np.empty(len(dates), dtype=dtype)
+
+    data_arr["Date"] = dates
+    for i, column in enumerate(["Open", "High", "Low", "Close"]):
+        data_arr[column] = ohlcv_arr[ohlcv_indices, i]
+    data_arr["Sentiment"] = sentiment_arr[sentiment_indices, 0]
+    data_arr["Volume"] = np.trunc(ohlcv_arr[ohlcv_indices, 4])  # We don't want partial volumes
+
+    return data_arr
+
+
+def obtain_data(data_directory, stock_symbol, dtype=DATA_DTYPE, return_pending=False):
     """
     Gets the training data from the data directory.
 
@@ -31,151 +358,221 @@ def obtain_data(data_directory, stock_symbol):
         stock_symbol (str): The stock symbol. Also known as the stock ticker.
                             For example, "AAPL", "GOOGL" and "TSLA" are all valid stock symbols.
 
+        dtype (np.dtype): The structured dtype of the returned array. (Default = DATA_DTYPE)
+
+                          `COMPACT_DATA_DTYPE` uses about half the memory of `DATA_DTYPE`. However, rounding
+                          the prices to float32 creates ties between prices that were different, which changes
+                          the values of some technical indicators (e.g. OBV and Aroon).
+
+        return_pending (bool): Should the filled in days after the last entry also be returned? (Default = False)
+
     Returns:
-        - np.ndarray: Array containing all the relevant values for the environment
+        - np.ndarray: Structured array (with the dtype `dtype`) containing all the relevant values for the
+                      environment. Each entry is one day, and the values can be accessed by their names (e.g.
+                      `data_arr["Close"]`).
+        - dict: The filled in days of the OHLCV data ("ohlcv") and the sentiment data ("sentiment") after the
+                last entry, as `(dates, values)` pairs. These days are left out until both sources have data
+                for the day after them. The last day of each source is always pending, as it is the day which
+                new days are filled in from. This is only returned if `return_pending` is True.
 
     """
-    # Generate the full path to the files
-    full_path = data_directory + stock_symbol + "/" + stock_symbol
+    # Generate the paths to the files
+    file_paths = get_file_paths(data_directory, stock_symbol)
 
-    # Load OHLCV values from the CSV file
-    ohlcv_data = read_csv(full_path + "_stocks.csv", header=0, squeeze=True)
+    # Load OHLCV values from the CSV file (without the "Adj Close" column)
+    ohlcv_data = read_csv(file_paths["stocks"], header=0,
+                          usecols=["Date", "Open", "High", "Low", "Close", "Volume"])
 
-    # Remove the "Adj Close" column (which is the 6th column)
-    ohlcv_data = ohlcv_data.drop(ohlcv_data.columns[5], axis=1)
+    ohlcv_dates = ohlcv_data["Date"].values.astype("datetime64[D]")
+    ohlcv_arr = ohlcv_data[["Open", "High", "Low", "Close", "Volume"]].values.astype(np.float64)
 
-    # Convert stock data to `np.ndarray`
-    ohlcv_arr = ohlcv_data.values
+    # Load sentiment data, which is stored from the latest date to the earliest date
+    sentiment_data = read_csv(file_paths["sentiments"], header=0)
 
-    # Load sentiment data
-    sentiment_data = read_csv(full_path + "_sentiments.csv", header=0, squeeze=True)
-
-    # Convert sentiment data to `np.ndarray`
-    sentiment_arr = sentiment_data.values[::-1]
+    sentiment_dates = sentiment_data["Date"].values[::-1].astype("datetime64[D]")
+    sentiment_arr = sentiment_data[["Sentiment"]].values[::-1].astype(np.float64)
 
     # Fill in missing values for sentiment data
-    sentiment_arr_new = sentiment_arr.copy()
-
-    i = 0
-    first_date = sentiment_arr_new[0][0]  # The first date of the sentiment data
-
-    while i < sentiment_arr_new.shape[0] - 1:
-        # Obtain current date and next date
-        curr_date = datetime.datetime.strptime(sentiment_arr_new[i][0], "%Y-%m-%d")
-        next_date = datetime.datetime.strptime(sentiment_arr_new[i + 1][0], "%Y-%m-%d")
-
-        # Check if the date difference is more than one day
-        if (next_date - curr_date).days > 1:
-            # Get the difference in days
-            days_difference = int((next_date - curr_date).days)
-
-            # Estimate the sentiment increase/decrease in that period using linear fitting
-            difference_per_day = (sentiment_arr_new[i + 1][1] - sentiment_arr_new[i][1]) / days_difference
-
-            # Use that value to fill in the missing data
-            for day in range(1, days_difference):
-                sentiment_arr_new = np.insert(sentiment_arr_new, i + day, [
-                    datetime.datetime.strftime(curr_date + datetime.timedelta(days=day), "%Y-%m-%d"),
-                    sentiment_arr_new[i][1] + day * difference_per_day], axis=0)
-
-            i += days_difference - 1
-        i += 1
-
-    # Reverse the array
-    sentiment_arr = sentiment_arr_new[:-1]
-
-    # Fill in missing values for OHLCV data
-    ohlcv_arr_new = list(ohlcv_arr)
-
-    i = 0
-    first_date_processed = datetime.datetime.strptime(first_date, "%Y-%m-%d")
-    first_surpassed_index = -1
-
-    while i < len(ohlcv_arr_new[:-1]):
-        curr_date = datetime.datetime.strptime(ohlcv_arr_new[i][0], "%Y-%m-%d")
-
-        if curr_date >= first_date_processed:
-            if first_surpassed_index == -1:
-                first_surpassed_index = i
-
-            next_date = datetime.datetime.strptime(ohlcv_arr_new[i + 1][0], "%Y-%m-%d")
-
-            if (next_date - curr_date).days > 1:  # If it is more than 1 day
-                # Calculate how many days differ between entries
-                days_difference = int((next_date - curr_date).days)
-
-                # Calculate differences
-                difference_open = (ohlcv_arr_new[i + 1][1] - ohlcv_arr_new[i][1]) / days_difference
-                difference_high = (ohlcv_arr_new[i + 1][2] - ohlcv_arr_new[i][2]) / days_difference
-                difference_low = (ohlcv_arr_new[i + 1][3] - ohlcv_arr_new[i][3]) / days_difference
-                difference_close = (ohlcv_arr_new[i + 1][4] - ohlcv_arr_new[i][4]) / days_difference
-                difference_volume = (ohlcv_arr_new[i + 1][5] - ohlcv_arr_new[i][5]) / days_difference
-
-                # Use the values to fill in the missing data
-                for day in range(1, days_difference):
-                    ohlcv_arr_new.insert(i + day,
-                                         [datetime.datetime.strftime(curr_date + datetime.timedelta(days=day),
-                                                                     "%Y-%m-%d"),
-                                          ohlcv_arr_new[i][1] + day * difference_open,
-                                          ohlcv_arr_new[i][2] + day * difference_high,
-                                          ohlcv_arr_new[i][3] + day * difference_low,
-                                          ohlcv_arr_new[i][4] + day * difference_close,
-                                          int(ohlcv_arr_new[i][5] + day * difference_volume)])
-
-                i += days_difference - 1
-        i += 1
-
-    # Leave only relevant values
-    ohlcv_arr = np.array(ohlcv_arr_new[first_surpassed_index:-1], dtype=object)
-
-    # Make both sentiment and OHLCV values start on the same day
-    if sentiment_arr[0][0] != ohlcv_arr[0][0]:
-        if sentiment_arr[0][0] < ohlcv_arr[0][0]:  # If smaller
-            while True:
-                sentiment_arr = np.delete(sentiment_arr, 0, axis=0)
-
-                if sentiment_arr[0][0] == ohlcv_arr[0][0]:
-                    break
-
-        else:
-            while True:
-                ohlcv_arr = np.delete(ohlcv_arr, 0, axis=0)
-
-                if sentiment_arr[0][0] == ohlcv_arr[0][0]:
-                    break
-
-    # Make both sentiment and OHLCV values end on same day
-    if sentiment_arr[-1][0] != ohlcv_arr[-1][0]:
-        if sentiment_arr[-1][0] < ohlcv_arr[-1][0]:
-            while True:
-                ohlcv_arr = np.delete(ohlcv_arr, ohlcv_arr.shape[0] - 1, axis=0)
-                if sentiment_arr[sentiment_arr.shape[0] - 1][0] == ohlcv_arr[ohlcv_arr.shape[0] - 1][0]:
-                    break
-
-        else:
-            while True:
-                sentiment_arr = np.delete(sentiment_arr, sentiment_arr.shape[0] - 1, axis=0)
-                if sentiment_arr[sentiment_arr.shape[0] - 1][0] == ohlcv_arr[ohlcv_arr.shape[0] - 1][0]:
-                    break
-
-    # Merge both arrays into a single list
-    data_arr = []
-
-    for i in range(ohlcv_arr.shape[0]):  # Should have the same shape
-        # The format for `data_arr` is: [DATE, OPEN, HIGH, LOW, CLOSE, SENTIMENT, VOLUME]
-        data_arr.append([ohlcv_arr[i][0],
-                         ohlcv_arr[i][1],
-                         ohlcv_arr[i][2],
-                         ohlcv_arr[i][3],
-                         ohlcv_arr[i][4],
-                         sentiment_arr[i][1],
-                         ohlcv_arr[i][5]])
-
-    # Return `data_arr` as a `np.ndarray`
-    return np.array(data_arr, dtype=object)
-
-
-def process_data(data_directory, stock_symbol, entries_taking_avg=10):
+    sentiment_dates, sentiment_arr = fill_missing_days(sentiment_dates, sentiment_arr)
+
+    # Fill in missing values for OHLCV data, starting from the first day with sentiment data
+    first_surpassed_index = np.searchsorted(ohlcv_dates, sentiment_dates[0])
+
+    ohlcv_dates, ohlcv_arr = fill_missing_days(ohlcv_dates[first_surpassed_index:],
+                                               ohlcv_arr[first_surpassed_index:])
+
+    # Merge both arrays into a single structured array
+    data_arr = merge_data(ohlcv_dates, ohlcv_arr, sentiment_dates, sentiment_arr, dtype=dtype)
+
+    if return_pending:
+        pending = {}
+
+        for source, dates, values in [("ohlcv", ohlcv_dates, ohlcv_arr), ("sentiment", sentiment_dates, sentiment_arr)]:
+            is_pending = dates > data_arr["Date"][-1] if len(data_arr) != 0 else np.ones(len(dates), dtype=bool)
+            pending[source] = (dates[is_pending], values[is_pending])
+
+        return data_arr, pending
+
+    return data_arr
+
+
+def stream_data(data_directory, stock_symbol, output_file, chunk_size=100000, dtype=DATA_DTYPE):
+    """
+    Gets the training data from the data directory in chunks, and writes it straight into an on-disk array.
+
+    This gives the same entries as `obtain_data`, but the CSV files are never fully loaded into memory. The
+    OHLCV data and the sentiment data are read `chunk_size` rows at a time, and the last row of each chunk is
+    carried over to the next chunk so that the missing days across chunk boundaries are filled in. Hence, the
+    peak memory usage depends on `chunk_size` (and the largest gap between two rows), and not on the length of
+    the files.
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "GOOGL" and "TSLA" are all valid stock symbols.
+
+        output_file (str): The path of the `.npy` file to write the data into.
+
+        chunk_size (int): The number of rows to read from the CSV files at a time. (Default = 100000)
+
+        dtype (np.dtype): The structured dtype of the output array. (Default = DATA_DTYPE)
+
+    Returns:
+        np.ndarray: The read-only memory-mapped structured array containing the data, in the same format as the
+                    array returned by `obtain_data`.
+
+    """
+    # Generate the paths to the files
+    file_paths = get_file_paths(data_directory, stock_symbol)
+    ohlcv_columns = ["Open", "High", "Low", "Close", "Volume"]
+
+    # Find the first and last dates of the sentiment data
+    sentiment_first_date, sentiment_last_date = None, None
+
+    for chunk in read_csv(file_paths["sentiments"], header=0, usecols=["Date"], chunksize=chunk_size):
+        chunk_dates = chunk["Date"].values.astype("datetime64[D]")
+
+        sentiment_first_date = chunk_dates.min() if sentiment_first_date is None else \
+            min(sentiment_first_date, chunk_dates.min())
+        sentiment_last_date = chunk_dates.max() if sentiment_last_date is None else \
+            max(sentiment_last_date, chunk_dates.max())
+
+    # Find the first date of the OHLCV data on or after the first date of the sentiment data, and its last date
+    ohlcv_first_date, ohlcv_last_date = None, None
+
+    for chunk in read_csv(file_paths["stocks"], header=0, usecols=["Date"], chunksize=chunk_size):
+        chunk_dates = chunk["Date"].values.astype("datetime64[D]")
+
+        if ohlcv_first_date is None and chunk_dates[-1] >= sentiment_first_date:
+            ohlcv_first_date = chunk_dates[np.searchsorted(chunk_dates, sentiment_first_date)]
+        ohlcv_last_date = chunk_dates[-1]
+
+    # Only keep the days which are in both the sentiment and OHLCV data (leaving out the latest day of each)
+    first_date = max(sentiment_first_date, ohlcv_first_date)
+    last_date = min(sentiment_last_date, ohlcv_last_date) - 1
+    no_entries = max(int((last_date - first_date).astype(np.int64)) + 1, 0)
+
+    data_arr = np.lib.format.open_memmap(output_file, mode="w+", dtype=dtype, shape=(no_entries,))
+
+    for i in range(0, no_entries, chunk_size):
+        data_arr["Date"][i:i + chunk_size] = first_date + np.arange(i, min(i + chunk_size, no_entries))
+
+    def write_values(dates, values, columns):
+        """
+        Writes the values of the days which are kept into the output array.
+
+        Args:
+            dates (np.ndarray): The `datetime64[D]` array of consecutive days.
+
+            values (np.ndarray): A 2D float array, where `values[i]` holds the values on `dates[i]`.
+
+            columns (List[str]): The names of the columns of `values`.
+
+        """
+        is_kept = (dates >= first_date) & (dates <= last_date)
+
+        if is_kept.any():
+            first_index = int((dates[is_kept][0] - first_date).astype(np.int64))
+
+            for j, column in enumerate(columns):
+                kept_values = values[is_kept, j]
+
+                if column == "Volume":
+                    kept_values = np.trunc(kept_values)  # We don't want partial volumes
+
+                data_arr[column][first_index:first_index + len(kept_values)] = kept_values
+
+    # Fill in missing values for OHLCV data, chunk by chunk
+    carried_date, carried_values = None, None
+
+    for chunk in read_csv(file_paths["stocks"], header=0, usecols=["Date"] + ohlcv_columns, chunksize=chunk_size):
+        chunk_dates = chunk["Date"].values.astype("datetime64[D]")
+        chunk_values = chunk[ohlcv_columns].values.astype(np.float64)
+
+        if carried_date is not None:
+            chunk_dates = np.append(carried_date, chunk_dates)
+            chunk_values = np.vstack([carried_values, chunk_values])
+
+        write_values(*fill_missing_days(chunk_dates, chunk_values), ohlcv_columns)
+        carried_date, carried_values = chunk_dates[-1:], chunk_values[-1:]
+
+    # Fill in missing values for sentiment data, chunk by chunk (the sentiment data is stored from the latest date
+    # to the earliest date, so each chunk is reversed and the carried row is the earliest row of the last chunk)
+    carried_date, carried_values = None, None
+
+    for chunk in read_csv(file_paths["sentiments"], header=0, chunksize=chunk_size):
+        chunk_dates = chunk["Date"].values[::-1].astype("datetime64[D]")
+        chunk_values = chunk[["Sentiment"]].values[::-1].astype(np.float64)
+
+        if carried_date is not None:
+            chunk_dates = np.append(chunk_dates, carried_date)
+            chunk_values = np.vstack([chunk_values, carried_values])
+
+        write_values(*fill_missing_days(chunk_dates, chunk_values), ["Sentiment"])
+        carried_date, carried_values = chunk_dates[:1], chunk_values[:1]
+
+    # Save the output array and reopen it as a read-only array
+    data_arr.flush()
+    del data_arr
+
+    return np.load(output_file, mmap_mode="r")
+
+
+def average_data(price_arr, volume_arr, entries_taking_avg=10, kernel="simple"):
+    """
+    Takes the moving average of the merged data, which gives the entries of the processed dataframe.
+
+    Args:
+        price_arr (np.ndarray): The float open, high, low, close and sentiment values of consecutive days.
+
+        volume_arr (np.ndarray): The integer volumes of those days, as a column.
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+        kernel (str): The averaging kernel used by `rolling_average`. (Default = "simple")
+
+    Returns:
+        pd.DataFrame: The averaged entries. There are `entries_taking_avg` fewer entries than days.
+
+    """
+    # Take the moving average of both the OHLCV values and the sentiment values
+    # (The entry on day `i` is the average of the `entries_taking_avg` entries before it, so the last window is
+    # not used)
+    averaged_prices = rolling_average(price_arr, entries_taking_avg, kernel=kernel)[:-1]
+    averaged_volumes = rolling_average(volume_arr, entries_taking_avg, kernel=kernel)[:-1]
+
+    # Convert the averaged values to a `pd.DataFrame`
+    df = pd.DataFrame(averaged_prices, columns=["Open", "High", "Low", "Close", "Sentiment"])
+    df["Volume"] = np.trunc(averaged_volumes[:, 0]).astype(np.int64)  # We don't want partial volumes
+
+    return df
+
+
+def process_data(data_directory, stock_symbol, entries_taking_avg=10, kernel="simple", return_dates=False,
+                 return_checkpoint=False):
     """
     Processes the dataframe generated by `obtain_data`
 
@@ -189,50 +586,238 @@ def process_data(data_directory, stock_symbol, entries_taking_avg=10):
         entries_taking_avg (int): The number of entries to consider when taking the average.
                                   (Default = 10)
 
-                                  This parameter is used for the `moving_average` function defined
+                                  This parameter is used for the `rolling_average` function defined
                                   in `miscUtils.py`. For its use case, consult that file.
 
+        kernel (str): The averaging kernel used by `rolling_average`. (Default = "simple")
+
+        return_dates (bool): Should the dates of the processed entries also be returned? (Default = False)
+
+        return_checkpoint (bool): Should the checkpoint of the processing also be returned? (Default = False)
+
+                                  The checkpoint holds everything that is needed to process the rows which are
+                                  added to the source files later, without reading the whole files again (see
+                                  `process_appended_data`). It only contains built-in types, so it can be saved
+                                  as JSON.
+
     Returns:
         pd.DataFrame: The processed dataframe, which can be used for training/testing.
+        np.ndarray: The `datetime64[D]` dates of the entries in the processed dataframe. This is only returned
+                    if `return_dates` is True.
+        dict: The checkpoint of the processing. This is None if there are no entries. This is only returned if
+              `return_checkpoint` is True.
 
     """
+    # Record where the rows of the source files end before they are read
+    file_paths = get_file_paths(data_directory, stock_symbol)
+    boundaries = {"stocks": get_file_boundary(file_paths["stocks"]),
+                  "sentiments": get_file_boundary(file_paths["sentiments"])} if return_checkpoint else None
 
     # Get the data
-    stock_data = obtain_data(data_directory, stock_symbol)
+    stock_data, pending = obtain_data(data_directory, stock_symbol, return_pending=True)
 
-    # Take the moving average of both the OHLCV values and the sentiment values
-    averaged_values = []
-
-    for i in range(entries_taking_avg, len(stock_data)):  # Remove `entries_taking_avg` entries from the list
-        averaged_values.append([moving_average(stock_data, 1, i, entries_taking_avg),
-                                moving_average(stock_data, 2, i, entries_taking_avg),
-                                moving_average(stock_data, 3, i, entries_taking_avg),
-                                moving_average(stock_data, 4, i, entries_taking_avg),
-                                moving_average(stock_data, 5, i, entries_taking_avg),
-                                moving_average(stock_data, 6, i, entries_taking_avg)])
-
-    # Convert `averaged_values` to a dictionary
-    df_dict = {"Open": [], "High": [], "Low": [], "Close": [], "Sentiment": [], "Volume": []}
-
-    for i in range(len(averaged_values)):
-        df_dict["Open"].append(averaged_values[i][0])
-        df_dict["High"].append(averaged_values[i][1])
-        df_dict["Low"].append(averaged_values[i][2])
-        df_dict["Close"].append(averaged_values[i][3])
-        df_dict["Sentiment"].append(averaged_values[i][4])
-        df_dict["Volume"].append(int(averaged_values[i][5]))
-
-    # Convert the dictionary to a `pd.DataFrame`
-    df = pd.DataFrame(df_dict)
+    # Split the data into the prices and sentiment (as floats) and the volume (as integers)
+    price_arr = np.stack([stock_data[column] for column in ["Open", "High", "Low", "Close", "Sentiment"]], axis=1)
+    volume_arr = stock_data["Volume"].astype(np.int64)[:, None]
 
-    return df
+    df = average_data(price_arr, volume_arr, entries_taking_avg=entries_taking_avg, kernel=kernel)
+
+    # The date of each entry is the day after the last day that was averaged
+    dates = stock_data["Date"][entries_taking_avg:]
+
+    outputs = [df]
+
+    if return_dates:
+        outputs.append(dates)
 
+    if return_checkpoint:
+        outputs.append(create_checkpoint(stock_data["Date"][-1], price_arr, volume_arr, pending, boundaries,
+                                         entries_taking_avg, kernel) if len(df) != 0 else None)
 
-def add_technical_indicators(df):
+    return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+
+def create_checkpoint(last_date, price_arr, volume_arr, pending, boundaries, entries_taking_avg, kernel):
     """
+    Creates the checkpoint of the processing of a stock's data (see `process_data`).
+
+    Args:
+        last_date (np.datetime64): The last day of the merged data (see `obtain_data`).
+
+        price_arr (np.ndarray): The float open, high, low, close and sentiment values of the merged data, up to
+                                `last_date`.
+
+        volume_arr (np.ndarray): The integer volumes of the merged data, as a column.
+
+        pending (dict): The filled in days of each source after `last_date`.
+
+        boundaries (dict): The boundaries of the rows of the stocks file and the sentiments file.
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+
+        kernel (str): The averaging kernel used by `rolling_average`.
+
+    Returns:
+        dict: The checkpoint, which only contains built-in types.
+
+    """
+    return {"entries_taking_avg": entries_taking_avg,
+            "kernel": kernel,
+            "last_date": str(last_date),
+            "window": {"prices": price_arr[-entries_taking_avg:].tolist(),
+                       "volumes": volume_arr[-entries_taking_avg:, 0].tolist()},
+            "pending": {source: {"dates": [str(date) for date in dates], "values": values.tolist()}
+                        for source, (dates, values) in pending.items()},
+            "sources": boundaries}
+
+
+def process_appended_data(data_directory, stock_symbol, checkpoint):
+    """
+    Processes the rows which were added to a stock's source files since a checkpoint was created.
+
+    Only the new rows of the source files are read (see `read_new_rows`), so the time taken depends on the number
+    of new rows, and not on the length of the whole history. The new entries are identical to the entries that
+    `process_data` returns for the same days.
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "BA" and "S63.SI" are all valid stock symbols.
+
+        checkpoint (dict): The checkpoint returned by `process_data` (or by this function).
+
+    Returns:
+        pd.DataFrame: The processed dataframe of the new entries. It may be empty.
+        np.ndarray: The `datetime64[D]` dates of the new entries.
+        dict: The new checkpoint.
+
+        If the source files were changed in any other way than by adding rows with later dates, then None is
+        returned instead.
+
+    """
+    file_paths = get_file_paths(data_directory, stock_symbol)
+    entries_taking_avg = checkpoint["entries_taking_avg"]
+
+    # Read the new rows of the source files
+    new_rows = {"ohlcv": read_new_rows(file_paths["stocks"], checkpoint["sources"]["stocks"],
+                                       ["Open", "High", "Low", "Close", "Volume"]),
+                "sentiment": read_new_rows(file_paths["sentiments"], checkpoint["sources"]["sentiments"],
+                                           ["Sentiment"], latest_first=True)}
+
+    if new_rows["ohlcv"] is None or new_rows["sentiment"] is None:
+        return None
+
+    # Fill in the missing days between the last day of each source and its new rows
+    pending = {}
+
+    for source, (new_dates, new_values, _) in new_rows.items():
+        dates = np.array(checkpoint["pending"][source]["dates"], dtype="datetime64[D]")
+        values = np.array(checkpoint["pending"][source]["values"], dtype=np.float64).reshape(len(dates), -1)
+
+        if len(new_dates) != 0:
+            if new_dates[0] <= dates[-1] or np.any(np.diff(new_dates).astype(np.int64) <= 0):
+                return None
+
+            filled_dates, filled_values = fill_missing_days(np.append(dates[-1:], new_dates),
+                                                            np.vstack([values[-1:], new_values]))
+            dates, values = np.append(dates[:-1], filled_dates), np.vstack([values[:-1], filled_values])
+
+        pending[source] = (dates, values)
+
+    # Merge the days which are now in both sources
+    stock_data = merge_data(*pending["ohlcv"], *pending["sentiment"])
+
+    for source, (dates, values) in pending.items():
+        is_pending = dates > stock_data["Date"][-1] if len(stock_data) != 0 else np.ones(len(dates), dtype=bool)
+        pending[source] = (dates[is_pending], values[is_pending])
+
+    # Average the new days, continuing from the last days that were averaged
+    price_arr = np.vstack([np.array(checkpoint["window"]["prices"], dtype=np.float64).reshape(-1, 5),
+                           np.stack([stock_data[column] for column in ["Open", "High", "Low", "Close", "Sentiment"]],
+                                    axis=1)])
+    volume_arr = np.append(np.array(checkpoint["window"]["volumes"], dtype=np.int64),
+                           stock_data["Volume"].astype(np.int64))[:, None]
+
+    df = average_data(price_arr, volume_arr, entries_taking_avg=entries_taking_avg, kernel=checkpoint["kernel"])
+    dates = stock_data["Date"]
+
+    # Update the checkpoint
+    last_date = stock_data["Date"][-1] if len(stock_data) != 0 else checkpoint["last_date"]
+    new_checkpoint = create_checkpoint(last_date, price_arr, volume_arr, pending,
+                                       {"stocks": new_rows["ohlcv"][2], "sentiments": new_rows["sentiment"][2]},
+                                       entries_taking_avg, checkpoint["kernel"])
+
+    return df, dates, new_checkpoint
+
+
+def load_price_tensor(data_directory, stock_symbols=None, entries_taking_avg=10):
+    """
+    Processes many stocks and stacks their OHLCV values into a single tensor, aligned by date.
+
+    The tensor covers every day from the earliest first entry to the latest last entry of the stocks. The days on
+    which a stock has no entry are NaN, and are marked as missing in the mask. This is the input of
+    `indicatorUtils.compute_batch_indicators`.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbols (List[str]): The stock symbols to stack. (Default = None, which means that every stock in
+                                   `data_directory` is stacked)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+    Returns:
+        np.ndarray: The OHLCV values, with the shape (stocks, time, fields). The fields are in the order of
+                    `indicatorUtils.OHLCV_FIELDS`.
+        np.ndarray: The boolean mask with the shape (stocks, time), which is True for the entries that exist.
+        np.ndarray: The `datetime64[D]` dates of the time axis.
+
+    """
+    stock_symbols = get_stock_symbols(data_directory) if stock_symbols is None else stock_symbols
+
+    # Process every stock
+    processed = [process_data(data_directory, stock_symbol, entries_taking_avg=entries_taking_avg,
+                              return_dates=True) for stock_symbol in stock_symbols]
+
+    non_empty = [dates for _, dates in processed if len(dates) != 0]
+    first_date = min(dates[0] for dates in non_empty) if len(non_empty) != 0 else np.datetime64("NaT", "D")
+    no_entries = (max(dates[-1] for dates in non_empty) - first_date).astype(np.int64) + 1 if len(non_empty) != 0 \
+        else 0
+
+    # Place each stock's entries on the shared time axis (the processed entries are on consecutive days)
+    price_tensor = np.full((len(stock_symbols), no_entries, len(OHLCV_FIELDS)), np.nan)
+    mask = np.zeros((len(stock_symbols), no_entries), dtype=bool)
+
+    for i, (df, dates) in enumerate(processed):
+        if len(dates) != 0:
+            start = (dates[0] - first_date).astype(np.int64)
+
+            price_tensor[i, start:start + len(dates)] = df[OHLCV_FIELDS].values
+            mask[i, start:start + len(dates)] = True
+
+    return price_tensor, mask, first_date + np.arange(no_entries)
+
+
+def add_technical_indicators(df, indicators=None, fill=True):
+    """
+    Adds the technical indicators listed in `TECHNICAL_INDICATORS` (or a subset of them) to the dataframe.
+
+    The indicators are computed by `indicatorUtils.compute_indicators`, which gives the same values as the `ta`
+    library but computes the intermediate values that the indicators share only once. Indicators which are not
+    selected are not computed at all.
+
     Args:
         df (pd.DataFrame): The processed dataframe returned by `process_data`.
 
+        indicators (List[str]): The technical indicators to add (see `get_feature_set`).
+                                (Default = None, which means that `TECHNICAL_INDICATORS` is used)
+
+        fill (bool): Should the NaN values of the technical indicators be filled in (see
+                     `fill_technical_indicators`)? (Default = True)
+
     Returns:
         pd.DataFrame: The updated dataframe with the technical indicators inside.
 
@@ -243,54 +828,32 @@ def add_technical_indicators(df):
 
     """
 
-    # Add momentum indicators
-    df["AO"] = ta.ao(df["High"], df["Low"])
-    df["MFI"] = ta.money_flow_index(df["High"], df["Low"], df["Close"], df["Volume"])
-    df["RSI"] = ta.rsi(df["Close"])
-    df["TSI"] = ta.tsi(df["Close"])
-    df["UO"] = ta.uo(df["High"], df["Low"], df["Close"])
-
-    # Add trend indicators
-    df["Aroon_up"] = ta.aroon_up(df["Close"])
-    df["Aroon_down"] = ta.aroon_down(df["Close"])
-    df["Aroon_ind"] = (df["Aroon_up"] - df["Aroon_down"])
-    df["CCI"] = ta.cci(df["High"], df["Low"], df["Close"])
-    df["DPO"] = ta.dpo(df["Close"])
-    df["KST"] = ta.kst(df["Close"])
-    df["KST_sig"] = ta.kst_sig(df["Close"])
-    df["KST_diff"] = (df["KST"] - df["KST_sig"])
-    df["MACD_diff"] = ta.macd_diff(df["Close"])
-    df["Mass_index"] = ta.mass_index(df["High"], df["Low"])
-    df["Trix"] = ta.trix(df["Close"])
-    df["Vortex_pos"] = ta.vortex_indicator_pos(df["High"], df["Low"], df["Close"])
-    df["Vortex_neg"] = ta.vortex_indicator_neg(df["High"], df["Low"], df["Close"])
-    df["Vortex_diff"] = abs(df["Vortex_pos"] - df["Vortex_neg"])
-
-    # Add volatility indicators
-    df["BBH"] = ta.bollinger_hband(df["Close"])
-    df["BBL"] = ta.bollinger_lband(df["Close"])
-    df["BBM"] = ta.bollinger_mavg(df["Close"])
-    df["BBHI"] = ta.bollinger_hband_indicator(df["Close"])
-    df["BBLI"] = ta.bollinger_lband_indicator(df["Close"])
-    df["KCHI"] = ta.keltner_channel_hband_indicator(df["High"], df["Low"], df["Close"])
-    df["KCLI"] = ta.keltner_channel_lband_indicator(df["High"], df["Low"], df["Close"])
-    df["DCHI"] = ta.donchian_channel_hband_indicator(df["Close"])
-    df["DCLI"] = ta.donchian_channel_lband_indicator(df["Close"])
-
-    # Volume indicators
-    df["ADI"] = ta.acc_dist_index(df["High"], df["Low"], df["Close"], df["Volume"])
-    df["CMF"] = ta.chaikin_money_flow(df["High"], df["Low"], df["Close"], df["Volume"])
-    df["EM"] = ta.ease_of_movement(df["High"], df["Low"], df["Close"], df["Volume"])
-    df["FI"] = ta.force_index(df["Close"], df["Volume"])
-    df["NVI"] = ta.negative_volume_index(df["Close"], df["Volume"])
-    df["OBV"] = ta.on_balance_volume(df["Close"], df["Volume"])
-    df["VPT"] = ta.volume_price_trend(df["Close"], df["Volume"])
-
-    # Add miscellaneous indicators
-    df["DR"] = ta.daily_return(df["Close"])
-    df["DLR"] = ta.daily_log_return(df["Close"])
-
-    # Fill in NaN values
+    # Compute the technical indicators, sharing the intermediate values between them
+    indicators = TECHNICAL_INDICATORS if indicators is None else indicators
+
+    for indicator, values in compute_indicators(df, indicators).items():
+        df[indicator] = values
+
+    if fill:
+        fill_technical_indicators(df)
+
+    return df
+
+
+def fill_technical_indicators(df):
+    """
+    Fills in the NaN values of the dataframe, in place.
+
+    Each NaN value is replaced by the next value in its column that is not NaN. The NaN values which have no such
+    value (i.e. those at the end of a column) are replaced by 0s.
+
+    Args:
+        df (pd.DataFrame): The dataframe with the technical indicators inside.
+
+    Returns:
+        pd.DataFrame: The filled in dataframe.
+
+    """
     df.fillna(method="bfill", inplace=True)  # First try `bfill`
     df.fillna(value=0, inplace=True)  # Then replace the rest of the NANs with 0s
 
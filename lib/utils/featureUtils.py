@@ -0,0 +1,520 @@
+"""
+featureUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A persistent, memory-mapped store for the processed training features of each stock.
+"""
+# IMPORTS
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lib.utils.catalogUtils import get_file_paths, get_file_stats
+from lib.utils.dataUtils import TECHNICAL_INDICATORS, add_technical_indicators, fill_technical_indicators, \
+    get_feature_set, get_stock_symbols, process_appended_data, process_data
+from lib.utils.indicatorStateUtils import INDICATOR_STATE_VERSION, create_indicator_state, update_indicator_state
+from lib.utils.miscUtils import create_path
+
+# CONSTANTS
+FEATURE_STORE_DIR = "./Feature Store/"
+FEATURE_STORE_VERSION = 2  # Increment this whenever the way that the features are generated changes
+
+
+# FUNCTIONS
+def get_feature_key(data_directory, stock_symbol, entries_taking_avg=10, indicators=None):
+    """
+    Generates the key which identifies a stock's features.
+
+    The key changes whenever the stocks file, the sentiment file, `entries_taking_avg` or the set of
+    technical indicators changes.
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "BA" and "S63.SI" are all valid stock symbols.
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+        indicators (List[str]): The technical indicators which are part of the features.
+                                (Default = None, which means that `TECHNICAL_INDICATORS` is used)
+
+    Returns:
+        str: The hexadecimal SHA-256 key of the stock's features.
+
+    """
+    indicators = TECHNICAL_INDICATORS if indicators is None else indicators
+
+    # Generate the paths to the files
+    file_paths = get_file_paths(data_directory, stock_symbol)
+
+    # Hash the raw contents of the source files
+    hasher = hashlib.sha256()
+
+    for file_path in [file_paths["stocks"], file_paths["sentiments"]]:
+        with open(file_path, "rb") as f:
+            hasher.update(f.read())
+
+    # Hash the processing parameters
+    hasher.update(json.dumps([FEATURE_STORE_VERSION, entries_taking_avg, list(indicators)]).encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def get_unfilled_rows(df):
+    """
+    Gets the latest rows of a dataframe whose NaN values are filled in with 0s because no later row has a value
+    in their column (see `dataUtils.fill_technical_indicators`).
+
+    These rows have to be filled in again when new rows are added, as the NaN values are then filled in with the
+    values of the new rows instead.
+
+    Args:
+        df (pd.DataFrame): The dataframe before its NaN values are filled in.
+
+    Returns:
+        List[List[float]]: The values of those rows (which may be NaN).
+
+    """
+    is_nan = df.isna().values
+
+    no_unfilled_rows = int(np.cumprod(is_nan[::-1], axis=0).sum(axis=0).max()) if df.size != 0 else 0
+
+    return df.values[len(df) - no_unfilled_rows:].astype(np.float64).tolist()
+
+
+def update_features(data_directory, stock_symbol, feature_arr, metadata, checkpoint):
+    """
+    Updates the stored features of a stock with the rows which were added to its source files.
+
+    Only the new rows of the source files are read and processed (see `dataUtils.process_appended_data`), and the
+    technical indicators are continued from the stored indicator state (see
+    `indicatorStateUtils.update_indicator_state`). Hence, the time taken depends on the number of new rows, and not
+    on the length of the whole history.
+
+    The processed data of the new entries is identical to that of a full rebuild. However, the `ta` library seeds
+    some technical indicators (e.g. TSI, UO, KST and ADI) with the mean of the whole history, and the stored state
+    keeps the seeds of the history that it was created from. These indicators can therefore differ slightly from a
+    full rebuild, so the updated features get their own key (see `load_features`).
+
+    NOTE: Only the ends of the old rows of the source files are checked (see `dataUtils.read_new_rows`). If older
+          rows in the source files were changed without changing the size of the files, the features have to be
+          rebuilt (e.g. by calling `load_features` with `incremental=False`).
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "BA" and "S63.SI" are all valid stock symbols.
+
+        feature_arr (np.ndarray): The stored features of the stock.
+
+        metadata (dict): The metadata of the stored features.
+
+        checkpoint (dict): The checkpoint of the stored features, which is updated in place.
+
+    Returns:
+        np.ndarray: The updated features of the stock (or `feature_arr` if there are no new entries).
+        str: The key of the updated features.
+
+        If the source files were not only appended to, then None is returned instead.
+
+    """
+    appended_data = process_appended_data(data_directory, stock_symbol, checkpoint["data"])
+
+    if appended_data is None:
+        return None
+
+    tail_df, _, checkpoint["data"] = appended_data
+
+    if len(tail_df) == 0:
+        return feature_arr, metadata["key"]
+
+    # Continue the technical indicators from the stored state
+    indicators = metadata["params"]["indicators"]
+    tail_values = [update_indicator_state(checkpoint["indicator_state"], *entry)
+                   for entry in tail_df[["High", "Low", "Close", "Volume"]].values]
+
+    for indicator in indicators:
+        tail_df[indicator] = [values[indicator] for values in tail_values]
+
+    # Fill in the latest stored rows again, together with the new entries
+    unfilled_df = pd.concat([pd.DataFrame(checkpoint["unfilled_rows"], columns=metadata["columns"], dtype=np.float64),
+                             tail_df[metadata["columns"]]], ignore_index=True)
+
+    checkpoint["unfilled_rows"] = get_unfilled_rows(unfilled_df)
+    filled_arr = fill_technical_indicators(unfilled_df).values.astype(np.float32)
+
+    # Replace the refilled rows and add the new entries
+    no_kept_rows = len(feature_arr) - (len(unfilled_df) - len(tail_df))
+    feature_arr = np.concatenate([feature_arr[:no_kept_rows], filled_arr])
+
+    # Chain the key with the changed rows, so that it never matches the key of a full rebuild
+    hasher = hashlib.sha256(metadata["key"].encode("utf-8"))
+    hasher.update(filled_arr.tobytes())
+
+    return feature_arr, hasher.hexdigest()
+
+
+def get_feature_path(store_directory, stock_symbol, indicators):
+    """
+    Generates the path (without the file extension) where a stock's features are stored.
+
+    Features with a subset of the technical indicators are stored separately from the features with every
+    technical indicator, so that several feature sets can be stored at the same time.
+
+    Args:
+        store_directory (str): The directory where the features are stored.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+
+        indicators (List[str]): The technical indicators which are part of the features.
+
+    Returns:
+        str: The path to the stored features.
+
+    Examples:
+        >>> get_feature_path("./Feature Store/", "AAPL", TECHNICAL_INDICATORS)
+        './Feature Store/AAPL_features'
+
+    """
+    feature_path = store_directory + stock_symbol + "_features"
+
+    if list(indicators) != TECHNICAL_INDICATORS:
+        feature_path += "_" + hashlib.sha256(json.dumps(list(indicators)).encode("utf-8")).hexdigest()[:12]
+
+    return feature_path
+
+
+def get_entry_dates(first_date, no_entries):
+    """
+    Gets the dates of the entries of a stock's features, which are consecutive days (see
+    `dataUtils.fill_missing_days`).
+
+    Args:
+        first_date (str): The date of the first entry, in the form YYYY-MM-DD. This is None if there are no entries.
+
+        no_entries (int): The number of entries.
+
+    Returns:
+        np.ndarray: The `datetime64[D]` date of each entry.
+
+    Examples:
+        >>> get_entry_dates("2019-12-30", 3)
+        array(['2019-12-30', '2019-12-31', '2020-01-01'], dtype='datetime64[D]')
+
+    """
+    if first_date is None:
+        return np.array([], dtype="datetime64[D]")
+
+    return np.datetime64(first_date, "D") + np.arange(no_entries)
+
+
+def update_stored_features(data_directory, stock_symbol, entries_taking_avg=10, store_directory=FEATURE_STORE_DIR,
+                           feature_set=None, incremental=True, verbose=False):
+    """
+    Brings the stored features (i.e. the processed data with the technical indicators) of a stock up to date,
+    rebuilding them if they are missing or outdated.
+
+    The features are stored as a float32 `.npy` file alongside a small `.json` metadata header. The metadata
+    records the modification time and size of the source files. On a warm start, these are the same, so only the
+    metadata is read, and no parsing, hashing or computing is done.
+
+    If the source files have only been appended to since the features were stored (e.g. by a daily run of
+    `Update Training Data.py`), then only the new rows are processed, continuing from the checkpoint that is
+    stored alongside the features (see `update_features`). Updated features are not identical to rebuilt
+    features, so their key is derived from the key of the stored features and the updated rows instead of from
+    the source files. The metadata records the key of the last full rebuild ("base_key") and the number of
+    updates since then ("no_updates").
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "BA" and "S63.SI" are all valid stock symbols.
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the features (see
+                                             `dataUtils.get_feature_set`). Indicators which are not selected are
+                                             not computed. (Default = None, which means that every technical
+                                             indicator is used)
+
+        incremental (bool): Should outdated features be updated with the new rows only (instead of being rebuilt
+                            from the whole history)? If False, no checkpoint is stored either. (Default = True)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        str: The path to the stored features (see `get_feature_path`).
+        dict: The metadata of the stored features.
+
+    """
+    indicators = get_feature_set(feature_set)
+
+    # Generate the paths to the stored files
+    feature_path = get_feature_path(store_directory, stock_symbol, indicators)
+    file_paths = get_file_paths(data_directory, stock_symbol)
+
+    feature_params = {"version": FEATURE_STORE_VERSION,
+                      "entries_taking_avg": entries_taking_avg,
+                      "indicators": indicators}
+    source_stats = {"stocks": get_file_stats(file_paths["stocks"]),
+                    "sentiments": get_file_stats(file_paths["sentiments"])}
+
+    # Try to use the stored features
+    feature_arr = None
+
+    try:
+        with open(feature_path + ".json", "r") as f:
+            metadata = json.load(f)
+
+        stored_arr = np.load(feature_path + ".npy", mmap_mode="r")
+
+        if metadata["params"] == feature_params and list(stored_arr.shape) == metadata["shape"]:
+            if metadata["sources"] == source_stats:
+                if verbose:
+                    print(f"Loaded {stock_symbol} features from the feature store.")
+
+                return feature_path, metadata
+
+            if incremental:
+                with open(feature_path + "_checkpoint.json", "r") as f:
+                    checkpoint = json.load(f)
+
+                if checkpoint["key"] == metadata["key"] and \
+                        checkpoint["indicator_state"]["version"] == INDICATOR_STATE_VERSION:
+                    if verbose:
+                        print(f"Updating {stock_symbol} features...")
+
+                    update = update_features(data_directory, stock_symbol, stored_arr, metadata, checkpoint)
+
+                    if update is not None:
+                        feature_arr, feature_key = update
+                        metadata.update({"key": feature_key,
+                                         "no_updates": metadata["no_updates"] + (feature_key != metadata["key"]),
+                                         "sources": source_stats,
+                                         "shape": list(feature_arr.shape)})
+
+    except (OSError, ValueError, KeyError):
+        pass  # The stored features are missing, corrupted or cannot be updated; rebuild them
+
+    # Generate the features
+    if feature_arr is None:
+        if verbose:
+            print(f"Building {stock_symbol} features...")
+
+        feature_key = get_feature_key(data_directory, stock_symbol, entries_taking_avg=entries_taking_avg,
+                                      indicators=indicators)
+
+        df, dates, data_checkpoint = process_data(data_directory, stock_symbol, entries_taking_avg=entries_taking_avg,
+                                                  return_dates=True, return_checkpoint=True)
+
+        # Create the checkpoint from the whole history, before the NaN values are filled in
+        checkpoint = None
+
+        if incremental and data_checkpoint is not None:
+            checkpoint = {"data": data_checkpoint, "indicator_state": create_indicator_state(df)}
+
+        df = add_technical_indicators(df, indicators, fill=False)
+
+        if checkpoint is not None:
+            checkpoint["unfilled_rows"] = get_unfilled_rows(df)
+
+        feature_arr = fill_technical_indicators(df).values.astype(np.float32)
+
+        metadata = {"key": feature_key,
+                    "base_key": feature_key,
+                    "no_updates": 0,
+                    "symbol": stock_symbol,
+                    "params": feature_params,
+                    "sources": source_stats,
+                    "columns": list(df.columns),
+                    "shape": list(feature_arr.shape),
+                    "dtype": str(feature_arr.dtype),
+                    "first_date": str(dates[0]) if len(dates) != 0 else None}
+
+    # Save the features, replacing the old files atomically so that other processes never see a partial file (the
+    # metadata is replaced last, so the features and the checkpoint are only used once all of them are replaced)
+    create_path(store_directory)
+    temp_suffix = f".{os.getpid()}.tmp"
+
+    if not isinstance(feature_arr, np.memmap):  # Unchanged features are not saved again
+        np.save(feature_path + temp_suffix + ".npy", feature_arr)
+        os.replace(feature_path + temp_suffix + ".npy", feature_path + ".npy")
+
+    if checkpoint is not None:
+        checkpoint["key"] = metadata["key"]
+
+        with open(feature_path + temp_suffix + "_checkpoint.json", "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(feature_path + temp_suffix + "_checkpoint.json", feature_path + "_checkpoint.json")
+
+    with open(feature_path + temp_suffix + ".json", "w") as f:
+        json.dump(metadata, f, indent=4)
+    os.replace(feature_path + temp_suffix + ".json", feature_path + ".json")
+
+    return feature_path, metadata
+
+
+def open_features(feature_path, metadata, return_dates=False):
+    """
+    Opens stored features as a read-only memory-mapped array, so that several processes can share the same copy
+    of the features through the page cache.
+
+    Args:
+        feature_path (str): The path to the stored features (see `update_stored_features`).
+
+        metadata (dict): The metadata of the stored features (see `update_stored_features`).
+
+        return_dates (bool): Should the dates of the entries also be returned? (Default = False)
+
+    Returns:
+        pd.DataFrame: The features, backed by a read-only memory-mapped array.
+        np.ndarray: The `datetime64[D]` dates of the entries, which are consecutive days. This is only returned if
+                    `return_dates` is True.
+
+    Raises:
+        ValueError: If the stored features do not match the metadata (e.g. if they were replaced in the meantime).
+
+    """
+    feature_arr = np.load(feature_path + ".npy", mmap_mode="r")
+
+    if list(feature_arr.shape) != metadata["shape"]:
+        raise ValueError(f"The stored features at '{feature_path}' do not match their metadata")
+
+    df = pd.DataFrame(feature_arr, columns=metadata["columns"], copy=False)
+
+    if return_dates:
+        return df, get_entry_dates(metadata["first_date"], len(df))
+
+    return df
+
+
+def load_features(data_directory, stock_symbol, entries_taking_avg=10, store_directory=FEATURE_STORE_DIR,
+                  feature_set=None, incremental=True, return_dates=False, verbose=False):
+    """
+    Loads the features (i.e. the processed data with the technical indicators) of a stock from the feature
+    store, bringing the stored features up to date first (see `update_stored_features`).
+
+    Args:
+        data_directory (str): The directory which contains the OHLCV data file (a.k.a. stocks
+                              file) and the sentiment data file.
+
+        stock_symbol (str): The stock symbol. Also known as the stock ticker.
+                            For example, "AAPL", "BA" and "S63.SI" are all valid stock symbols.
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the features (see
+                                             `dataUtils.get_feature_set`). (Default = None, which means that every
+                                             technical indicator is used)
+
+        incremental (bool): Should outdated features be updated with the new rows only (instead of being rebuilt
+                            from the whole history)? (Default = True)
+
+        return_dates (bool): Should the dates of the entries also be returned? (Default = False)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        pd.DataFrame: The features of the stock, backed by a read-only memory-mapped array.
+        np.ndarray: The `datetime64[D]` dates of the entries, which are consecutive days. This is only returned if
+                    `return_dates` is True.
+
+    """
+    feature_path, metadata = update_stored_features(data_directory, stock_symbol,
+                                                    entries_taking_avg=entries_taking_avg,
+                                                    store_directory=store_directory, feature_set=feature_set,
+                                                    incremental=incremental, verbose=verbose)
+
+    return open_features(feature_path, metadata, return_dates=return_dates)
+
+
+def load_all_features(data_directory, stock_symbols=None, entries_taking_avg=10, store_directory=FEATURE_STORE_DIR,
+                      feature_set=None, no_workers=None, verbose=False):
+    """
+    Loads the features of many stocks at once, building or updating the stored features in a process pool.
+
+    Each worker process brings the stored features of one stock up to date (see `update_stored_features`) and
+    returns their path and metadata. The features are then memory-mapped in this process (see `open_features`),
+    so no features are copied between the processes and the source files are not checked again. If a stock's
+    features cannot be loaded, the error is recorded and the other stocks are still loaded.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbols (List[str]): The stock symbols to load. (Default = None, which means that every stock in
+                                   `data_directory` is loaded)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average.
+                                  (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the features (see
+                                             `dataUtils.get_feature_set`). (Default = None, which means that every
+                                             technical indicator is used)
+
+        no_workers (int): The number of worker processes. (Default = None, which means that the number of CPUs
+                          is used)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        Dict[str, pd.DataFrame]: The features of each stock which was loaded, keyed by the stock symbol.
+        Dict[str, Exception]: The error raised for each stock which could not be loaded, keyed by the stock
+                              symbol.
+
+    """
+    stock_symbols = get_stock_symbols(data_directory) if stock_symbols is None else stock_symbols
+
+    features = {}
+    errors = {}
+
+    # Bring the stored features up to date in the worker processes
+    with ProcessPoolExecutor(max_workers=no_workers) as executor:
+        futures = {stock_symbol: executor.submit(update_stored_features, data_directory, stock_symbol,
+                                                 entries_taking_avg=entries_taking_avg,
+                                                 store_directory=store_directory, feature_set=feature_set,
+                                                 verbose=verbose)
+                   for stock_symbol in stock_symbols}
+
+        # Memory-map the stored features using the paths and metadata returned by the workers
+        for stock_symbol, future in futures.items():
+            try:
+                features[stock_symbol] = open_features(*future.result())
+
+            except Exception as e:  # Isolate the failure to this stock
+                errors[stock_symbol] = e
+
+                if verbose:
+                    print(f"Failed to load {stock_symbol} features: {e!r}")
+
+    return features, errors
+
+
+# DEBUG CODE
+if __name__ == "__main__":
+    print(load_features("../../Training Data/", "FB", store_directory="../../Feature Store/", verbose=True))
@@ -0,0 +1,562 @@
+"""
+indicatorStateUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A serializable state which updates the technical indicators one entry at a time.
+"""
+# IMPORTS
+import json
+import math
+
+import numpy as np
+
+from lib.utils.indicatorUtils import ema, get_money_flow_volume, mean_shift
+
+# CONSTANTS
+INDICATOR_STATE_VERSION = 1  # Increment this whenever the format of the state changes
+
+HISTORY_LENGTHS = {"Close": 30, "High": 1, "Low": 1, "Volume": 2, "log_close": 1, "typical_price": 1,
+                   "money_flow_volume": 1, "volume_price_trend": 1, "triple_ema": 1}  # Past values kept in the state
+KST_PARAMS = [(10, 10), (15, 10), (20, 10), (30, 15)]  # The (ROC periods, window) of each ROC average in the KST
+
+
+# FUNCTIONS
+def _divide(numerator, denominator):
+    """
+    Divides two floats in the same way as NumPy does (i.e. dividing by zero gives infinity or NaN instead of
+    raising an error).
+
+    Args:
+        numerator (float): The numerator.
+
+        denominator (float): The denominator.
+
+    Returns:
+        float: The quotient.
+
+    """
+    try:
+        return numerator / denominator
+
+    except ZeroDivisionError:
+        if numerator == 0 or numerator != numerator:
+            return math.nan
+
+        return math.copysign(math.inf, numerator) * math.copysign(1., denominator)
+
+
+def create_ewm_state(span=None, com=None, min_periods=0):
+    """
+    Creates the state of an exponentially weighted moving average.
+
+    Args:
+        span (float): The span of the average. Either `span` or `com` has to be given. (Default = None)
+
+        com (float): The centre of mass of the average. (Default = None)
+
+        min_periods (int): The minimum number of non-NaN entries needed to have a value. (Default = 0)
+
+    Returns:
+        dict: The state of the average.
+
+    """
+    com = (span - 1) / 2 if span is not None else com
+
+    return {"alpha": 1. / (1. + com), "min_periods": max(int(min_periods), 1), "weighted": math.nan, "old_wt": 1.,
+            "nobs": 0}
+
+
+def update_ewm(state, value):
+    """
+    Adds an entry to an exponentially weighted moving average.
+
+    This follows pandas' `ewm(adjust=True).mean()` step by step, so the result is exactly the same as computing
+    the average over all the entries at once.
+
+    Args:
+        state (dict): The state of the average, which is updated in place.
+
+        value (float): The new entry.
+
+    Returns:
+        float: The average up to and including the new entry.
+
+    """
+    is_observation = value == value
+    state["nobs"] += int(is_observation)
+
+    if state["weighted"] == state["weighted"]:
+        state["old_wt"] *= 1. - state["alpha"]
+
+        if is_observation:
+            if state["weighted"] != value:  # Avoid numerical errors on constant series, like pandas
+                state["weighted"] = (state["old_wt"] * state["weighted"] + value) / (state["old_wt"] + 1.)
+
+            state["old_wt"] += 1.
+
+    elif is_observation:
+        state["weighted"] = value
+
+    return state["weighted"] if state["nobs"] >= state["min_periods"] else math.nan
+
+
+def create_rolling_state(window, method, min_periods=None):
+    """
+    Creates the state of a rolling window.
+
+    Args:
+        window (int): The number of entries in each window.
+
+        method (str): The statistic of the window, which is either "sum", "mean", "std" (with `ddof=0`), "max",
+                      "min" or "window" (i.e. the entries of the window themselves).
+
+        min_periods (int): The minimum number of non-NaN entries needed to have a value.
+                           (Default = None, which means that `window` is used)
+
+    Returns:
+        dict: The state of the rolling window.
+
+    """
+    return {"window": window, "method": method, "min_periods": window if min_periods is None else min_periods,
+            "values": [], "nobs": 0, "sum": 0., "mean": 0., "ssqdm": 0., "neg_ct": 0, "compensation_add": 0.,
+            "compensation_remove": 0., "num_consecutive_same_value": 0, "prev_value": math.nan}
+
+
+def _add_to_window(state, value):
+    """
+    Adds a non-NaN value to the accumulators of a rolling window, in the same way as pandas' window functions.
+
+    Args:
+        state (dict): The state of the rolling window, which is updated in place.
+
+        value (float): The value to add.
+
+    """
+    state["nobs"] += 1
+
+    if value == state["prev_value"]:
+        state["num_consecutive_same_value"] += 1
+
+    else:
+        state["num_consecutive_same_value"] = 1
+
+    state["prev_value"] = value
+
+    if state["method"] in ["sum", "mean"]:  # Kahan summation
+        y = value - state["compensation_add"]
+        t = state["sum"] + y
+        state["compensation_add"] = t - state["sum"] - y
+        state["sum"] = t
+        state["neg_ct"] += math.copysign(1., value) < 0
+
+    elif state["method"] == "std":  # Welford's method with Kahan summation
+        prev_mean = state["mean"] - state["compensation_add"]
+        y = value - state["compensation_add"]
+        t = y - state["mean"]
+        state["compensation_add"] = t + state["mean"] - y
+        state["mean"] = state["mean"] + t / state["nobs"]
+        state["ssqdm"] = state["ssqdm"] + (value - prev_mean) * (value - state["mean"])
+
+
+def _remove_from_window(state, value):
+    """
+    Removes a non-NaN value from the accumulators of a rolling window, in the same way as pandas' window functions.
+
+    Args:
+        state (dict): The state of the rolling window, which is updated in place.
+
+        value (float): The value to remove.
+
+    """
+    state["nobs"] -= 1
+
+    if state["method"] in ["sum", "mean"]:
+        y = -value - state["compensation_remove"]
+        t = state["sum"] + y
+        state["compensation_remove"] = t - state["sum"] - y
+        state["sum"] = t
+        state["neg_ct"] -= math.copysign(1., value) < 0
+
+    elif state["method"] == "std":
+        if state["nobs"]:
+            prev_mean = state["mean"] - state["compensation_remove"]
+            y = value - state["compensation_remove"]
+            t = y - state["mean"]
+            state["compensation_remove"] = t + state["mean"] - y
+            state["mean"] = state["mean"] - t / state["nobs"]
+            state["ssqdm"] = state["ssqdm"] - (value - prev_mean) * (value - state["mean"])
+
+        else:
+            state["mean"] = 0.
+            state["ssqdm"] = 0.
+
+
+def update_rolling(state, value):
+    """
+    Adds an entry to a rolling window.
+
+    The statistics follow pandas' rolling window functions step by step, so the result is exactly the same as
+    computing the statistic over all the entries at once.
+
+    Args:
+        state (dict): The state of the rolling window, which is updated in place.
+
+        value (float): The new entry.
+
+    Returns:
+        Union[float, np.ndarray]: The statistic of the window ending at the new entry. If the method is "window",
+                                  the entries of the window are returned instead.
+
+    """
+    value = float(value)
+
+    # Move the window along
+    state["values"].append(value)
+
+    if len(state["values"]) > state["window"]:
+        removed_value = state["values"].pop(0)
+
+        if removed_value == removed_value:
+            _remove_from_window(state, removed_value)
+
+    if value == value:
+        _add_to_window(state, value)
+
+    # Calculate the statistic
+    method = state["method"]
+    nobs = state["nobs"]
+
+    if method == "window":
+        return state["values"]
+
+    if method == "sum" and nobs == 0 == state["min_periods"]:
+        return 0.
+
+    if nobs < state["min_periods"] or nobs == 0:
+        return math.nan
+
+    if method == "sum":
+        return state["prev_value"] * nobs if state["num_consecutive_same_value"] >= nobs else state["sum"]
+
+    if method == "mean":
+        if state["num_consecutive_same_value"] >= nobs:
+            return state["prev_value"]
+
+        result = state["sum"] / nobs
+
+        if (state["neg_ct"] == 0 and result < 0) or (state["neg_ct"] == nobs and result > 0):
+            return 0.
+
+        return result
+
+    if method == "std":
+        if nobs == 1 or state["num_consecutive_same_value"] >= nobs:
+            return 0.
+
+        return math.sqrt(max(state["ssqdm"] / nobs, 0.))
+
+    return (max if method == "max" else min)(state["values"])
+
+
+def create_indicator_state(price_data):
+    """
+    Creates the state of the technical indicators from the history of a stock.
+
+    The state is created by updating it with every entry of the history in turn. The `ta` library seeds the first
+    entries of some indicators with the mean of the whole history; these seeds are fixed when the state is
+    created.
+
+    Args:
+        price_data (Union[pd.DataFrame, Dict[str, np.ndarray]]): The high ("High"), low ("Low"), close ("Close")
+                                                                  and volume ("Volume") data of the history.
+
+    Returns:
+        dict: The state of the technical indicators. It only contains built-in types, so it can be saved with
+              `save_indicator_state`.
+
+    """
+    high, low, close, volume = [np.asarray(price_data[price_input], dtype=np.float64)
+                                for price_input in ["High", "Low", "Close", "Volume"]]
+
+    # Compute the seeds in the same way as the batch computation
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev_close = mean_shift(close)
+        seeds = {"Close": np.nanmean(close), "Low": np.nanmean(low),
+                 "money_flow_volume": np.nanmean(get_money_flow_volume(high, low, close, volume)),
+                 "volume_price_trend": np.nanmean(volume * ((close - prev_close) / prev_close)),
+                 "triple_ema": np.nanmean(ema(ema(ema(close, 15), 15), 15)) if len(close) != 0 else np.nan}
+
+    state = {"version": INDICATOR_STATE_VERSION,
+             "no_entries": 0,
+             "seeds": {name: float(seed) for name, seed in seeds.items()},
+             "history": {name: [] for name in HISTORY_LENGTHS},
+             "ewm": {"rsi_up": create_ewm_state(com=13), "rsi_down": create_ewm_state(com=13),
+                     "tsi_1": create_ewm_state(com=25), "tsi_2": create_ewm_state(com=13),
+                     "tsi_abs_1": create_ewm_state(com=25), "tsi_abs_2": create_ewm_state(com=13),
+                     "macd_fast": create_ewm_state(span=12, min_periods=12),
+                     "macd_slow": create_ewm_state(span=26, min_periods=26),
+                     "macd_sign": create_ewm_state(span=9, min_periods=9),
+                     "mass_1": create_ewm_state(span=9, min_periods=9),
+                     "mass_2": create_ewm_state(span=9, min_periods=9),
+                     "trix_1": create_ewm_state(span=15, min_periods=15),
+                     "trix_2": create_ewm_state(span=15, min_periods=15),
+                     "trix_3": create_ewm_state(span=15, min_periods=15)},
+             "rolling": {"ao_short": create_rolling_state(5, "mean", min_periods=0),
+                         "ao_long": create_rolling_state(34, "mean", min_periods=0),
+                         "mfi_positive": create_rolling_state(14, "window"),
+                         "mfi_negative": create_rolling_state(14, "window"),
+                         "bp_7": create_rolling_state(7, "sum", min_periods=0),
+                         "bp_14": create_rolling_state(14, "sum", min_periods=0),
+                         "bp_28": create_rolling_state(28, "sum", min_periods=0),
+                         "tr_7": create_rolling_state(7, "sum", min_periods=0),
+                         "tr_14": create_rolling_state(14, "sum", min_periods=0),
+                         "tr_28": create_rolling_state(28, "sum", min_periods=0),
+                         "aroon": create_rolling_state(25, "window", min_periods=0),
+                         "cci_window": create_rolling_state(20, "window", min_periods=0),
+                         "cci_mean": create_rolling_state(20, "mean", min_periods=0),
+                         "kst_sig": create_rolling_state(9, "mean", min_periods=0),
+                         "mass_sum": create_rolling_state(25, "sum", min_periods=0),
+                         "vortex_pos": create_rolling_state(14, "sum", min_periods=0),
+                         "vortex_neg": create_rolling_state(14, "sum"),
+                         "vortex_tr": create_rolling_state(14, "sum"),
+                         "close_mean": create_rolling_state(20, "mean", min_periods=0),
+                         "close_std": create_rolling_state(20, "std", min_periods=0),
+                         "close_max": create_rolling_state(20, "max"),
+                         "close_min": create_rolling_state(20, "min"),
+                         "cmf_flow": create_rolling_state(20, "sum", min_periods=0),
+                         "cmf_volume": create_rolling_state(20, "sum", min_periods=0),
+                         "em": create_rolling_state(20, "mean", min_periods=0),
+                         **{f"kst_{roc_periods}": create_rolling_state(window, "mean", min_periods=0)
+                            for roc_periods, window in KST_PARAMS}},
+             "cumulative": {"NVI": 1000., "OBV": 0.}}
+
+    # Update the state with the history
+    for i in range(len(close)):
+        update_indicator_state(state, high[i], low[i], close[i], volume[i])
+
+    return state
+
+
+def update_indicator_state(state, high, low, close, volume):
+    """
+    Updates the state of the technical indicators with a new entry, in constant time.
+
+    The values are exactly the same as those that `indicatorUtils.compute_indicators` computes for the entry
+    over the whole history (with the seeds that were fixed when the state was created).
+
+    Args:
+        state (dict): The state of the technical indicators, which is updated in place.
+
+        high (float): The high price of the new entry.
+
+        low (float): The low price of the new entry.
+
+        close (float): The close price of the new entry.
+
+        volume (float): The volume of the new entry.
+
+    Returns:
+        Dict[str, float]: The values of the technical indicators (see `dataUtils.TECHNICAL_INDICATORS`) for the new
+                          entry. Like the `ta` library, the values are not filled in, so some of them may be NaN.
+
+    """
+    high, low, close, volume = float(high), float(low), float(close), float(volume)
+
+    seeds = state["seeds"]
+    history = state["history"]
+    ewm = state["ewm"]
+    rolling = state["rolling"]
+    cumulative = state["cumulative"]
+    no_entries = state["no_entries"]
+
+    def lag(name, periods=1, seed=math.nan):
+        """Gets the value of `name` from `periods` entries ago, or the seed if there is no such entry."""
+        past_values = history[name]
+        return past_values[-periods] if len(past_values) >= periods else seed
+
+    values = {}
+
+    # Shared intermediate values
+    prev_close = lag("Close", seed=seeds["Close"])
+    prev_close_nan = lag("Close")
+    close_change = close - prev_close
+    close_diff = close - prev_close_nan
+    true_low = min(low, prev_close)
+    true_range = max(high, prev_close) - true_low
+    buying_pressure = close - true_low
+    median_price = 0.5 * (high + low)
+    typical_price = (high + low + close) / 3.0
+    log_close = float(np.log(close))
+
+    close_location_value = _divide((close - low) - (high - close), high - low)
+    money_flow_volume = (0. if close_location_value != close_location_value else close_location_value) * volume
+
+    close_sma_20 = update_rolling(rolling["close_mean"], close)
+    close_std_20 = update_rolling(rolling["close_std"], close)
+    true_range_sum_14 = update_rolling(rolling["tr_14"], true_range)
+
+    # Momentum indicators
+    values["AO"] = update_rolling(rolling["ao_short"], median_price) - update_rolling(rolling["ao_long"], median_price)
+
+    prev_typical_price = lag("typical_price")
+    money_flow = typical_price * volume * (1 if typical_price > prev_typical_price else
+                                           -1 if typical_price < prev_typical_price else 0)
+    positive_flows = update_rolling(rolling["mfi_positive"], money_flow if money_flow >= 0.0 else 0.0)
+    negative_flows = update_rolling(rolling["mfi_negative"], money_flow if money_flow < 0.0 else 0.0)
+
+    if len(positive_flows) == 14:  # Sum the windows with NumPy, like `ta` does
+        money_ratio = _divide(float(np.sum(positive_flows)), abs(float(np.sum(negative_flows))))
+        values["MFI"] = 100 - _divide(100, 1 + money_ratio)
+
+    else:
+        values["MFI"] = math.nan
+
+    ema_up = update_ewm(ewm["rsi_up"], 0 if close_diff < 0 else close_diff)
+    ema_down = update_ewm(ewm["rsi_down"], -close_diff if close_diff < 0 else close_diff * 0)
+    values["RSI"] = _divide(100 * ema_up, ema_up + ema_down)
+
+    values["TSI"] = _divide(update_ewm(ewm["tsi_2"], update_ewm(ewm["tsi_1"], close_change)),
+                            update_ewm(ewm["tsi_abs_2"], update_ewm(ewm["tsi_abs_1"], abs(close_change)))) * 100
+
+    avg_s = _divide(update_rolling(rolling["bp_7"], buying_pressure), update_rolling(rolling["tr_7"], true_range))
+    avg_m = _divide(update_rolling(rolling["bp_14"], buying_pressure), true_range_sum_14)
+    avg_l = _divide(update_rolling(rolling["bp_28"], buying_pressure), update_rolling(rolling["tr_28"], true_range))
+    values["UO"] = 100.0 * ((4.0 * avg_s) + (2.0 * avg_m) + (1.0 * avg_l)) / 7.0
+
+    # Trend indicators
+    closes = update_rolling(rolling["aroon"], close)
+    values["Aroon_up"] = (closes.index(max(closes)) + 1) / 25 * 100
+    values["Aroon_down"] = (closes.index(min(closes)) + 1) / 25 * 100
+    values["Aroon_ind"] = values["Aroon_up"] - values["Aroon_down"]
+
+    typical_prices = np.array(update_rolling(rolling["cci_window"], typical_price))
+    mean_absolute_deviation = float(np.mean(np.abs(typical_prices - np.mean(typical_prices))))
+    values["CCI"] = _divide(typical_price - update_rolling(rolling["cci_mean"], typical_price),
+                            0.015 * mean_absolute_deviation)
+
+    values["DPO"] = lag("Close", 11, seed=seeds["Close"]) - close_sma_20
+
+    roc_averages = []
+
+    for roc_periods, _ in KST_PARAMS:
+        shifted_close = lag("Close", roc_periods, seed=seeds["Close"])
+        roc_averages.append(update_rolling(rolling[f"kst_{roc_periods}"],
+                                           _divide(close - shifted_close, shifted_close)))
+
+    values["KST"] = 100 * (roc_averages[0] + 2 * roc_averages[1] + 3 * roc_averages[2] + 4 * roc_averages[3])
+    values["KST_sig"] = update_rolling(rolling["kst_sig"], values["KST"])
+    values["KST_diff"] = values["KST"] - values["KST_sig"]
+
+    macd = update_ewm(ewm["macd_fast"], close) - update_ewm(ewm["macd_slow"], close)
+    values["MACD_diff"] = macd - update_ewm(ewm["macd_sign"], macd)
+
+    amplitude_ema = update_ewm(ewm["mass_1"], high - low)
+    values["Mass_index"] = update_rolling(rolling["mass_sum"],
+                                          _divide(amplitude_ema, update_ewm(ewm["mass_2"], amplitude_ema)))
+
+    triple_ema = update_ewm(ewm["trix_3"], update_ewm(ewm["trix_2"], update_ewm(ewm["trix_1"], close)))
+    prev_triple_ema = lag("triple_ema", seed=seeds["triple_ema"])
+    values["Trix"] = _divide(triple_ema - prev_triple_ema, prev_triple_ema) * 100
+
+    values["Vortex_pos"] = _divide(update_rolling(rolling["vortex_pos"], abs(high - lag("Low", seed=seeds["Low"]))),
+                                   true_range_sum_14 if no_entries >= 13 else math.nan)
+    values["Vortex_neg"] = _divide(update_rolling(rolling["vortex_neg"], abs(low - lag("High"))),
+                                   update_rolling(rolling["vortex_tr"],
+                                                  (max(high, prev_close_nan) if prev_close_nan == prev_close_nan
+                                                   else high) -
+                                                  (min(low, prev_close_nan) if prev_close_nan == prev_close_nan
+                                                   else low)))
+    values["Vortex_diff"] = abs(values["Vortex_pos"] - values["Vortex_neg"])
+
+    # Volatility indicators
+    values["BBH"] = close_sma_20 + 2 * close_std_20
+    values["BBL"] = close_sma_20 - 2 * close_std_20
+    values["BBM"] = close_sma_20
+    values["BBHI"] = 1.0 if no_entries >= 19 and close > values["BBH"] else 0.0
+    values["BBLI"] = 1.0 if no_entries >= 19 and close < values["BBL"] else 0.0
+    values["KCHI"] = 1.0 if close > ((4 * high) - (2 * low) + close) / 3.0 else 0.0
+    values["KCLI"] = 1.0 if close < ((-2 * high) + (4 * low) + close) / 3.0 else 0.0
+    values["DCHI"] = 1.0 if close >= update_rolling(rolling["close_max"], close) else 0.0
+    values["DCLI"] = 1.0 if close <= update_rolling(rolling["close_min"], close) else 0.0
+
+    # Volume indicators
+    values["ADI"] = money_flow_volume + lag("money_flow_volume", seed=seeds["money_flow_volume"])
+    values["CMF"] = _divide(update_rolling(rolling["cmf_flow"], money_flow_volume),
+                            update_rolling(rolling["cmf_volume"], volume))
+    values["EM"] = update_rolling(rolling["em"], _divide(((high - lag("High")) + (low - lag("Low"))) * (high - low),
+                                                         2 * volume))
+    values["FI"] = (close - lag("Close", 2)) * (volume - lag("Volume", 2))
+
+    if no_entries != 0 and lag("Volume") > volume:
+        cumulative["NVI"] = cumulative["NVI"] * (1.0 + (_divide(close, prev_close_nan) - 1))
+
+    values["NVI"] = cumulative["NVI"]
+
+    if close < prev_close_nan or close > prev_close_nan:
+        cumulative["OBV"] = cumulative["OBV"] + (-volume if close < prev_close_nan else volume)
+        values["OBV"] = cumulative["OBV"]
+
+    else:
+        values["OBV"] = math.nan
+
+    volume_price_trend = volume * _divide(close_change, prev_close)
+    values["VPT"] = lag("volume_price_trend", seed=seeds["volume_price_trend"]) + volume_price_trend
+
+    # Miscellaneous indicators
+    values["DR"] = (_divide(close, prev_close) - 1) * 100
+    values["DLR"] = (log_close - lag("log_close")) * 100
+
+    # Remember the values which are needed by the next entries
+    for name, value in [("Close", close), ("High", high), ("Low", low), ("Volume", volume), ("log_close", log_close),
+                        ("typical_price", typical_price), ("money_flow_volume", money_flow_volume),
+                        ("volume_price_trend", volume_price_trend), ("triple_ema", triple_ema)]:
+        history[name].append(value)
+        del history[name][:-HISTORY_LENGTHS[name]]
+
+    state["no_entries"] += 1
+
+    return values
+
+
+def save_indicator_state(state, state_file):
+    """
+    Saves the state of the technical indicators as a JSON file.
+
+    Any other entries that were added to the state (e.g. the date of the last entry) are saved along with it, as
+    long as they can be converted to JSON.
+
+    Args:
+        state (dict): The state of the technical indicators.
+
+        state_file (str): The path to the JSON file.
+
+    """
+    with open(state_file, "w") as f:
+        json.dump(state, f)
+
+
+def load_indicator_state(state_file):
+    """
+    Loads the state of the technical indicators from a JSON file.
+
+    Args:
+        state_file (str): The path to the JSON file.
+
+    Returns:
+        dict: The state of the technical indicators.
+
+    Raises:
+        ValueError: If the state was saved with a different version of the format.
+
+    """
+    with open(state_file, "r") as f:
+        state = json.load(f)
+
+    if state.get("version") != INDICATOR_STATE_VERSION:
+        raise ValueError("Outdated indicator state version")
+
+    return state
@@ -0,0 +1,875 @@
+"""
+indicatorUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: An engine which computes the technical indicators from a dependency graph, so that the intermediate
+             values which are shared between the indicators are only computed once.
+"""
+# IMPORTS
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+from lib.utils.miscUtils import sliding_window_view
+
+# CONSTANTS
+PRICE_INPUTS = ["High", "Low", "Close", "Volume"]
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]  # The order of the fields in a price tensor
+
+
+# CLASSES
+class ColumnWindowIndexer(BaseIndexer):
+    """
+    A pandas window indexer for several columns which are placed one after another in a single series.
+
+    Each window only covers the entries of its own column, so pandas' compiled window functions can compute the
+    rolling values of every column in a single call.
+    """
+
+    def __init__(self, window_size, column_length):
+        """
+        Initialization method for the indexer.
+
+        Args:
+            window_size (int): The number of entries in each window.
+
+            column_length (int): The number of entries in each column.
+
+        """
+        super().__init__(window_size=window_size, column_length=column_length)
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        """
+        Computes the bounds of the window ending at each entry.
+
+        Returns:
+            np.ndarray: The index of the first entry of each window.
+            np.ndarray: The index after the last entry of each window.
+
+        """
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        column_index = np.tile(np.arange(self.column_length, dtype=np.int64), num_values // self.column_length)
+
+        return end - np.minimum(column_index + 1, self.window_size), end
+
+
+# FUNCTIONS
+def shift(arr, periods=1, fill_value=np.nan):
+    """
+    Shifts an array forwards in time (i.e. along its first axis).
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        periods (int): The number of entries to shift by. (Default = 1)
+
+        fill_value (Union[float, np.ndarray]): The value(s) of the first `periods` entries. (Default = np.nan)
+
+    Returns:
+        np.ndarray: The shifted array.
+
+    Examples:
+        >>> shift(np.array([1., 2., 3.]))
+        array([nan,  1.,  2.])
+
+    """
+    shifted = np.empty(arr.shape, dtype=np.float64)
+    shifted[:periods] = fill_value
+    shifted[periods:] = arr[:len(arr) - periods]
+
+    return shifted
+
+
+def mean_shift(arr, periods=1):
+    """
+    Shifts an array forwards in time, filling in the first `periods` entries with the mean of the array.
+
+    This is how the `ta` library seeds the first entries of many of its indicators. NaN values are left out of
+    the mean. For a 2D array, the mean of each column only covers the entries up to its last non-NaN entry, and is
+    summed in the same order as for a 1D array, so NaN padding after a column's history does not change it.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        periods (int): The number of entries to shift by. (Default = 1)
+
+    Returns:
+        np.ndarray: The shifted array.
+
+    Examples:
+        >>> mean_shift(np.array([1., 2., 3.]))
+        array([2., 1., 2.])
+
+    """
+    if arr.ndim == 1:
+        return shift(arr, periods, fill_value=np.nanmean(arr))
+
+    is_nan = np.isnan(arr.reshape(len(arr), -1).T)
+    zero_filled = np.where(is_nan, 0.0, arr.reshape(len(arr), -1).T)  # Each column is contiguous
+
+    ends = len(arr) - np.argmax(~is_nan[:, ::-1], axis=1)  # One past the last non-NaN entry
+    ends[is_nan.all(axis=1)] = 0
+
+    # Take the mean of the columns which end at the same entry together
+    fill_value = np.full(len(ends), np.nan)
+
+    for end in np.unique(ends[ends != 0]):
+        is_ending = ends == end
+        fill_value[is_ending] = np.sum(zero_filled[is_ending, :end], axis=1) / np.sum(~is_nan[is_ending, :end], axis=1)
+
+    return shift(arr, periods, fill_value=fill_value.reshape(arr.shape[1:]))
+
+
+def diff(arr, periods=1):
+    """
+    Calculates the change of an array over `periods` entries.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        periods (int): The number of entries to take the change over. (Default = 1)
+
+    Returns:
+        np.ndarray: The change of the array. The first `periods` entries are NaN.
+
+    """
+    arr = arr.astype(np.float64)
+    return arr - shift(arr, periods)
+
+
+def rolling(arr, window, method, min_periods=None, **kwargs):
+    """
+    Applies one of pandas' rolling window methods (e.g. "sum", "mean", "std" or "max") to an array.
+
+    The compiled window functions of pandas are used, as they are the same functions that the `ta` library uses.
+    The columns of a 2D array are computed together in a single call (see `ColumnWindowIndexer`).
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        window (int): The number of entries in each window.
+
+        method (str): The name of the rolling window method.
+
+        min_periods (int): The minimum number of non-NaN entries needed to have a value.
+                           (Default = None, which means that `window` is used)
+
+        **kwargs: The arguments to the rolling window method.
+
+    Returns:
+        np.ndarray: The result of the rolling window method, with the same shape as `arr`.
+
+    """
+    columns = arr.reshape(len(arr), -1)
+
+    if columns.shape[1] == 1 or len(arr) == 0:
+        rolling_window = pd.DataFrame(columns).rolling(window, min_periods=min_periods)
+        return getattr(rolling_window, method)(**kwargs).to_numpy().reshape(arr.shape)
+
+    # Place the columns one after another, so that they are all computed in a single call
+    min_periods = window if min_periods is None else min_periods
+    rolling_window = pd.Series(columns.T.ravel()).rolling(ColumnWindowIndexer(window, len(arr)),
+                                                          min_periods=min_periods)
+
+    return getattr(rolling_window, method)(**kwargs).to_numpy().reshape(columns.shape[::-1]).T.reshape(arr.shape)
+
+
+def rolling_apply(arr, window, func, min_periods=None):
+    """
+    Applies a reduction function to every window of an array.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis. It should not contain any NaN values.
+
+        window (int): The number of entries in each window.
+
+        func (Callable[[np.ndarray], np.ndarray]): The function which reduces the last axis of an array of
+                                                   windows.
+
+        min_periods (int): The minimum number of entries needed to have a value. Windows at the start of the array
+                           with fewer than `window` entries are passed to `func` as they are.
+                           (Default = None, which means that `window` is used)
+
+    Returns:
+        np.ndarray: The result of `func` for the window ending at each entry. The entries with fewer than
+                    `min_periods` entries before them are NaN.
+
+    """
+    min_periods = window if min_periods is None else min_periods
+    result = np.full(arr.shape, np.nan)
+
+    # Put time along the last axis, so that the entries of each window are contiguous (and hence are reduced in the
+    # same order for 1D and 2D arrays)
+    time_last_arr = np.ascontiguousarray(np.moveaxis(arr, 0, -1))
+
+    # Apply the function to all the full windows at once
+    if len(arr) >= window:
+        result[window - 1:] = np.moveaxis(func(sliding_window_view(time_last_arr, window, axis=-1)), -1, 0)
+
+    # Apply the function to the partial windows at the start
+    for no_entries in range(max(min_periods, 1), min(window, len(arr) + 1)):
+        result[no_entries - 1] = func(time_last_arr[..., :no_entries])
+
+    return result
+
+
+def ewm_mean(arr, min_periods=0, **kwargs):
+    """
+    Calculates the exponentially weighted moving average of an array.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        min_periods (int): The minimum number of non-NaN entries needed to have a value. (Default = 0)
+
+        **kwargs: The decay of the average (i.e. `span` or `com`). See `pd.DataFrame.ewm`.
+
+    Returns:
+        np.ndarray: The exponentially weighted moving average.
+
+    """
+    ewm = pd.DataFrame(arr.reshape(len(arr), -1)).ewm(min_periods=min_periods, **kwargs)
+    return ewm.mean().to_numpy().reshape(arr.shape)
+
+
+def ema(arr, periods):
+    """
+    Calculates the exponential moving average of an array, in the same way as `ta.utils.ema`.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        periods (int): The span of the average.
+
+    Returns:
+        np.ndarray: The exponential moving average. The first `periods - 1` entries are NaN.
+
+    """
+    return ewm_mean(arr, span=periods, min_periods=periods)
+
+
+def indicator_flag(condition):
+    """
+    Converts a condition into a 1.0/0.0 indicator.
+
+    Args:
+        condition (np.ndarray): The condition. Entries which compared with NaN are False.
+
+    Returns:
+        np.ndarray: 1.0 where the condition holds and 0.0 elsewhere.
+
+    """
+    return np.where(condition, 1.0, 0.0)
+
+
+def get_window_mask(arr, window):
+    """
+    Finds the entries of an array which are preceded by at least `window - 1` other entries.
+
+    Args:
+        arr (np.ndarray): The array, with time along its first axis.
+
+        window (int): The number of entries in each window.
+
+    Returns:
+        np.ndarray: A boolean array which is True for the entries with a full window. It can be broadcast with
+                    `arr`.
+
+    """
+    return (np.arange(len(arr)) >= window - 1).reshape((-1,) + (1,) * (arr.ndim - 1))
+
+
+def get_money_flow_volume(high, low, close, volume):
+    """
+    Calculates the money flow volume (i.e. the close location value multiplied by the volume), which is shared by
+    the accumulation/distribution index and the Chaikin money flow.
+
+    Args:
+        high (np.ndarray): The high prices.
+
+        low (np.ndarray): The low prices.
+
+        close (np.ndarray): The close prices.
+
+        volume (np.ndarray): The volumes.
+
+    Returns:
+        np.ndarray: The money flow volume.
+
+    """
+    close_location_value = ((close - low) - (high - close)) / (high - low)
+    return np.where(np.isnan(close_location_value), 0.0, close_location_value) * volume
+
+
+def get_money_flow_index(typical_price, volume, n=14):
+    """
+    Calculates the money flow index, in the same way as `ta.money_flow_index`.
+
+    Args:
+        typical_price (np.ndarray): The typical prices (i.e. the average of the high, low and close prices).
+
+        volume (np.ndarray): The volumes.
+
+        n (int): The number of entries to consider. (Default = 14)
+
+    Returns:
+        np.ndarray: The money flow index.
+
+    """
+    prev_typical_price = shift(typical_price)
+    direction = np.where(typical_price > prev_typical_price, 1, np.where(typical_price < prev_typical_price, -1, 0))
+    money_flow = typical_price * volume * direction
+
+    positive_flow = rolling_apply(np.where(money_flow >= 0.0, money_flow, 0.0), n, lambda x: np.sum(x, axis=-1))
+    negative_flow = abs(rolling_apply(np.where(money_flow < 0.0, money_flow, 0.0), n, lambda x: np.sum(x, axis=-1)))
+
+    return 100 - (100 / (1 + positive_flow / negative_flow))
+
+
+def get_rsi(close_diff, n=14):
+    """
+    Calculates the relative strength index, in the same way as `ta.rsi`.
+
+    Args:
+        close_diff (np.ndarray): The changes in the close price.
+
+        n (int): The number of entries to consider. (Default = 14)
+
+    Returns:
+        np.ndarray: The relative strength index.
+
+    """
+    is_down = close_diff < 0
+    ema_up = ewm_mean(np.where(is_down, 0, close_diff), com=n - 1)
+    ema_down = ewm_mean(np.where(is_down, -close_diff, close_diff * 0), com=n - 1)
+
+    return 100 * ema_up / (ema_up + ema_down)
+
+
+def get_tsi(close_change, r=25, s=13):
+    """
+    Calculates the true strength index, in the same way as `ta.tsi`.
+
+    Args:
+        close_change (np.ndarray): The changes in the close price.
+
+        r (int): The centre of mass of the first smoothing. (Default = 25)
+
+        s (int): The centre of mass of the second smoothing. (Default = 13)
+
+    Returns:
+        np.ndarray: The true strength index.
+
+    """
+    smoothed_change = ewm_mean(ewm_mean(close_change, com=r), com=s)
+    smoothed_abs_change = ewm_mean(ewm_mean(np.abs(close_change), com=r), com=s)
+
+    return smoothed_change / smoothed_abs_change * 100
+
+
+def get_ultimate_oscillator(buying_pressure, true_range, true_range_sum_14):
+    """
+    Calculates the ultimate oscillator, in the same way as `ta.uo`.
+
+    Args:
+        buying_pressure (np.ndarray): The close prices minus the true lows.
+
+        true_range (np.ndarray): The true ranges.
+
+        true_range_sum_14 (np.ndarray): The 14-entry rolling sum of the true ranges.
+
+    Returns:
+        np.ndarray: The ultimate oscillator.
+
+    """
+    avg_s = rolling(buying_pressure, 7, "sum", min_periods=0) / rolling(true_range, 7, "sum", min_periods=0)
+    avg_m = rolling(buying_pressure, 14, "sum", min_periods=0) / true_range_sum_14
+    avg_l = rolling(buying_pressure, 28, "sum", min_periods=0) / rolling(true_range, 28, "sum", min_periods=0)
+
+    return 100.0 * ((4.0 * avg_s) + (2.0 * avg_m) + (1.0 * avg_l)) / 7.0
+
+
+def get_aroon(close, arg_func, n=25):
+    """
+    Calculates the Aroon up or Aroon down indicator, in the same way as `ta.aroon_up` and `ta.aroon_down`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        arg_func (Callable): `np.argmax` for the Aroon up indicator, or `np.argmin` for the Aroon down indicator.
+
+        n (int): The number of entries to consider. (Default = 25)
+
+    Returns:
+        np.ndarray: The Aroon indicator.
+
+    """
+    return rolling_apply(close, n, lambda x: (arg_func(x, axis=-1) + 1) / n * 100, min_periods=0)
+
+
+def get_cci(typical_price, n=20, c=0.015):
+    """
+    Calculates the commodity channel index, in the same way as `ta.cci`.
+
+    Args:
+        typical_price (np.ndarray): The typical prices (i.e. the average of the high, low and close prices).
+
+        n (int): The number of entries to consider. (Default = 20)
+
+        c (float): The scaling constant. (Default = 0.015)
+
+    Returns:
+        np.ndarray: The commodity channel index.
+
+    """
+    mean_absolute_deviation = rolling_apply(typical_price, n, lambda x: np.mean(
+        np.abs(x - np.mean(x, axis=-1, keepdims=True)), axis=-1), min_periods=0)
+
+    return (typical_price - rolling(typical_price, n, "mean", min_periods=0)) / (c * mean_absolute_deviation)
+
+
+def get_roc_average(close, roc_periods, window):
+    """
+    Calculates the moving average of the rate of change of the close price, as used in the KST oscillator.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        roc_periods (int): The number of entries to take the rate of change over.
+
+        window (int): The number of entries to take the average of.
+
+    Returns:
+        np.ndarray: The moving average of the rate of change.
+
+    """
+    shifted_close = mean_shift(close, roc_periods)
+    return rolling((close - shifted_close) / shifted_close, window, "mean", min_periods=0)
+
+
+def get_kst(close):
+    """
+    Calculates the KST oscillator, in the same way as `ta.kst`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+    Returns:
+        np.ndarray: The KST oscillator.
+
+    """
+    return 100 * (get_roc_average(close, 10, 10) + 2 * get_roc_average(close, 15, 10) +
+                  3 * get_roc_average(close, 20, 10) + 4 * get_roc_average(close, 30, 15))
+
+
+def get_macd_diff(close, n_fast=12, n_slow=26, n_sign=9):
+    """
+    Calculates the MACD histogram, in the same way as `ta.macd_diff`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        n_fast (int): The span of the fast exponential moving average. (Default = 12)
+
+        n_slow (int): The span of the slow exponential moving average. (Default = 26)
+
+        n_sign (int): The span of the signal line. (Default = 9)
+
+    Returns:
+        np.ndarray: The MACD histogram.
+
+    """
+    macd = ema(close, n_fast) - ema(close, n_slow)
+    return macd - ema(macd, n_sign)
+
+
+def get_mass_index(high, low, n=9, n2=25):
+    """
+    Calculates the mass index, in the same way as `ta.mass_index`.
+
+    Args:
+        high (np.ndarray): The high prices.
+
+        low (np.ndarray): The low prices.
+
+        n (int): The span of the exponential moving averages. (Default = 9)
+
+        n2 (int): The number of entries to sum over. (Default = 25)
+
+    Returns:
+        np.ndarray: The mass index.
+
+    """
+    amplitude_ema = ema(high - low, n)
+    return rolling(amplitude_ema / ema(amplitude_ema, n), n2, "sum", min_periods=0)
+
+
+def get_trix(close, n=15):
+    """
+    Calculates the TRIX, in the same way as `ta.trix`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        n (int): The span of the exponential moving averages. (Default = 15)
+
+    Returns:
+        np.ndarray: The TRIX.
+
+    """
+    triple_ema = ema(ema(ema(close, n), n), n)
+    prev_triple_ema = mean_shift(triple_ema)
+
+    return (triple_ema - prev_triple_ema) / prev_triple_ema * 100
+
+
+def get_vortex_indicator_pos(high, low, true_range_sum_14, n=14):
+    """
+    Calculates the positive vortex indicator, in the same way as `ta.vortex_indicator_pos`.
+
+    Args:
+        high (np.ndarray): The high prices.
+
+        low (np.ndarray): The low prices.
+
+        true_range_sum_14 (np.ndarray): The 14-entry rolling sum of the true ranges.
+
+        n (int): The number of entries to consider. This has to be 14. (Default = 14)
+
+    Returns:
+        np.ndarray: The positive vortex indicator.
+
+    """
+    true_range_sum = np.where(get_window_mask(high, n), true_range_sum_14, np.nan)
+    return rolling(np.abs(high - mean_shift(low)), n, "sum", min_periods=0) / true_range_sum
+
+
+def get_vortex_indicator_neg(high, low, close, n=14):
+    """
+    Calculates the negative vortex indicator, in the same way as `ta.vortex_indicator_neg`.
+
+    Unlike the other indicators, the previous close, high and low of the first entry are taken to be missing
+    instead of being seeded with the mean.
+
+    Args:
+        high (np.ndarray): The high prices.
+
+        low (np.ndarray): The low prices.
+
+        close (np.ndarray): The close prices.
+
+        n (int): The number of entries to consider. (Default = 14)
+
+    Returns:
+        np.ndarray: The negative vortex indicator.
+
+    """
+    prev_close = shift(close)
+    true_range = np.fmax(high, prev_close) - np.fmin(low, prev_close)
+
+    return rolling(np.abs(low - shift(high)), n, "sum") / rolling(true_range, n, "sum")
+
+
+def get_ease_of_movement(high, low, volume, n=20):
+    """
+    Calculates the ease of movement, in the same way as `ta.ease_of_movement`.
+
+    Args:
+        high (np.ndarray): The high prices.
+
+        low (np.ndarray): The low prices.
+
+        volume (np.ndarray): The volumes.
+
+        n (int): The number of entries to take the average of. (Default = 20)
+
+    Returns:
+        np.ndarray: The ease of movement.
+
+    """
+    return rolling((diff(high) + diff(low)) * (high - low) / (2 * volume), n, "mean", min_periods=0)
+
+
+def get_negative_volume_index(close, volume):
+    """
+    Calculates the negative volume index, in the same way as `ta.negative_volume_index`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        volume (np.ndarray): The volumes.
+
+    Returns:
+        np.ndarray: The negative volume index.
+
+    """
+    price_change = close / shift(close) - 1
+    factors = np.where(shift(volume) > volume, 1.0 + price_change, 1.0)
+    factors[:1] = 1000
+
+    return np.cumprod(factors, axis=0)
+
+
+def get_on_balance_volume(close, volume):
+    """
+    Calculates the on-balance volume, in the same way as `ta.on_balance_volume`.
+
+    Args:
+        close (np.ndarray): The close prices.
+
+        volume (np.ndarray): The volumes.
+
+    Returns:
+        np.ndarray: The on-balance volume. The entries where the close price did not change are NaN.
+
+    """
+    prev_close = shift(close)
+    signed_volume = np.where(close < prev_close, -volume, np.where(close > prev_close, volume, np.nan))
+    is_missing = np.isnan(signed_volume)
+
+    on_balance_volume = np.cumsum(np.where(is_missing, 0.0, signed_volume), axis=0)
+    on_balance_volume[is_missing] = np.nan
+
+    return on_balance_volume
+
+
+def get_volume_price_trend(prev_close, close_change, volume):
+    """
+    Calculates the volume-price trend, in the same way as `ta.volume_price_trend`.
+
+    Args:
+        prev_close (np.ndarray): The previous close prices.
+
+        close_change (np.ndarray): The changes in the close price.
+
+        volume (np.ndarray): The volumes.
+
+    Returns:
+        np.ndarray: The volume-price trend.
+
+    """
+    volume_price_trend = volume * (close_change / prev_close)
+    return mean_shift(volume_price_trend) + volume_price_trend
+
+
+# The dependency graph of the technical indicators.
+# Each node maps its name to the names of the nodes (or price inputs) it depends on and the function which computes
+# it from them. The nodes in lower case are the shared intermediate values; the others are the indicators.
+# Every node reproduces the corresponding computation in version 0.4.7 of the `ta` library.
+INDICATOR_GRAPH = {
+    # Shared intermediate values
+    "prev_close": (["Close"], lambda close: mean_shift(close)),
+    "close_change": (["Close", "prev_close"], lambda close, prev_close: close - prev_close),
+    "close_diff": (["Close"], lambda close: diff(close)),
+    "true_low": (["Low", "prev_close"], lambda low, prev_close: np.minimum(low, prev_close)),
+    "true_range": (["High", "prev_close", "true_low"],
+                   lambda high, prev_close, true_low: np.maximum(high, prev_close) - true_low),
+    "true_range_sum_14": (["true_range"], lambda true_range: rolling(true_range, 14, "sum", min_periods=0)),
+    "buying_pressure": (["Close", "true_low"], lambda close, true_low: close - true_low),
+    "median_price": (["High", "Low"], lambda high, low: 0.5 * (high + low)),
+    "typical_price": (["High", "Low", "Close"], lambda high, low, close: (high + low + close) / 3.0),
+    "close_sma_20": (["Close"], lambda close: rolling(close, 20, "mean", min_periods=0)),
+    "close_std_20": (["Close"], lambda close: rolling(close, 20, "std", min_periods=0, ddof=0)),
+    "money_flow_volume": (["High", "Low", "Close", "Volume"], get_money_flow_volume),
+
+    # Momentum indicators
+    "AO": (["median_price"], lambda median_price: (rolling(median_price, 5, "mean", min_periods=0) -
+                                                   rolling(median_price, 34, "mean", min_periods=0))),
+    "MFI": (["typical_price", "Volume"], get_money_flow_index),
+    "RSI": (["close_diff"], get_rsi),
+    "TSI": (["close_change"], get_tsi),
+    "UO": (["buying_pressure", "true_range", "true_range_sum_14"], get_ultimate_oscillator),
+
+    # Trend indicators
+    "Aroon_up": (["Close"], lambda close: get_aroon(close, np.argmax)),
+    "Aroon_down": (["Close"], lambda close: get_aroon(close, np.argmin)),
+    "Aroon_ind": (["Aroon_up", "Aroon_down"], lambda aroon_up, aroon_down: aroon_up - aroon_down),
+    "CCI": (["typical_price"], get_cci),
+    "DPO": (["Close", "close_sma_20"], lambda close, close_sma_20: mean_shift(close, 11) - close_sma_20),
+    "KST": (["Close"], get_kst),
+    "KST_sig": (["KST"], lambda kst: rolling(kst, 9, "mean", min_periods=0)),
+    "KST_diff": (["KST", "KST_sig"], lambda kst, kst_sig: kst - kst_sig),
+    "MACD_diff": (["Close"], get_macd_diff),
+    "Mass_index": (["High", "Low"], get_mass_index),
+    "Trix": (["Close"], get_trix),
+    "Vortex_pos": (["High", "Low", "true_range_sum_14"], get_vortex_indicator_pos),
+    "Vortex_neg": (["High", "Low", "Close"], get_vortex_indicator_neg),
+    "Vortex_diff": (["Vortex_pos", "Vortex_neg"], lambda vortex_pos, vortex_neg: abs(vortex_pos - vortex_neg)),
+
+    # Volatility indicators
+    "BBH": (["close_sma_20", "close_std_20"], lambda close_sma_20, close_std_20: close_sma_20 + 2 * close_std_20),
+    "BBL": (["close_sma_20", "close_std_20"], lambda close_sma_20, close_std_20: close_sma_20 - 2 * close_std_20),
+    "BBM": (["close_sma_20"], lambda close_sma_20: close_sma_20),
+    "BBHI": (["Close", "BBH"], lambda close, bbh: indicator_flag(get_window_mask(close, 20) & (close > bbh))),
+    "BBLI": (["Close", "BBL"], lambda close, bbl: indicator_flag(get_window_mask(close, 20) & (close < bbl))),
+    "KCHI": (["High", "Low", "Close"],
+             lambda high, low, close: indicator_flag(close > ((4 * high) - (2 * low) + close) / 3.0)),
+    "KCLI": (["High", "Low", "Close"],
+             lambda high, low, close: indicator_flag(close < ((-2 * high) + (4 * low) + close) / 3.0)),
+    "DCHI": (["Close"], lambda close: indicator_flag(close >= rolling(close, 20, "max"))),
+    "DCLI": (["Close"], lambda close: indicator_flag(close <= rolling(close, 20, "min"))),
+
+    # Volume indicators
+    "ADI": (["money_flow_volume"], lambda money_flow_volume: money_flow_volume + mean_shift(money_flow_volume)),
+    "CMF": (["money_flow_volume", "Volume"], lambda money_flow_volume, volume: (
+            rolling(money_flow_volume, 20, "sum", min_periods=0) / rolling(volume, 20, "sum", min_periods=0))),
+    "EM": (["High", "Low", "Volume"], get_ease_of_movement),
+    "FI": (["Close", "Volume"], lambda close, volume: diff(close, 2) * diff(volume, 2)),
+    "NVI": (["Close", "Volume"], get_negative_volume_index),
+    "OBV": (["Close", "Volume"], get_on_balance_volume),
+    "VPT": (["prev_close", "close_change", "Volume"], get_volume_price_trend),
+
+    # Miscellaneous indicators
+    "DR": (["Close", "prev_close"], lambda close, prev_close: ((close / prev_close) - 1) * 100),
+    "DLR": (["Close"], lambda close: diff(np.log(close)) * 100)
+}
+
+
+def get_dependencies(indicators):
+    """
+    Finds all the nodes of the dependency graph which are needed to compute the indicators.
+
+    Args:
+        indicators (List[str]): The names of the indicators.
+
+    Returns:
+        List[str]: The names of the needed nodes (including the indicators themselves), in the order in which
+                   they are computed. The price inputs are not included.
+
+    Examples:
+        >>> get_dependencies(["Aroon_ind"])
+        ['Aroon_up', 'Aroon_down', 'Aroon_ind']
+
+    """
+    order = []
+
+    def visit(name):
+        if name in PRICE_INPUTS or name in order:
+            return
+
+        if name not in INDICATOR_GRAPH:
+            raise ValueError(f"Unknown indicator '{name}'")
+
+        for dependency in INDICATOR_GRAPH[name][0]:
+            visit(dependency)
+
+        order.append(name)
+
+    for indicator in indicators:
+        visit(indicator)
+
+    return order
+
+
+def compute_indicators(price_data, indicators):
+    """
+    Computes technical indicators, computing each shared intermediate value only once.
+
+    Only the nodes of the dependency graph that the indicators depend on are computed.
+
+    Args:
+        price_data (Union[pd.DataFrame, Dict[str, np.ndarray]]): The high ("High"), low ("Low"), close ("Close")
+                                                                  and volume ("Volume") data, with time along the
+                                                                  first axis. Several stocks can be computed at once
+                                                                  by passing 2D arrays with a column for each stock.
+
+        indicators (List[str]): The names of the indicators to compute.
+
+    Returns:
+        Dict[str, np.ndarray]: The values of each indicator. Like the `ta` library, the values are not filled in,
+                               so some of them may be NaN.
+
+    """
+    values = {price_input: np.asarray(price_data[price_input]) for price_input in PRICE_INPUTS}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name in get_dependencies(indicators):
+            dependencies, func = INDICATOR_GRAPH[name]
+            values[name] = func(*[values[dependency] for dependency in dependencies])
+
+    return {indicator: values[indicator] for indicator in indicators}
+
+
+def compute_batch_indicators(price_tensor, indicators, mask=None, fill=False):
+    """
+    Computes technical indicators for many stocks at once.
+
+    The stocks' histories may be ragged: each stock's entries are given by a contiguous run of True values in
+    `mask`. The histories are moved to the start of the time axis, so that every history starts at the same
+    index, and the indicators of all the stocks are then computed together (see `compute_indicators`). Hence, the
+    values of each stock are the same as if its history was computed on its own (up to floating-point rounding in
+    the means which fill in the shifted values).
+
+    Args:
+        price_tensor (np.ndarray): The aligned prices, with the shape (stocks, time, fields). The fields are in
+                                   the order of `OHLCV_FIELDS`.
+
+        indicators (List[str]): The names of the indicators to compute.
+
+        mask (np.ndarray): A boolean array with the shape (stocks, time) which is True for the entries that
+                           exist. (Default = None, which means that every entry exists)
+
+        fill (bool): Should the missing values of each stock be filled in the same way as
+                     `dataUtils.add_technical_indicators` does (i.e. back-filled, and then replaced with 0)?
+                     (Default = False)
+
+    Returns:
+        np.ndarray: The values of the indicators, with the shape (stocks, time, indicators). Entries which do not
+                    exist are NaN.
+
+    Raises:
+        ValueError: If the shape of `price_tensor` or `mask` is wrong, or if a stock's entries are not
+                    contiguous.
+
+    """
+    price_tensor = np.asarray(price_tensor, dtype=np.float64)
+
+    if price_tensor.ndim != 3 or price_tensor.shape[2] != len(OHLCV_FIELDS):
+        raise ValueError(f"The price tensor should have the shape (stocks, time, {len(OHLCV_FIELDS)})")
+
+    no_stocks, no_entries = price_tensor.shape[:2]
+    mask = np.ones((no_stocks, no_entries), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+    if mask.shape != (no_stocks, no_entries):
+        raise ValueError("The mask should have the shape (stocks, time)")
+
+    # Find each stock's history, checking that it is contiguous
+    time_index = np.arange(no_entries)
+    lengths = mask.sum(axis=1)
+    starts = np.where(lengths != 0, np.argmax(mask, axis=1), 0)
+
+    if not np.array_equal(mask, (time_index >= starts[:, None]) & (time_index < (starts + lengths)[:, None])):
+        raise ValueError("The entries of each stock have to be contiguous")
+
+    result = np.full((no_stocks, no_entries, len(indicators)), np.nan)
+    stocks = np.flatnonzero(lengths)  # Stocks without any entries are skipped
+
+    if len(stocks) == 0 or len(indicators) == 0:
+        return result
+
+    # Move the histories to the start of the time axis (time along the first axis, and a column for each stock)
+    aligned_index = np.arange(lengths.max())[:, None]
+    is_valid = aligned_index < lengths[stocks]
+    source_index = np.where(is_valid, starts[stocks] + aligned_index, 0)
+
+    aligned_prices = price_tensor[stocks, source_index]  # Shape: (time, stocks, fields)
+    aligned_prices[~is_valid] = np.nan
+
+    values = compute_indicators({field: np.ascontiguousarray(aligned_prices[:, :, i])
+                                 for i, field in enumerate(OHLCV_FIELDS)}, indicators)
+    aligned_values = np.stack([values[indicator] for indicator in indicators], axis=-1)  # (time, stocks, indicators)
+    aligned_values[~is_valid] = np.nan
+
+    if fill:
+        aligned_values = pd.DataFrame(aligned_values.reshape(len(aligned_values), -1)).fillna(method="bfill").values \
+            .reshape(aligned_values.shape)
+        aligned_values[is_valid[:, :, None] & np.isnan(aligned_values)] = 0
+
+    # Move the values back to the original entries
+    result[np.broadcast_to(stocks, is_valid.shape)[is_valid], source_index[is_valid]] = aligned_values[is_valid]
+
+    return result
@@ -12,6 +12,8 @@ Description: Miscellaneous functions that are used in the programs.
 import os
 import re
 
+import numpy as np
+
 
 # FUNCTIONS
 def natural_sort(array):
@@ -108,6 +110,124 @@ def moving_average(arr, index, i_val, no_entries_taking_avg):
     return sum([x[index] for x in arr[i_val - no_entries_taking_avg:i_val]]) / no_entries_taking_avg
 
 
+def rolling_average(arr, no_entries_taking_avg, kernel="simple", alpha=None):
+    """
+    Computes the moving average of every column of a 2D array over a sliding window.
+
+    Unlike `moving_average`, this function computes the averages of all the windows at once. The "simple" kernel
+    adds up `no_entries_taking_avg` shifted slices of `arr`, in the same order as `moving_average` adds up the
+    entries of a window, so its results are identical to those of `moving_average`. (A cumulative sum would be
+    slightly cheaper, but its rounding errors would make windows with equal contents have unequal averages.) The
+    other kernels are weighted averages, which are computed as a single product between a strided view of `arr`
+    and the weights.
+
+    Args:
+        arr (np.ndarray): A 2D array of numbers, where each row is an entry and each column is a series.
+
+                          If `arr` is an integer array and `kernel` is "simple", the window sums are computed
+                          exactly with integers.
+
+        no_entries_taking_avg (int): The number of entries to consider when taking the moving average.
+
+        kernel (str): The averaging kernel to use. (Default = "simple")
+
+                      - "simple": Every entry in the window has the same weight.
+                      - "weighted": The i-th entry in the window has a weight of i (i.e. the latest entry
+                        has the largest weight).
+                      - "exponential": The entry which is k entries older than the latest entry has a weight
+                        of (1 - `alpha`) ** k.
+
+        alpha (float): The smoothing factor of the "exponential" kernel.
+                       (Default = None, which means that `alpha = 2 / (no_entries_taking_avg + 1)`)
+
+    Returns:
+        np.ndarray: A float array with `len(arr) - no_entries_taking_avg + 1` rows, where the j-th row is the
+                    average of `arr[j:j + no_entries_taking_avg]`.
+
+    Raises:
+        ValueError: If `kernel` is not one of "simple", "weighted" or "exponential".
+
+    Examples:
+        >>> import numpy as np
+        >>> L = np.array([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 16], [17, 18, 19, 20]])
+        >>> rolling_average(L, 2)[:, 1]
+        array([ 4.,  8., 12., 16.])
+        >>> rolling_average(L, 2, kernel="weighted")[:, 1]
+        array([ 4.66666667,  8.66666667, 12.66666667, 16.66666667])
+
+    """
+    arr = np.asarray(arr)
+    no_windows = max(len(arr) - no_entries_taking_avg + 1, 0)
+
+    if kernel == "simple":
+        # Add the entries of every window, from the oldest entry to the latest entry
+        window_sums = np.zeros((no_windows,) + arr.shape[1:], dtype=np.result_type(arr.dtype, np.int64))
+
+        for i in range(no_entries_taking_avg):
+            window_sums += arr[i:i + no_windows]
+
+        return window_sums / no_entries_taking_avg
+
+    # Generate the kernel's weights, from the oldest entry to the latest entry
+    if kernel == "weighted":
+        weights = np.arange(1, no_entries_taking_avg + 1, dtype=np.float64)
+
+    elif kernel == "exponential":
+        alpha = 2 / (no_entries_taking_avg + 1) if alpha is None else alpha
+        weights = (1 - alpha) ** np.arange(no_entries_taking_avg - 1, -1, -1, dtype=np.float64)
+
+    else:
+        raise ValueError(f"Unknown kernel '{kernel}'. The kernel must be 'simple', 'weighted' or 'exponential'.")
+
+    if no_windows == 0:
+        return np.zeros((0,) + arr.shape[1:])
+
+    # Take the weighted average of every window
+    windows = sliding_window_view(arr, no_entries_taking_avg, axis=0)
+
+    return windows @ (weights / weights.sum())
+
+
+def sliding_window_view(arr, window, axis=-1):
+    """
+    Creates a read-only view of all the windows of `window` consecutive entries along an axis of an array.
+
+    This behaves like `np.lib.stride_tricks.sliding_window_view` for a single axis, which needs numpy 1.20, but is
+    built on `as_strided` so that it also works with older versions of numpy.
+
+    Args:
+        arr (np.ndarray): The array.
+
+        window (int): The number of entries in each window.
+
+        axis (int): The axis which the windows slide along. (Default = -1)
+
+    Returns:
+        np.ndarray: A view of the array, where `axis` has `arr.shape[axis] - window + 1` entries (one for each
+                    window) and a new last axis holds the entries of each window.
+
+    Raises:
+        ValueError: If `window` is not positive, or if it is longer than the axis.
+
+    Examples:
+        >>> sliding_window_view(np.array([1, 2, 3, 4]), 2)
+        array([[1, 2],
+               [2, 3],
+               [3, 4]])
+
+    """
+    arr = np.asarray(arr)
+    axis = axis % arr.ndim
+
+    if not 0 < window <= arr.shape[axis]:
+        raise ValueError(f"Expected a window of 1 to {arr.shape[axis]} entries, but got {window}")
+
+    shape = arr.shape[:axis] + (arr.shape[axis] - window + 1,) + arr.shape[axis + 1:] + (window,)
+    strides = arr.strides + (arr.strides[axis],)
+
+    return np.lib.stride_tricks.as_strided(arr, shape=shape, strides=strides, writeable=False)
+
+
 def create_path(path):
     """
     Attempts to make a new directory with the given path. If the path already exists, this function will
@@ -0,0 +1,230 @@
+"""
+runnerUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: Functions which run the baselines as independent (baseline, stock, date range) jobs in a process pool,
+             and gather their results into a report.
+"""
+# IMPORTS
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from lib.utils.baselineUtils import DEFAULT_POLICY_PARAMS, POLICY_NAMES, score_policy
+from lib.utils.dataUtils import get_stock_symbols
+from lib.utils.featureUtils import FEATURE_STORE_DIR, load_all_features, load_features
+
+# CONSTANTS
+REPORT_COLUMNS = ["symbol", "policy", "start_date", "end_date"] + list(DEFAULT_POLICY_PARAMS) + \
+                 ["first_date", "last_date", "no_entries", "init_invest", "score", "increase", "load_time", "run_time",
+                  "worker", "error"]
+
+
+# FUNCTIONS
+def create_baseline_jobs(stock_symbols, policy_names=None, date_ranges=None, policy_params=None):
+    """
+    Creates a job for every combination of baseline, stock and date range.
+
+    Args:
+        stock_symbols (List[str]): The stock symbols.
+
+        policy_names (List[str]): The names of the baselines (see `baselineUtils.POLICY_NAMES`). (Default = None,
+                                  which means that every baseline is run)
+
+        date_ranges (List[Tuple[str, str]]): The (start date, end date) ranges of the entries, in the form
+                                             YYYY-MM-DD. Both dates are inclusive, and either can be None to start
+                                             at the first entry or to end at the last entry. (Default = None, which
+                                             means that all the entries are used)
+
+        policy_params (dict): The parameters of the baselines which differ from
+                              `baselineUtils.DEFAULT_POLICY_PARAMS`. (Default = None)
+
+    Returns:
+        List[dict]: The jobs, which only hold plain values, so that they can be sent to other processes.
+
+    Raises:
+        ValueError: If a baseline is unknown.
+
+    """
+    policy_names = POLICY_NAMES if policy_names is None else policy_names
+    date_ranges = [(None, None)] if date_ranges is None else date_ranges
+
+    for policy_name in policy_names:
+        if policy_name not in POLICY_NAMES:
+            raise ValueError(f"Unknown baseline '{policy_name}'. Expected one of: {', '.join(POLICY_NAMES)}")
+
+    return [{"symbol": stock_symbol, "policy": policy_name, "start_date": start_date, "end_date": end_date,
+             "params": {**DEFAULT_POLICY_PARAMS, **(policy_params or {})}}
+            for stock_symbol, policy_name, (start_date, end_date) in product(stock_symbols, policy_names, date_ranges)]
+
+
+def run_baseline_job(data_directory, job, init_buyable_stocks=2.5, entries_taking_avg=10,
+                     store_directory=FEATURE_STORE_DIR, feature_set=None):
+    """
+    Runs one baseline job.
+
+    The job loads its own read-only copy of the stock's features from the feature store, and scores the baseline
+    on the entries in its date range without an environment (see `baselineUtils.score_policy`), so jobs share no
+    state and can run in any process. The baseline is scored as if `Baselines` were given only those entries.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        job (dict): The job, as created by `create_baseline_jobs`.
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average. (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the stored features (see
+                                             `featureUtils.load_features`). (Default = None)
+
+    Returns:
+        dict: The row of the job in the report (see `REPORT_COLUMNS`). If the job failed, the "error" key holds the
+              error, and the result keys are None.
+
+    """
+    row = {"symbol": job["symbol"], "policy": job["policy"], "start_date": job["start_date"],
+           "end_date": job["end_date"], **job["params"],
+           "first_date": None, "last_date": None, "no_entries": None, "init_invest": None, "score": None,
+           "increase": None, "load_time": None, "run_time": None, "worker": os.getpid(), "error": None}
+
+    try:
+        # Load the entries in the date range
+        start_time = time.perf_counter()
+
+        data_df, dates = load_features(data_directory, job["symbol"], entries_taking_avg=entries_taking_avg,
+                                       store_directory=store_directory, feature_set=feature_set, return_dates=True)
+
+        first_index = 0 if job["start_date"] is None else np.searchsorted(dates, np.datetime64(job["start_date"]))
+        last_index = len(dates) if job["end_date"] is None else \
+            np.searchsorted(dates, np.datetime64(job["end_date"]), side="right")
+
+        data_df = data_df.iloc[first_index:last_index].reset_index(drop=True)
+        row["load_time"] = time.perf_counter() - start_time
+
+        if len(data_df) != 0:
+            row["first_date"], row["last_date"] = str(dates[first_index]), str(dates[last_index - 1])
+        row["no_entries"] = len(data_df)
+
+        # Score the baseline
+        start_time = time.perf_counter()
+
+        row.update(score_policy(data_df, job["policy"], init_buyable_stocks=init_buyable_stocks,
+                                policy_params=job["params"]))
+        row["run_time"] = time.perf_counter() - start_time
+
+    except Exception as e:  # Isolate the failure to this job
+        row["error"] = repr(e)
+
+    return row
+
+
+def run_baselines(data_directory, jobs=None, init_buyable_stocks=2.5, entries_taking_avg=10,
+                  store_directory=FEATURE_STORE_DIR, feature_set=None, no_workers=None, verbose=False):
+    """
+    Runs baseline jobs in a process pool, and gathers their results into a report.
+
+    The stored features of every stock are brought up to date first (see `featureUtils.load_all_features`), so
+    that the jobs only memory-map them. A job which fails does not stop the other jobs; its error is recorded in
+    its row of the report.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        jobs (List[dict]): The jobs, as created by `create_baseline_jobs`. (Default = None, which means that every
+                           baseline is run on all the entries of every stock in `data_directory`)
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average. (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the stored features (see
+                                             `featureUtils.load_features`). (Default = None)
+
+        no_workers (int): The number of worker processes. (Default = None, which means that the number of CPUs
+                          is used)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        pd.DataFrame: The report, with a row for each job in the same order as `jobs` (see `REPORT_COLUMNS`). The
+                      "load_time" and "run_time" columns are the seconds which the job took to load its entries and
+                      to score the baseline, and the "worker" column is the ID of the process which ran it.
+
+    """
+    jobs = create_baseline_jobs(get_stock_symbols(data_directory)) if jobs is None else jobs
+
+    # Bring the stored features up to date, so that the jobs of a stock do not all rebuild them
+    _, load_errors = load_all_features(data_directory, stock_symbols=sorted({job["symbol"] for job in jobs}),
+                                       entries_taking_avg=entries_taking_avg, store_directory=store_directory,
+                                       feature_set=feature_set, no_workers=no_workers, verbose=verbose)
+
+    # Run the jobs
+    rows = []
+
+    with ProcessPoolExecutor(max_workers=no_workers) as executor:
+        futures = [executor.submit(run_baseline_job, data_directory, job, init_buyable_stocks=init_buyable_stocks,
+                                   entries_taking_avg=entries_taking_avg, store_directory=store_directory,
+                                   feature_set=feature_set)
+                   if job["symbol"] not in load_errors else None for job in jobs]
+
+        for job, future in zip(jobs, futures):
+            try:
+                if future is None:
+                    raise load_errors[job["symbol"]]
+
+                row = future.result()
+
+            except Exception as e:  # The job could not be run
+                row = {"symbol": job["symbol"], "policy": job["policy"], "start_date": job["start_date"],
+                       "end_date": job["end_date"], **job["params"], "error": repr(e)}
+
+            if verbose:
+                if row["error"] is None:
+                    print(f"Ran the {row['policy']} baseline on {row['symbol']} in "
+                          f"{row['load_time'] + row['run_time']:.3f}s.")
+                else:
+                    print(f"Failed to run the {row['policy']} baseline on {row['symbol']}: {row['error']}")
+
+            rows.append(row)
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS).astype({"no_entries": "Int64", "worker": "Int64"})
+
+
+def save_baseline_report(report_df, report_file):
+    """
+    Saves a baseline report as a JSON file (a list of rows) or as a CSV file, depending on its extension.
+
+    Args:
+        report_df (pd.DataFrame): The report, as returned by `run_baselines`.
+
+        report_file (str): The path to the report file, which ends with ".json" or ".csv".
+
+    Raises:
+        ValueError: If the extension of the report file is not ".json" or ".csv".
+
+    """
+    extension = os.path.splitext(report_file)[1].lower()
+
+    if extension == ".json":
+        report_df.to_json(report_file, orient="records", indent=4)
+
+    elif extension == ".csv":
+        report_df.to_csv(report_file, index=False)
+
+    else:
+        raise ValueError(f"Expected a '.json' or '.csv' report file, but got '{report_file}'")
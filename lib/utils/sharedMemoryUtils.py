@@ -0,0 +1,107 @@
+"""
+sharedMemoryUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: Functions which place NumPy arrays in a memory-mapped file, so that many processes can read them
+             without copying them.
+"""
+# IMPORTS
+import os
+import tempfile
+
+import numpy as np
+
+# CONSTANTS
+ARRAY_ALIGNMENT = 64  # The number of bytes which the start of each array is aligned to
+
+
+# FUNCTIONS
+def create_shared_arrays(arrays, directory=None):
+    """
+    Copies arrays into a new file, which other processes memory-map to read the arrays.
+
+    The processes which memory-map the file share its pages through the page cache, so the arrays are only held
+    in memory once, however many processes read them.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The arrays to share.
+
+        directory (str): The directory to create the file in.
+                         (Default = None, which means that the system's temporary directory is used)
+
+    Returns:
+        dict: The layout of the arrays, which is small and can be pickled. It holds the path to the file ("path")
+              and the offset, shape and dtype of each array in it ("arrays"). It is passed to
+              `attach_shared_arrays` to read the arrays in another process. The caller owns the file, so it has to
+              call `delete_shared_arrays` once every process is done with the arrays.
+
+    Examples:
+        >>> debug_layout = create_shared_arrays({"a": np.arange(3.)})
+        >>> attach_shared_arrays(debug_layout)["a"]
+        array([0., 1., 2.])
+        >>> delete_shared_arrays(debug_layout)
+
+    """
+    # Work out where each array goes in the file
+    arrays = {key: np.ascontiguousarray(array) for key, array in arrays.items()}
+    array_layouts = {}
+    file_size = 0
+
+    for key, array in arrays.items():
+        array_layouts[key] = (file_size, array.shape, array.dtype.str)
+        file_size += -(-array.nbytes // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    # Copy the arrays into the file
+    file_descriptor, file_path = tempfile.mkstemp(prefix="shared_arrays_", suffix=".bin", dir=directory)
+    os.close(file_descriptor)
+
+    block = np.memmap(file_path, dtype=np.uint8, mode="w+", shape=(max(file_size, 1),))
+
+    for key, array in arrays.items():
+        offset, shape, dtype = array_layouts[key]
+        np.ndarray(shape, dtype=dtype, buffer=block, offset=offset)[...] = array
+
+    block.flush()
+    del block
+
+    return {"path": file_path, "arrays": array_layouts}
+
+
+def attach_shared_arrays(layout):
+    """
+    Memory-maps the arrays in a file which was created by `create_shared_arrays`.
+
+    Args:
+        layout (dict): The layout of the arrays, as returned by `create_shared_arrays`.
+
+    Returns:
+        Dict[str, np.ndarray]: Read-only views of the arrays in the file. Nothing is copied, and the file stays
+                               mapped for as long as any of the views exist.
+
+    """
+    block = np.memmap(layout["path"], dtype=np.uint8, mode="r")
+
+    return {key: np.ndarray(shape, dtype=dtype, buffer=block, offset=offset)
+            for key, (offset, shape, dtype) in layout["arrays"].items()}
+
+
+def delete_shared_arrays(layout):
+    """
+    Deletes the file which was created by `create_shared_arrays`.
+
+    Processes which still have the arrays mapped can keep reading them on POSIX systems, but no process can
+    attach to them any more.
+
+    Args:
+        layout (dict): The layout of the arrays, as returned by `create_shared_arrays`.
+
+    """
+    try:
+        os.remove(layout["path"])
+
+    except OSError:
+        pass  # The file was already deleted
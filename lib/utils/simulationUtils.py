@@ -0,0 +1,207 @@
+"""
+simulationUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: A pure-array simulation of the trading environment's accounting, which scores whole sequences of
+             actions at once.
+"""
+# IMPORTS
+import numpy as np
+
+
+# FUNCTIONS
+def get_session_prices(close_prices, df_start_index, df_end_index):
+    """
+    Gets the closing prices which a trading session's steps trade at.
+
+    The first step of a trading session that starts at `df_start_index` trades at the closing price of entry
+    `df_start_index + 1`, and the last step trades at the closing price of entry `df_end_index`.
+
+    Args:
+        close_prices (np.ndarray): The closing prices of all the entries (e.g. `TradingEnv.close_prices`).
+
+        df_start_index (int): The index of the first entry of the trading session.
+
+        df_end_index (int): The index after the last entry of the trading session.
+
+    Returns:
+        np.ndarray: The closing price of each step of the trading session.
+
+    Examples:
+        >>> get_session_prices(np.array([1., 2., 3., 4., 5.]), 1, 3)
+        array([3., 4.])
+
+    """
+    return close_prices[df_start_index + 1:df_end_index + 1]
+
+
+def simulate_sequence(prices, sell_amounts, buy_amounts, init_cash, affordability_prices=None):
+    """
+    Simulates the accounting of a single trading session with Python floats (see `simulate_trades`).
+
+    Args:
+        prices (List[float]): The closing price at each step.
+
+        sell_amounts (List[float]): The fraction of the stocks sold at each step, which is 0 if nothing is sold.
+
+        buy_amounts (List[float]): The fraction of the cash used to buy stocks at each step, which is 0 if nothing
+                                   is bought.
+
+        init_cash (float): The initial cash.
+
+        affordability_prices (List[float]): The price of one stock which the cash has to cover for a buy to happen
+                                            at each step. (Default = None, which means that buys always happen)
+
+    Returns:
+        List[float]: The cash after each step.
+        List[int]: The number of stocks owned after each step.
+
+    """
+    cash, stocks = init_cash, 0
+    cash_in_hand, stock_owned = [], []
+
+    if affordability_prices is None:
+        affordability_prices = [None] * len(prices)
+
+    for close_price, sell_amount, buy_amount, affordability_price in zip(prices, sell_amounts, buy_amounts,
+                                                                          affordability_prices):
+        if sell_amount != 0:
+            stock_sold = int(stocks * sell_amount)  # We don't want partial stocks
+
+            cash += close_price * stock_sold
+            stocks -= stock_sold
+
+        elif buy_amount != 0 and (affordability_price is None or cash // affordability_price >= 1):
+            stock_bought = int((cash / close_price) * buy_amount)
+
+            cash -= close_price * stock_bought
+            stocks += stock_bought
+
+        cash_in_hand.append(cash)
+        stock_owned.append(stocks)
+
+    return cash_in_hand, stock_owned
+
+
+def simulate_trades(prices, actions, init_cash, affordability_prices=None):
+    """
+    Simulates the accounting of trading sessions over a sequence of actions.
+
+    This does exactly what `TradingEnv.update_stocks` and `TradingEnv.get_val` do at each step, including selling
+    and buying only whole stocks, so the results are identical to stepping a `TradingEnv` (which starts with no
+    stocks) with the same actions. The observations and rewards are not computed.
+
+    Many action sequences can be simulated at once, by giving `actions` leading batch dimensions. The steps are
+    still simulated one after the other (as each step depends on the cash and stocks left by the previous one),
+    but each step is done for every sequence at once.
+
+    Args:
+        prices (np.ndarray): The closing price at each of the T steps (see `get_session_prices`).
+
+        actions (np.ndarray): An array of shape (..., T, 2) with an Action-Amount pair for each step (see
+                              `TradingEnv.step`). The leading dimensions, if any, are batch dimensions.
+
+        init_cash (Union[float, np.ndarray]): The initial cash of each sequence, which has to broadcast with the
+                                              batch dimensions (e.g. `TradingEnv.init_invest`).
+
+        affordability_prices (np.ndarray): The price of one stock at each step. If this is given, a buy at a step
+                                           only happens if the cash can cover at least one stock at this price
+                                           (i.e. `cash // price >= 1`), and the step is a hold otherwise. This
+                                           lets policies which only buy when they can afford to (like the BHODL
+                                           baseline) be simulated. (Default = None, which means that buys always
+                                           happen)
+
+    Returns:
+        dict: The trajectories after each step, each of shape (..., T):
+              - "cash_in_hand": The cash (float64).
+              - "stock_owned": The number of stocks owned (int64).
+              - "net_worths": The net worth (float64), which is `TradingEnv.get_val()` after each step.
+
+    Raises:
+        ValueError: If the shapes of `prices` and `actions` do not match.
+
+    Examples:
+        >>> debug_trades = simulate_trades(np.array([10., 8., 12.]), np.array([[2, 4], [1, 0], [0, 1]]), 25.)
+        >>> debug_trades["stock_owned"]
+        array([2, 2, 2])
+        >>> debug_trades["net_worths"]
+        array([25., 21., 29.])
+
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    actions = np.asarray(actions)
+
+    if prices.ndim != 1 or actions.shape[-2:] != (len(prices), 2):
+        raise ValueError(f"Expected prices of shape (T,) and actions of shape (..., T, 2), but got {prices.shape} "
+                         f"and {actions.shape}")
+
+    # Work on time-major (T, B) arrays, so that each step only touches contiguous rows
+    batch_shape = actions.shape[:-2]
+    no_steps = len(prices)
+    actions = actions.reshape(-1, no_steps, 2)
+
+    action_types = actions[..., 0].T
+    action_amounts = (actions[..., 1].T + 1) / 5  # Representing 1/5, 2/5, 3/5 etc.
+
+    # Holds (and the other action type) get an amount of 0, so a whole step can be applied to every sequence
+    sell_amounts = np.ascontiguousarray(np.where(action_types == 0, action_amounts, 0.))
+    buy_amounts = np.ascontiguousarray(np.where(action_types == 2, action_amounts, 0.))
+
+    # The trajectories. The stocks are kept as (whole) floats until the end, which gives the same values as ints
+    cash_in_hand = np.empty((no_steps, len(actions)), dtype=np.float64)
+    stock_owned = np.empty((no_steps, len(actions)), dtype=np.float64)
+
+    cash = np.array(np.broadcast_to(init_cash, batch_shape), dtype=np.float64).reshape(-1)
+
+    if len(actions) == 1:
+        # A single sequence is faster to simulate with Python floats, which give the same values
+        cash_in_hand[:, 0], stock_owned[:, 0] = simulate_sequence(
+            prices.tolist(), sell_amounts[:, 0].tolist(), buy_amounts[:, 0].tolist(), float(cash[0]),
+            affordability_prices=None if affordability_prices is None else
+            np.asarray(affordability_prices, dtype=np.float64).tolist())
+
+    else:
+        stocks = np.zeros(len(actions), dtype=np.float64)
+        traded = np.empty(len(actions), dtype=np.float64)
+
+        if affordability_prices is not None:
+            affordability_prices = np.asarray(affordability_prices, dtype=np.float64)
+            buy_amounts = buy_amounts.copy()
+
+        for step in range(no_steps):
+            close_price = prices[step]
+
+            # Sell
+            np.multiply(stocks, sell_amounts[step], out=traded)
+            np.trunc(traded, out=traded)  # We don't want partial stocks
+
+            stocks -= traded
+            traded *= close_price
+            cash += traded
+
+            # Buy
+            if affordability_prices is not None:
+                buy_amounts[step, cash // affordability_prices[step] < 1] = 0
+
+            np.divide(cash, close_price, out=traded)
+            traded *= buy_amounts[step]
+            np.trunc(traded, out=traded)
+
+            stocks += traded
+            traded *= close_price
+            cash -= traded
+
+            cash_in_hand[step] = cash
+            stock_owned[step] = stocks
+
+    # Find the net worths, which are the stocks' value + the cash
+    net_worths = stock_owned * prices[:, np.newaxis]
+    net_worths += cash_in_hand
+
+    return {"cash_in_hand": cash_in_hand.T.reshape(batch_shape + (no_steps,)),
+            "stock_owned": stock_owned.T.astype(np.int64).reshape(batch_shape + (no_steps,)),
+            "net_worths": net_worths.T.reshape(batch_shape + (no_steps,))}
@@ -0,0 +1,372 @@
+"""
+sweepUtils.py
+
+Created on 2026-10-18
+Updated on 2026-10-18
+
+Copyright Ryan Kan 2019
+
+Description: Functions which evaluate the baselines over a grid of their parameters across many stocks at once.
+"""
+# IMPORTS
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import ta
+
+from lib.environment.TradingEnv import generate_session
+from lib.utils.baselineUtils import DEFAULT_POLICY_PARAMS, get_action_amount, get_bhodl_actions, get_rsi_actions, \
+    get_sma_actions
+from lib.utils.dataUtils import get_stock_symbols
+from lib.utils.featureUtils import FEATURE_STORE_DIR, load_features
+from lib.utils.simulationUtils import get_session_prices, simulate_trades
+
+# CONSTANTS
+DEFAULT_SWEEP_GRID = {"rsi_period": [3, 5, 7, 10, 14],
+                      "sma_windows": [(5, 20), (8, 21), (10, 30), (12, 26), (20, 50)],  # (Fast window, Slow window)
+                      "position_fraction": [0.2, 0.4, 0.6, 0.8, 1]}
+
+SWEEP_PARAM_COLUMNS = ["rsi_period", "fast_window", "slow_window", "position_fraction"]
+
+
+# FUNCTIONS
+def get_sweep_grid(grid=None):
+    """
+    Completes a sweep grid with the default values, and checks it.
+
+    Args:
+        grid (dict): The values of the parameters to sweep, with the following keys:
+                     - "rsi_period": The RSI Divergence periods.
+                     - "sma_windows": The (fast window, slow window) pairs of the SMA Crossover.
+                     - "position_fraction": The position fractions, which every baseline is swept over. These are
+                                            in (0, 1], as a larger fraction buys more stocks than the cash covers
+                                            and sells more stocks than are held.
+                     (Default = None, which means that `DEFAULT_SWEEP_GRID` is used)
+
+                     Missing keys are taken from `DEFAULT_SWEEP_GRID`.
+
+    Returns:
+        dict: The complete sweep grid.
+
+    Raises:
+        ValueError: If the grid has an unknown key, or has an invalid value.
+
+    """
+    grid = {**DEFAULT_SWEEP_GRID, **(grid or {})}
+
+    unknown_keys = set(grid) - set(DEFAULT_SWEEP_GRID)
+    if unknown_keys:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown_keys))}")
+
+    grid = {key: list(values) for key, values in grid.items()}
+
+    for rsi_period in grid["rsi_period"]:
+        if rsi_period < 1:
+            raise ValueError(f"The RSI period has to be at least 1, but got {rsi_period}")
+
+    for fast_window, slow_window in grid["sma_windows"]:
+        if not 1 <= fast_window < slow_window:
+            raise ValueError(f"The fast window has to be shorter than the slow window, but got ({fast_window}, "
+                             f"{slow_window})")
+
+    for position_fraction in grid["position_fraction"]:
+        if not 0 < position_fraction <= 1:
+            raise ValueError(f"The position fraction has to be in (0, 1], but got {position_fraction}")
+
+    return grid
+
+
+def with_position_fractions(actions, position_fractions):
+    """
+    Gets copies of a baseline's actions which sell and buy with different position fractions.
+
+    Args:
+        actions (np.ndarray): The Action-Amount pair of each step.
+
+        position_fractions (List[float]): The position fractions.
+
+    Returns:
+        List[np.ndarray]: The actions with each position fraction.
+
+    """
+    fraction_actions = []
+
+    for position_fraction in position_fractions:
+        amount_actions = actions.copy()
+        amount_actions[:, 1] = get_action_amount(position_fraction)
+
+        fraction_actions.append(amount_actions)
+
+    return fraction_actions
+
+
+def sweep_stock(data_df, grid=None, init_buyable_stocks=2.5, lookback_window_size=5):
+    """
+    Evaluates the baselines over every point of a parameter grid on one stock.
+
+    The trading session is the serial session used by `Baselines`, so the scores at the default parameters are the
+    scores which `Baselines.run_policies` gives. Each signal (e.g. the RSI, or the MACD of a pair of windows) is
+    computed once and shared by every grid point which uses it, and all the grid points are then scored at once by
+    `simulate_trades`.
+
+    The untuned baselines (i.e. the baselines with `DEFAULT_POLICY_PARAMS`, whose position fraction is outside the
+    grid) are also scored, as reference results which are not ranked against the grid points.
+
+    Args:
+        data_df (pd.DataFrame): The data of the stock, which needs the "Open" and "Close" columns.
+
+        grid (dict): The values of the parameters to sweep (see `get_sweep_grid`). (Default = None, which means that
+                     `DEFAULT_SWEEP_GRID` is used)
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        lookback_window_size (int): The lookback window of the environment, which is skipped at the start of the
+                                    trading session. (Default = 5)
+
+    Returns:
+        List[dict]: The result of each grid point, with the baseline's name, its parameters (which are None if the
+                    baseline does not use them), its score and its percentage increase. The "reference" key is True
+                    for the results of the untuned baselines.
+
+    """
+    grid = get_sweep_grid(grid)
+
+    # Prepare the trading session
+    start, end = generate_session(len(data_df), lookback_window_size, None, True)
+
+    prices = data_df["Close"]
+    close_prices = prices.to_numpy()
+    init_invest = init_buyable_stocks * close_prices[start]
+    session_prices = get_session_prices(close_prices, start, end)
+
+    # Find the actions of every grid point, sharing the signals between the position fractions
+    rsi = ta.rsi(prices).to_numpy()
+
+    bhodl_points, bhodl_actions = [], []
+    signal_points, signal_actions = [], []
+
+    for position_fraction in grid["position_fraction"]:
+        bhodl_points.append({"baseline": "BHODL", "position_fraction": position_fraction})
+        bhodl_actions.append(get_bhodl_actions(start, end, position_fraction=position_fraction))
+
+    for rsi_period in grid["rsi_period"]:
+        actions = get_rsi_actions(prices, start, end, rsi_period=rsi_period, rsi=rsi)
+
+        for position_fraction, amount_actions in zip(grid["position_fraction"],
+                                                     with_position_fractions(actions, grid["position_fraction"])):
+            signal_points.append({"baseline": "RSI Divergence", "rsi_period": rsi_period,
+                                  "position_fraction": position_fraction})
+            signal_actions.append(amount_actions)
+
+    for fast_window, slow_window in grid["sma_windows"]:
+        actions = get_sma_actions(prices, start, end, fast_window=fast_window, slow_window=slow_window)
+
+        for position_fraction, amount_actions in zip(grid["position_fraction"],
+                                                     with_position_fractions(actions, grid["position_fraction"])):
+            signal_points.append({"baseline": "SMA Crossover", "fast_window": fast_window,
+                                  "slow_window": slow_window, "position_fraction": position_fraction})
+            signal_actions.append(amount_actions)
+
+    # Add the untuned baselines, which are only kept as reference results
+    bhodl_points.append({"baseline": "BHODL", "position_fraction": DEFAULT_POLICY_PARAMS["position_fraction"],
+                         "reference": True})
+    bhodl_actions.append(get_bhodl_actions(start, end))
+
+    signal_points.append({"baseline": "RSI Divergence", "rsi_period": DEFAULT_POLICY_PARAMS["rsi_period"],
+                          "position_fraction": DEFAULT_POLICY_PARAMS["position_fraction"], "reference": True})
+    signal_actions.append(get_rsi_actions(prices, start, end, rsi=rsi))
+
+    signal_points.append({"baseline": "SMA Crossover", "fast_window": DEFAULT_POLICY_PARAMS["fast_window"],
+                          "slow_window": DEFAULT_POLICY_PARAMS["slow_window"],
+                          "position_fraction": DEFAULT_POLICY_PARAMS["position_fraction"], "reference": True})
+    signal_actions.append(get_sma_actions(prices, start, end))
+
+    # Score the grid points. BHODL only buys if it can afford a stock at the opening price
+    scores = list(simulate_trades(session_prices, np.stack(bhodl_actions), init_invest,
+                                  affordability_prices=data_df["Open"].to_numpy()[start:end])["net_worths"][:, -1])
+    scores.extend(simulate_trades(session_prices, np.stack(signal_actions), init_invest)["net_worths"][:, -1])
+
+    results = []
+
+    for point, score in zip(bhodl_points + signal_points, scores):
+        results.append({"baseline": point["baseline"],
+                        **{column: point.get(column) for column in SWEEP_PARAM_COLUMNS},
+                        "score": score,
+                        "increase": (score / init_invest) * 100 - 100,
+                        "reference": point.get("reference", False)})
+
+    return results
+
+
+def sweep_stock_features(data_directory, stock_symbol, grid=None, init_buyable_stocks=2.5, entries_taking_avg=10,
+                         store_directory=FEATURE_STORE_DIR, feature_set=None):
+    """
+    Loads the features of a stock from the feature store, then evaluates the baselines over a parameter grid on it
+    (see `sweep_stock`).
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbol (str): The stock symbol.
+
+        grid (dict): The values of the parameters to sweep (see `get_sweep_grid`). (Default = None, which means that
+                     `DEFAULT_SWEEP_GRID` is used)
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average. (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the stored features (see
+                                             `featureUtils.load_features`). (Default = None)
+
+    Returns:
+        List[dict]: The result of each grid point, with the stock symbol.
+
+    """
+    data_df = load_features(data_directory, stock_symbol, entries_taking_avg=entries_taking_avg,
+                            store_directory=store_directory, feature_set=feature_set)
+
+    return [{"symbol": stock_symbol, **result}
+            for result in sweep_stock(data_df, grid=grid, init_buyable_stocks=init_buyable_stocks)]
+
+
+def sweep_baselines(data_directory, stock_symbols=None, grid=None, init_buyable_stocks=2.5, entries_taking_avg=10,
+                    store_directory=FEATURE_STORE_DIR, feature_set=None, no_workers=None, verbose=False):
+    """
+    Evaluates the baselines over a parameter grid across many stocks, sweeping the stocks in a process pool.
+
+    If a stock cannot be swept, the error is recorded and the other stocks are still swept.
+
+    Args:
+        data_directory (str): The directory which contains a subdirectory for each stock.
+
+        stock_symbols (List[str]): The stock symbols to sweep. (Default = None, which means that every stock in
+                                   `data_directory` is swept)
+
+        grid (dict): The values of the parameters to sweep (see `get_sweep_grid`). (Default = None, which means that
+                     `DEFAULT_SWEEP_GRID` is used)
+
+        init_buyable_stocks (float): The number of stocks that can be bought on the first step. (Default = 2.5)
+
+        entries_taking_avg (int): The number of entries to consider when taking the average. (Default = 10)
+
+        store_directory (str): The directory where the features are stored. (Default = FEATURE_STORE_DIR)
+
+        feature_set (Union[str, List[str]]): The technical indicators which are part of the stored features (see
+                                             `featureUtils.load_features`). (Default = None)
+
+        no_workers (int): The number of worker processes. (Default = None, which means that the number of CPUs
+                          is used)
+
+        verbose (bool): The value to this parameter is the answer to the statement "The program
+                        outputs intermediate messages". (Default = False)
+
+    Returns:
+        pd.DataFrame: The result of each grid point on each stock, ranked from the best to the worst increase for
+                      each stock. The "rank" column is the rank of the grid point on its stock. The reference
+                      results of the untuned baselines (see `sweep_stock`) follow the grid points of their stock,
+                      and are not ranked.
+        Dict[str, Exception]: The error raised for each stock which could not be swept, keyed by the stock symbol.
+
+    Raises:
+        ValueError: If the grid is invalid (see `get_sweep_grid`).
+
+    """
+    stock_symbols = get_stock_symbols(data_directory) if stock_symbols is None else stock_symbols
+    grid = get_sweep_grid(grid)  # Check the grid before starting the workers
+
+    results = []
+    errors = {}
+
+    with ProcessPoolExecutor(max_workers=no_workers) as executor:
+        futures = {stock_symbol: executor.submit(sweep_stock_features, data_directory, stock_symbol, grid=grid,
+                                                 init_buyable_stocks=init_buyable_stocks,
+                                                 entries_taking_avg=entries_taking_avg,
+                                                 store_directory=store_directory, feature_set=feature_set)
+                   for stock_symbol in stock_symbols}
+
+        for stock_symbol, future in futures.items():
+            try:
+                results.extend(future.result())
+
+                if verbose:
+                    print(f"Swept the {stock_symbol} baselines.")
+
+            except Exception as e:  # Isolate the failure to this stock
+                errors[stock_symbol] = e
+
+                if verbose:
+                    print(f"Failed to sweep the {stock_symbol} baselines: {e!r}")
+
+    results_df = pd.DataFrame(results, columns=["symbol", "baseline"] + SWEEP_PARAM_COLUMNS +
+                              ["score", "increase", "reference"])
+    results_df = results_df.astype({"rsi_period": "Int64", "fast_window": "Int64", "slow_window": "Int64",
+                                    "position_fraction": float, "score": float, "increase": float,
+                                    "reference": bool})
+
+    # Rank the grid points of each stock
+    results_df = results_df.sort_values(["symbol", "reference", "increase"], ascending=[True, True, False],
+                                        kind="stable")
+    results_df.insert(0, "rank", (results_df.groupby("symbol").cumcount() + 1).astype("Int64")
+                      .mask(results_df["reference"]))
+
+    return results_df.reset_index(drop=True), errors
+
+
+def rank_sweep_results(results_df):
+    """
+    Ranks the grid points of a sweep across all the stocks, by their median increase.
+
+    The reference results of the untuned baselines are summarised in the same way, but are not ranked; they follow
+    the ranked grid points.
+
+    Args:
+        results_df (pd.DataFrame): The results of the sweep, as returned by `sweep_baselines`.
+
+    Returns:
+        pd.DataFrame: The median, mean and worst increase, the mean rank and the number of stocks of each grid
+                      point, from the best to the worst grid point. The "reference" column is True for the untuned
+                      baselines, whose mean rank is missing.
+
+    """
+    point_columns = ["reference", "baseline"] + SWEEP_PARAM_COLUMNS
+
+    # Group the missing parameters (i.e. the ones which the baseline does not use) together
+    grouped = results_df.fillna({column: -1 for column in SWEEP_PARAM_COLUMNS}).groupby(point_columns, sort=False)
+
+    ranking_df = grouped.agg(median_increase=("increase", "median"), mean_increase=("increase", "mean"),
+                             worst_increase=("increase", "min"), mean_rank=("rank", "mean"),
+                             no_stocks=("symbol", "nunique")).reset_index()
+    ranking_df[SWEEP_PARAM_COLUMNS] = ranking_df[SWEEP_PARAM_COLUMNS].mask(ranking_df[SWEEP_PARAM_COLUMNS] == -1)
+
+    ranking_df = ranking_df.sort_values(["reference", "median_increase", "mean_increase"],
+                                        ascending=[True, False, False], kind="stable").reset_index(drop=True)
+
+    return ranking_df[point_columns[1:] + ["median_increase", "mean_increase", "worst_increase", "mean_rank",
+                                           "no_stocks", "reference"]]
+
+
+def get_default_point(results_df):
+    """
+    Finds the rows of a sweep's results which use the default parameters (see `DEFAULT_POLICY_PARAMS`), which are the
+    unranked reference scores of the untuned baselines.
+
+    Args:
+        results_df (pd.DataFrame): The results of the sweep, as returned by `sweep_baselines` or
+                                   `rank_sweep_results`.
+
+    Returns:
+        pd.Series: Whether each row uses the default parameters.
+
+    """
+    is_default = results_df["reference"].copy()
+    is_default &= results_df["position_fraction"] == DEFAULT_POLICY_PARAMS["position_fraction"]
+    is_default &= results_df["rsi_period"].isna() | (results_df["rsi_period"] == DEFAULT_POLICY_PARAMS["rsi_period"])
+
+    for column in ["fast_window", "slow_window"]:
+        is_default &= results_df[column].isna() | (results_df[column] == DEFAULT_POLICY_PARAMS[column])
+
+    return is_default.fillna(False).astype(bool)